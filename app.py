@@ -40,6 +40,12 @@ class ShotgunPanelApp(Application):
         # toolkit's code reload mechanism will work properly.
         app_payload = self.import_module("app")
 
+        # make sure formatters pick up any changes to the shotgun_fields hook
+        app_payload.ShotgunTypeFormatter.invalidate_cache()
+
+        # results of expensive lookups made by the hooks, see get_cached_lookup()
+        self._lookup_cache = app_payload.LookupCache(self.get_setting("action_lookup_max_age"))
+
         # now register a panel, this is to tell the engine about the our panel ui 
         # that the engine can automatically create the panel - this happens for
         # example when a saved window layout is restored in Nuke or at startup.
@@ -93,6 +99,11 @@ class ShotgunPanelApp(Application):
         # for the panel widget in the future. In that case, we'll need to
         # check here to see if the panel has been pinned by the user, and
         # if it has NOT navigate it to home.
+        if self.engine.has_ui:
+            # the shotgun_fields hook may format things differently
+            # in the new context
+            self.import_module("app").ShotgunTypeFormatter.invalidate_cache()
+
         if self.engine.has_ui and self._current_panel:
             try:
                 self._current_panel.navigate_to_context(new_context)
@@ -146,6 +157,25 @@ class ShotgunPanelApp(Application):
             w = self.create_panel()
             w.navigate_to_entity(entity_type, entity_id)
     
+    def get_cached_lookup(self, key, fn, *args, **kwargs):
+        """
+        Returns the result of an expensive lookup made by a hook, such as
+        a Shotgun query. Results are held for the number of seconds set by
+        the action_lookup_max_age setting, so that the lookup isn't repeated
+        for every record that actions are generated for.
+
+        This is safe to call from the background threads
+        that the generate_actions hook method runs in.
+
+        :param key: Key identifying the lookup. This should include anything
+            that the result depends on, such as the project.
+        :param fn: Function performing the lookup
+        :param args: Arguments to pass to the function
+        :param kwargs: Keyword arguments to pass to the function
+        :returns: Result of the lookup
+        """
+        return self._lookup_cache.get_or_fetch(key, fn, *args, **kwargs)
+
     def _log_metric_viewed_panel(self, entity_type):
         """
         Module local metric logging helper method for the "Viewed Panel" metric
@@ -35,6 +35,11 @@ class GeneralActions(HookBaseClass):
         
         - If it will be shown in the main browsing area, "main" is passed. 
         - If it will be shown in the details area, "details" is passed.
+
+        This method is executed in a background thread, so it should not
+        interact with the UI or with the DCC. Expensive lookups which are
+        the same for many records, such as Shotgun queries, can be cached
+        via the app's get_cached_lookup() method.
                 
         :param sg_data: Shotgun data dictionary with a set of standard fields.
         :param actions: List of action strings which have been defined in the app configuration.
@@ -97,26 +102,14 @@ class GeneralActions(HookBaseClass):
                       "description": "Copy the path associated with this publish to the clipboard."} )
 
         if "add_to_playlist" in actions and ui_area == "details":
-            # retrieve the 10 most recently updated non-closed playlists for this project
-
-            from tank_vendor.shotgun_api3.lib.sgtimezone import LocalTimezone
-            datetime_now = datetime.datetime.now(LocalTimezone())
-
-            playlists = self.parent.shotgun.find(
-                "Playlist",
-                [
-                    ["project", "is", sg_data.get("project")],
-                    {
-                        "filter_operator": "any",
-                        "filters": [
-                            ["sg_date_and_time", "greater_than", datetime_now],
-                            ["sg_date_and_time", "is", None]
-                        ]
-                    }
-                ],
-                ["code", "id", "sg_date_and_time"],
-                order=[{"field_name": "updated_at", "direction": "desc"}],
-                limit=10,
+            # retrieve the 10 most recently updated non-closed playlists for this project.
+            # these are the same for all versions in the project, so the query is
+            # only run again once the cached result has expired.
+            project = sg_data.get("project")
+            playlists = app.get_cached_lookup(
+                ("recent_playlists", project["id"] if project else None),
+                self._find_recent_playlists,
+                project
             )
 
             # playlists this version is already part of
@@ -203,6 +196,35 @@ class GeneralActions(HookBaseClass):
         elif name == "publish_clipboard":
             self._copy_to_clipboard(sg_data["path"]["local_path"])
 
+    def _find_recent_playlists(self, project):
+        """
+        Helper method - retrieves the 10 most recently updated
+        playlists in a project which haven't passed their date yet.
+
+        :param project: Project entity dictionary
+        :returns: List of playlist dictionaries with code, id
+            and sg_date_and_time keys.
+        """
+        from tank_vendor.shotgun_api3.lib.sgtimezone import LocalTimezone
+        datetime_now = datetime.datetime.now(LocalTimezone())
+
+        return self.parent.shotgun.find(
+            "Playlist",
+            [
+                ["project", "is", project],
+                {
+                    "filter_operator": "any",
+                    "filters": [
+                        ["sg_date_and_time", "greater_than", datetime_now],
+                        ["sg_date_and_time", "is", None]
+                    ]
+                }
+            ],
+            ["code", "id", "sg_date_and_time"],
+            order=[{"field_name": "updated_at", "direction": "desc"}],
+            limit=10,
+        )
+
     def _copy_to_clipboard(self, text):
         """
         Helper method - copies the given text to the clipboard
@@ -9,3 +9,5 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 from .dialog import AppDialog
+from .shotgun_formatter import ShotgunTypeFormatter
+from .lookup_cache import LookupCache
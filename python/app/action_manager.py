@@ -9,12 +9,15 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 import sgtk
+import copy
 import datetime
 from collections import defaultdict
 from sgtk.platform.qt import QtCore, QtGui
 from tank_vendor import shotgun_api3
 from sgtk import TankError
 
+from .lookup_cache import LookupCache
+
 shotgun_globals = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_globals")
 
 logger = sgtk.platform.get_logger(__name__)
@@ -24,6 +27,11 @@ class ActionManager(QtCore.QObject):
     Manager class that is used to generate action menus and dispatch action
     execution into the various action hooks. This provides an interface between
     the action hooks, action defs in the config, and the rest of the app.
+
+    The generate_actions hook method is executed in a background thread,
+    since it may need to query Shotgun. Menus show a placeholder item until
+    the actions have been generated. Generated actions are reused for the
+    number of seconds set by the action_lookup_max_age setting.
     """
     
     # emitted when the user requests a refresh via the actions system
@@ -33,27 +41,61 @@ class ActionManager(QtCore.QObject):
     UI_AREA_MAIN = 0x1
     UI_AREA_DETAILS = 0x2
     
-    def __init__(self, parent):
+    def __init__(self, parent, bg_task_manager):
         """
         Constructor
+
+        :param parent: QT parent object
+        :param bg_task_manager: Task manager to use for background work
         """
         QtCore.QObject.__init__(self, parent)
         
         self._app = sgtk.platform.current_bundle()
         self._actions = []
 
+        # action definitions returned by the hook, keyed by record,
+        # record revision, ui area and actions evaluated
+        self._action_defs_cache = LookupCache(self._app.get_setting("action_lookup_max_age"))
+
+        # menus waiting for actions, keyed by task id. Each value is a
+        # tuple with (menu, placeholder action, sg_data, cache key)
+        self._pending_menus = {}
+
+        self._bg_task_manager = bg_task_manager
+        self._task_group = "action_manager_%d" % id(self)
+        self._bg_task_manager.task_completed.connect(self._on_task_completed)
+        self._bg_task_manager.task_failed.connect(self._on_task_failed)
+
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._pending_menus = {}
+        self._bg_task_manager.stop_task_group(self._task_group)
+        self._bg_task_manager.task_completed.disconnect(self._on_task_completed)
+        self._bg_task_manager.task_failed.disconnect(self._on_task_failed)
+
     def populate_menu(self, shotgun_menu, sg_data, ui_area):
         """
         Populate the given shotgun menu with actions,
         organized in groups. Existing menu items will
         be cleared out and replaced with new ones.
 
+        If the actions for the record have to be generated by the
+        actions hook, a placeholder is added to the menu and the menu
+        is populated once the hook has run in the background.
+
         :param shotgun_menu: ShotgunMenu instance to operate on.
         :param sg_data: Shotgun data to generate actions for
         :param ui_area: Indicates which part of the UI the request is coming from.
                         Currently one of UI_AREA_MAIN, UI_AREA_DETAILS and UI_AREA_HISTORY
-        :returns: Number of actions added
+        :returns: Number of actions added, including any placeholder
         """
+        # forget any earlier request for this menu
+        for (uid, pending) in self._pending_menus.items():
+            if pending[0] is shotgun_menu:
+                del self._pending_menus[uid]
+
         shotgun_menu.clear()
         shotgun_menu.action_handles = None
         all_actions = []
@@ -65,30 +107,71 @@ class ActionManager(QtCore.QObject):
             all_actions.extend(actions)
 
         # get dynamic actions
-        for group_name, actions in self._get_actions(sg_data, ui_area).iteritems():
-            shotgun_menu.add_group(actions, group_name)
-            all_actions.extend(actions)
+        actions_to_evaluate = self._get_actions_to_evaluate(sg_data)
+        if actions_to_evaluate:
+
+            # resolve UI area
+            if ui_area == self.UI_AREA_DETAILS:
+                ui_area_str = "details"
+            elif ui_area == self.UI_AREA_MAIN:
+                ui_area_str = "main"
+            else:
+                raise TankError("Unsupported UI_AREA. Contact support.")
+
+            cache_key = (
+                sg_data["type"],
+                sg_data["id"],
+                sg_data.get("updated_at"),
+                ui_area_str,
+                tuple(actions_to_evaluate)
+            )
+            action_defs = self._action_defs_cache.get(cache_key)
+
+            # the data passed to the hooks
+            hook_sg_data = self._get_hook_data(sg_data)
+
+            if action_defs is not None:
+                for group_name, actions in self._create_actions(hook_sg_data, action_defs).iteritems():
+                    shotgun_menu.add_group(actions, group_name)
+                    all_actions.extend(actions)
+
+            else:
+                placeholder = QtGui.QAction("Loading actions...", None)
+                placeholder.setEnabled(False)
+                shotgun_menu.addAction(placeholder)
+                all_actions.append(placeholder)
+
+                uid = self._bg_task_manager.add_task(
+                    self._generate_action_defs,
+                    group=self._task_group,
+                    task_kwargs={
+                        # the hook may modify the data
+                        "sg_data": copy.deepcopy(hook_sg_data),
+                        "actions": actions_to_evaluate,
+                        "ui_area": ui_area_str
+                    }
+                )
+                self._pending_menus[uid] = (shotgun_menu, placeholder, hook_sg_data, cache_key)
 
         # for GC purposes, store python pointers to all QActions on
         # the menu instance.
         shotgun_menu.action_handles = all_actions
         return len(all_actions)
 
-    def _get_actions(self, sg_data, ui_area):
+    def _get_actions_to_evaluate(self, sg_data):
         """
-        Returns a list of actions for an entity
+        Returns the actions configured for a record, which
+        are passed to the hook to generate the specifics.
         
         :param sg_data: Shotgun data
-        :param ui_area: Indicates which part of the UI the request is coming from. 
-                        Currently one of UI_AREA_MAIN, UI_AREA_DETAILS and UI_AREA_HISTORY
-        :returns: Dict of QAction objects, keyed by group.
+        :returns: List of action names
         """
         if sg_data is None:
-            return {}
+            return []
         
         # check if we have logic configured to handle this
-        action_defs = []
         all_mappings = self._app.get_setting("action_mappings")
+        actions_to_evaluate = []
 
         if all_mappings.get(sg_data["type"]):
             
@@ -99,7 +182,6 @@ class ActionManager(QtCore.QObject):
             # [{'filters': {}, 'actions': ['assign_task']}]
 
             # now cull out actions that don't match our filters
-            actions_to_evaluate = []
             for mapping in mappings:
                 actions_def = mapping["actions"]
                 filters_def = mapping["filters"]
@@ -119,38 +201,51 @@ class ActionManager(QtCore.QObject):
                         # check if the filter is valid
                         if sg_value == field_value:
                             actions_to_evaluate.extend(actions_def)
-                            
-            if len(actions_to_evaluate) > 0:
-                # no actions to run through the hook
-        
-                # cool so we have one or more actions
-                # call out to hook to give us the specifics.
-                
-                # resolve UI area
-                if ui_area == self.UI_AREA_DETAILS:
-                    ui_area_str = "details"
-                elif ui_area == self.UI_AREA_MAIN:
-                    ui_area_str = "main"
-                else:
-                    raise TankError("Unsupported UI_AREA. Contact support.")
+
+        return actions_to_evaluate
+
+    def _get_hook_data(self, sg_data):
+        """
+        Returns a copy of the given data, on the form passed to the hooks.
+
+        :param sg_data: Shotgun data
+        :returns: Shotgun data dictionary
+        """
+        sg_data = copy.copy(sg_data)
+
+        # convert created_at unix time stamp to shotgun std time stamp
+        unix_timestamp = sg_data.get("created_at")
+        if unix_timestamp:
+            sg_timestamp = datetime.datetime.fromtimestamp(unix_timestamp, 
+                                                           shotgun_api3.sg_timezone.LocalTimezone())
+            sg_data["created_at"] = sg_timestamp
+
+        return sg_data
+
+    def _generate_action_defs(self, sg_data, actions, ui_area):
+        """
+        Executed in a background thread. Calls out to the
+        hook to get the specifics of the given actions.
+
+        :param sg_data: Shotgun data, as returned by _get_hook_data()
+        :param actions: List of action names to evaluate
+        :param ui_area: String denoting the UI area, "main" or "details"
+        :returns: List of action definitions returned by the hook
+        """
+        return self._app.execute_hook_method("actions_hook", 
+                                             "generate_actions", 
+                                             sg_data=sg_data, 
+                                             actions=actions,
+                                             ui_area=ui_area)
+
+    def _create_actions(self, sg_data, action_defs):
+        """
+        Returns a list of actions for an entity
         
-                # convert created_at unix time stamp to shotgun std time stamp
-                unix_timestamp = sg_data.get("created_at")
-                if unix_timestamp:
-                    sg_timestamp = datetime.datetime.fromtimestamp(unix_timestamp, 
-                                                                   shotgun_api3.sg_timezone.LocalTimezone())
-                    sg_data["created_at"] = sg_timestamp
-                            
-                action_defs = []
-                try:
-                    action_defs = self._app.execute_hook_method("actions_hook", 
-                                                                "generate_actions", 
-                                                                sg_data=sg_data, 
-                                                                actions=actions_to_evaluate,
-                                                                ui_area=ui_area_str)
-                except Exception:
-                    self._app.log_exception("Could not execute generate_actions hook.")
-            
+        :param sg_data: Shotgun data
+        :param action_defs: List of action definitions returned by the hook
+        :returns: Dict of QAction objects, keyed by group.
+        """
         # create QActions
         default_group = "%s Actions" % shotgun_globals.get_type_display_name(sg_data["type"])
         actions = defaultdict(list)
@@ -176,6 +271,55 @@ class ActionManager(QtCore.QObject):
 
         return actions
 
+    def _on_task_completed(self, uid, group, result):
+        """
+        Called when a background task has completed.
+        Populates the menu waiting for the generated actions.
+        """
+        if uid not in self._pending_menus:
+            return
+
+        (shotgun_menu, placeholder, sg_data, cache_key) = self._pending_menus.pop(uid)
+        action_defs = result or []
+        self._action_defs_cache.set(cache_key, action_defs)
+
+        try:
+            shotgun_menu.removeAction(placeholder)
+
+            all_actions = [a for a in shotgun_menu.action_handles if a is not placeholder]
+            for group_name, actions in self._create_actions(sg_data, action_defs).iteritems():
+                shotgun_menu.add_group(actions, group_name)
+                all_actions.extend(actions)
+
+            if not action_defs:
+                placeholder.setText("No actions available")
+                shotgun_menu.addAction(placeholder)
+                all_actions.append(placeholder)
+
+            shotgun_menu.action_handles = all_actions
+
+        except RuntimeError:
+            # the widget holding the menu has been deleted, typically
+            # because the selection moved on while the actions were generated.
+            pass
+
+    def _on_task_failed(self, uid, group, msg, stack_trace):
+        """
+        Called when a background task has failed.
+        """
+        if uid not in self._pending_menus:
+            return
+
+        (_, placeholder, _, _) = self._pending_menus.pop(uid)
+        self._app.log_error("Could not execute generate_actions hook: %s" % msg)
+        self._app.log_debug(stack_trace)
+
+        try:
+            placeholder.setText("Actions could not be loaded")
+        except RuntimeError:
+            # the menu has been deleted
+            pass
+
     def _get_default_detail_actions(self, sg_data):
         """
         Returns a list of default actions for the detail area
@@ -220,6 +364,9 @@ class ActionManager(QtCore.QObject):
                                           params=params, 
                                           sg_data=sg_data)
             
+            # the action may have changed what actions are available
+            self._action_defs_cache.clear()
+
             # refresh UI
             self.refresh_request.emit()
             
@@ -242,6 +389,7 @@ class ActionManager(QtCore.QObject):
         
         :param entity: std sg entity dict with keys type, id and name
         """
+        self._action_defs_cache.clear()
         self.refresh_request.emit()
         
     def _show_in_sg(self, entity):
@@ -0,0 +1,559 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import datetime
+import time
+
+from sgtk.platform.qt import QtCore
+import sgtk
+
+from .shared_cache import SharedQueryCache
+
+shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
+shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_data")
+
+
+def run_freshness_queries(sg, probes):
+    """
+    Runs a series of freshness queries, as returned by
+    :meth:`BatchLoadableMixin.get_freshness_query`, back to back.
+    This is designed to be executed by a data retriever worker.
+
+    :param sg: Shotgun API instance
+    :param probes: List of query dictionaries
+    :returns: List of record lists, one for each probe
+    """
+    results = []
+    for probe in probes:
+        sg_records = sg.find(
+            probe["entity_type"],
+            probe["filters"],
+            probe["fields"],
+            order=probe["order"],
+            limit=probe["limit"],
+        )
+        for sg_record in sg_records:
+            # timestamps are stored as unix time in the model caches
+            updated_at = sg_record.get("updated_at")
+            if isinstance(updated_at, datetime.datetime):
+                sg_record["updated_at"] = time.mktime(updated_at.timetuple())
+        results.append(sg_records)
+    return results
+
+
+def run_batch(sg, resolutions, probes):
+    """
+    Runs the queries that models need to resolve what they should load,
+    see :meth:`BatchLoadableMixin.take_batched_resolution`, followed by a
+    series of freshness queries.
+    This is designed to be executed by a data retriever worker.
+
+    :param sg: Shotgun API instance
+    :param resolutions: List of (method, args) tuples. Each method is
+        called with the Shotgun API instance and the given arguments.
+    :param probes: List of query dictionaries
+    :returns: tuple with (list of resolution results, list of record lists
+        with one list for each probe)
+    """
+    results = [method(sg, *args) for (method, args) in resolutions]
+    return (results, run_freshness_queries(sg, probes))
+
+
+class BatchLoadableMixin(object):
+    """
+    Mixin for ShotgunModel derived classes which can be loaded
+    through a :class:`ShotgunBatchLoader`.
+
+    The mixin records the query passed to _load_data() so that the
+    batch loader can check it against Shotgun, and allows the model
+    to be loaded from its cache only, deferring the refresh decision
+    to the batch loader.
+
+    If the shared cache is enabled, refreshes are skipped when another
+    session on this host has recently retrieved the same records,
+    see :class:`SharedQueryCache`.
+    """
+
+    # flag indicating that calls to _refresh_data() should be ignored
+    _defer_refresh = False
+
+    # flag indicating that the model is being loaded by the batch loader
+    _batch_loading = False
+
+    # (method, args) tuple for a query handed to the batch
+    # loader, see _defer_resolution()
+    _batched_resolution = None
+
+    # the query last passed to _load_data()
+    _sg_query = None
+
+    # key identifying the query in the shared cache
+    _shared_cache_key = None
+
+    def _load_data(self, entity_type, filters, hierarchy, fields, order=None, seed=None, limit=None, **kwargs):
+        """
+        Wraps ShotgunModel._load_data() and records the query.
+        The updated_at field is always included so that the cached
+        data can be compared against Shotgun.
+        """
+        fields = list(fields)
+        if "updated_at" not in fields:
+            fields.append("updated_at")
+
+        self._sg_query = {
+            "entity_type": entity_type,
+            "filters": filters,
+            "order": order or [],
+            "limit": limit or 0,
+        }
+        self._shared_cache_key = SharedQueryCache.get_query_key(
+            entity_type, filters, hierarchy, fields, order, seed, limit
+        )
+
+        return super(BatchLoadableMixin, self)._load_data(
+            entity_type,
+            filters,
+            hierarchy,
+            fields,
+            order=order,
+            seed=seed,
+            limit=limit,
+            **kwargs
+        )
+
+    def _refresh_data(self):
+        """
+        Wraps ShotgunModel._refresh_data(), skipping the refresh
+        while the model is being loaded from cache by the batch loader.
+        """
+        if self._defer_refresh:
+            return
+
+        if self.is_shared_data_current():
+            self._skip_refresh()
+        else:
+            super(BatchLoadableMixin, self)._refresh_data()
+
+    def _get_freshness_fields(self):
+        """
+        Returns the fields needed to determine if cached data is current.
+        Deriving classes which cull data in _cull_records() should add any
+        fields needed by that processing.
+        """
+        return ["updated_at"]
+
+    def _before_data_processing(self, sg_data_list):
+        """
+        Called just after data has been retrieved from Shotgun but before
+        any processing takes place. Culls the data and records the
+        retrieved records in the shared cache.
+
+        :param sg_data_list: list of shotgun dictionaries, as returned by the find() call.
+        :returns: list of shotgun dictionaries, on the same form as the input.
+        """
+        sg_data_list = self._cull_records(sg_data_list)
+        self._set_shared_data(SharedQueryCache.get_fingerprint(sg_data_list))
+        return sg_data_list
+
+    def _cull_records(self, sg_data_list):
+        """
+        Called with the records returned by Shotgun, before they are
+        loaded into the model. Deriving classes can reimplement this to
+        remove records which should not be displayed. The default
+        implementation returns the records as is.
+
+        :param sg_data_list: list of shotgun dictionaries, as returned by the find() call.
+        :returns: list of shotgun dictionaries, on the same form as the input.
+        """
+        return sg_data_list
+
+    def load_cached_data(self, *args, **kwargs):
+        """
+        Same as load_data() but only loads what is cached on disk,
+        without requesting a refresh from Shotgun. Use
+        :meth:`get_freshness_query` and :meth:`is_data_current` to
+        decide whether a :meth:`refresh` is needed.
+        """
+        self._sg_query = None
+        self._batched_resolution = None
+        self._defer_refresh = True
+        self._batch_loading = True
+        try:
+            self.load_data(*args, **kwargs)
+        finally:
+            self._defer_refresh = False
+            self._batch_loading = False
+
+    def take_batched_resolution(self):
+        """
+        Returns the query that the model handed to the batch loader during
+        the last call to :meth:`load_cached_data`, see :meth:`_defer_resolution`.
+        The query is forgotten by the model.
+
+        :returns: (method, args) tuple or None
+        """
+        resolution = self._batched_resolution
+        self._batched_resolution = None
+        return resolution
+
+    def set_resolution_result(self, result):
+        """
+        Called by the batch loader with the result of the query
+        returned by :meth:`take_batched_resolution`. Deriving classes
+        which call :meth:`_defer_resolution` should reimplement this.
+
+        :param result: Value returned by the query method
+        :returns: True if the model has reloaded and refreshed itself as a result,
+            meaning that the outcome of its freshness check no longer applies.
+        """
+        return False
+
+    def set_resolution_error(self, msg):
+        """
+        Called by the batch loader if the query returned by
+        :meth:`take_batched_resolution` has failed. Deriving classes
+        which call :meth:`_defer_resolution` should reimplement this.
+
+        :param msg: Error message
+        """
+        app = sgtk.platform.current_bundle()
+        app.log_warning("Could not resolve the data to load for %r: %s" % (self, msg))
+
+    def get_freshness_query(self):
+        """
+        Returns a lightweight query which retrieves the records that
+        the model would retrieve, or None if no query has been loaded.
+
+        :returns: dictionary with keys entity_type, filters, fields, order and limit
+        """
+        if self._sg_query is None:
+            return None
+        query = dict(self._sg_query)
+        query["fields"] = self._get_freshness_fields()
+        return query
+
+    def is_data_current(self, sg_records):
+        """
+        Compares the contents of the model with the result of the freshness query.
+
+        :param sg_records: Records returned by the query from :meth:`get_freshness_query`,
+            with updated_at converted to unix time.
+        :returns: True if the model holds the same records, at the same revision.
+        """
+        sg_records = self._cull_records(list(sg_records))
+        fresh = set((sg_data["id"], sg_data.get("updated_at")) for sg_data in sg_records)
+
+        cached = set((sg_data["id"], sg_data.get("updated_at")) for sg_data in self._get_cached_records())
+
+        return fresh == cached
+
+    def mark_data_current(self):
+        """
+        Records that the data held by the model has just been found to be
+        current, so that other sessions can skip checking it themselves.
+        """
+        self._set_shared_data(SharedQueryCache.get_fingerprint(self._get_cached_records()))
+
+    def is_shared_data_current(self):
+        """
+        Checks if another session has recently retrieved the same records
+        as the model holds, meaning that there is no need to refresh them.
+
+        :returns: True if the data held by the model is current according to the shared cache.
+        """
+        shared_cache = SharedQueryCache.instance()
+        if shared_cache is None or self._shared_cache_key is None or self.rowCount() == 0:
+            return False
+
+        app = sgtk.platform.current_bundle()
+        is_current = shared_cache.is_current(
+            self._shared_cache_key,
+            SharedQueryCache.get_fingerprint(self._get_cached_records()),
+            app.get_setting("shared_cache_max_age")
+        )
+        if is_current:
+            app.log_debug("Cached data for %r was recently retrieved by another session." % self)
+        return is_current
+
+    def _defer_resolution(self, method, *args):
+        """
+        Some models need to run a query before their main query can be
+        built, for example to resolve which records to list. While the
+        model is being loaded by the batch loader, such a query is handed
+        to it instead, to run as part of the batch. The result is passed
+        to :meth:`set_resolution_result`.
+
+        Until the result is known, :meth:`get_freshness_query` should
+        return None unless the model has a previous result to go by.
+
+        :param method: Method to call with a Shotgun API instance and the given arguments
+        :returns: True if the query has been handed to the batch loader,
+            False if the model should run it itself.
+        """
+        if not self._batch_loading:
+            return False
+
+        self._batched_resolution = (method, args)
+        return True
+
+    def _skip_refresh(self):
+        """
+        Lets listeners know that the refresh has completed without
+        requesting any data. As with a real refresh, the signal is emitted
+        once control has returned to the event loop, so that listeners
+        connected right after the refresh was requested receive it.
+        """
+        QtCore.QTimer.singleShot(0, lambda: self.data_refreshed.emit(False))
+
+    def _get_cached_records(self):
+        """
+        Returns the records held by the model.
+
+        :returns: List of shotgun dictionaries
+        """
+        sg_records = []
+        for row in range(self.rowCount()):
+            sg_data = self.item(row).get_sg_data()
+            if sg_data:
+                sg_records.append(sg_data)
+        return sg_records
+
+    def _set_shared_data(self, fingerprint):
+        """
+        Records the records retrieved for the current query in the shared cache.
+
+        :param fingerprint: Fingerprint of the records, see :meth:`SharedQueryCache.get_fingerprint`
+        """
+        shared_cache = SharedQueryCache.instance()
+        if shared_cache and self._shared_cache_key:
+            shared_cache.set(self._shared_cache_key, fingerprint)
+
+    def refresh(self):
+        """
+        Requests a refresh of the loaded data from Shotgun.
+        """
+        super(BatchLoadableMixin, self)._refresh_data()
+
+    def invalidate(self, changed_entities):
+        """
+        Requests a refresh if the loaded data may be affected by
+        changes to the given records in Shotgun.
+
+        :param changed_entities: Dictionary of sets of changed entity ids,
+            keyed by entity type.
+        :returns: True if a refresh was requested
+        """
+        if self._sg_query is None:
+            return False
+
+        entity_ids = changed_entities.get(self._sg_query["entity_type"])
+        if not entity_ids or not self._is_affected_by(entity_ids):
+            return False
+
+        self._refresh_data()
+        return True
+
+    def _is_affected_by(self, entity_ids):
+        """
+        Returns True if the loaded data may be affected by changes to the
+        given records of the loaded entity type. Any such change may alter
+        which records match the query, so the default implementation always
+        returns True. Deriving classes which load known records can
+        narrow this down.
+
+        :param entity_ids: Set of changed entity ids
+        """
+        return True
+
+
+class ShotgunBatchLoader(QtCore.QObject):
+    """
+    Loads a set of models from their caches and checks all of them
+    against Shotgun in a single background request. Only the models
+    whose cached data turns out to be out of date go on to issue
+    their own, full queries.
+
+    Shotgun doesn't provide a way to batch reads across entity types, so
+    the freshness checks are executed back to back inside one worker call,
+    on one connection, only requesting the fields needed to compare
+    revisions. Identical queries (for example the details header and the
+    all fields tab, which both read the same record) are only sent once.
+
+    Queries which models need to run before their main query, such as
+    resolving the latest publishes, are executed first in the same worker
+    call, see :meth:`BatchLoadableMixin._defer_resolution`.
+    """
+
+    def __init__(self, parent, bg_task_manager):
+        """
+        :param parent: QT parent object
+        :param bg_task_manager: Task manager to use for background work
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        self._app = sgtk.platform.current_bundle()
+
+        # models waiting for the current batch, one list per query
+        self._batch = []
+        # models waiting for the result of a resolution query, one per query
+        self._resolving_models = []
+        # models which need the result of their resolution query before
+        # it can be decided whether they should be refreshed
+        self._unprobed_models = []
+        self._sg_query_id = None
+
+        self.__sg_data_retriever = shotgun_data.ShotgunDataRetriever(self,
+                                                                     bg_task_manager=bg_task_manager)
+        self.__sg_data_retriever.start()
+        self.__sg_data_retriever.work_completed.connect(self.__on_worker_signal)
+        self.__sg_data_retriever.work_failure.connect(self.__on_worker_failure)
+
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._batch = []
+        self._resolving_models = []
+        self._unprobed_models = []
+        self._sg_query_id = None
+        self.__sg_data_retriever.stop()
+
+    def load(self, requests):
+        """
+        Loads the given models from cache and schedules a batched
+        freshness check. Any queries that the models need to run to
+        resolve what they should load are run as part of the same batch.
+        Any previously scheduled batch is cancelled.
+
+        :param requests: List of (model, load_args) tuples, where load_args
+            are the arguments to pass to the model's load_data() method.
+        """
+        self.__sg_data_retriever.clear()
+        self._sg_query_id = None
+        self._batch = []
+        self._resolving_models = []
+        self._unprobed_models = []
+
+        resolutions = []
+
+        # group models by identical query
+        queries = []
+        query_models = {}
+        for (model, load_args) in requests:
+            model.load_cached_data(*load_args)
+
+            resolution = model.take_batched_resolution()
+            if resolution:
+                self._resolving_models.append(model)
+                resolutions.append(resolution)
+
+            query = model.get_freshness_query()
+
+            if query is None:
+                # the model could not build a query. It will
+                # have reported this itself or will load
+                # once its resolution query has completed.
+                continue
+
+            if model.rowCount() == 0:
+                if resolution:
+                    # the resolution may reload the model
+                    self._unprobed_models.append(model)
+                else:
+                    # nothing cached - no point in checking, go ahead and fetch
+                    model.refresh()
+                continue
+
+            if model.is_shared_data_current():
+                # another session has just checked the same data
+                continue
+
+            query_key = repr((query["entity_type"], query["filters"], query["order"], query["limit"]))
+            if query_key not in query_models:
+                query_models[query_key] = []
+                queries.append((query_key, query))
+            else:
+                # merge the fields required by both models
+                fields = query_models[query_key][0][1]["fields"]
+                fields.extend(f for f in query["fields"] if f not in fields)
+            query_models[query_key].append((model, query))
+
+        if not queries and not resolutions:
+            return
+
+        probes = []
+        for (query_key, query) in queries:
+            # use the first query in each group since it holds the merged fields
+            probes.append(query_models[query_key][0][1])
+            self._batch.append([model for (model, _) in query_models[query_key]])
+
+        self._app.log_debug(
+            "Checking %d cached models and resolving %d models in a single batch." % (
+                len(self._batch),
+                len(resolutions)
+            )
+        )
+        self._sg_query_id = self.__sg_data_retriever.execute_method(run_batch, resolutions, probes)
+
+    ############################################################################################
+    # internal methods
+
+    def __on_worker_failure(self, uid, msg):
+        """
+        Asynchronous callback - the worker thread errored.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        msg = shotgun_model.sanitize_qt(msg)
+
+        if uid == self._sg_query_id:
+            self._app.log_warning("Batched freshness check failed: %s" % msg)
+            for model in self._resolving_models:
+                model.set_resolution_error(msg)
+            # fall back on letting each model refresh itself
+            for models in self._batch + [self._unprobed_models]:
+                for model in models:
+                    model.refresh()
+            self._batch = []
+            self._resolving_models = []
+            self._unprobed_models = []
+
+    def __on_worker_signal(self, uid, request_type, data):
+        """
+        Signaled whenever the worker completes something.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        data = shotgun_model.sanitize_qt(data)
+
+        if uid == self._sg_query_id:
+            (resolution_results, probe_results) = data["return_value"]
+
+            # models which have reloaded themselves once resolved
+            reloaded_models = []
+            for (model, result) in zip(self._resolving_models, resolution_results):
+                if model.set_resolution_result(result):
+                    reloaded_models.append(model)
+
+            for model in self._unprobed_models:
+                if model not in reloaded_models:
+                    model.refresh()
+
+            for (models, sg_records) in zip(self._batch, probe_results):
+                for model in models:
+                    if model in reloaded_models:
+                        continue
+                    if model.is_data_current(sg_records):
+                        self._app.log_debug("Cached data for %r is up to date." % model)
+                        model.mark_data_current()
+                    else:
+                        model.refresh()
+
+            self._batch = []
+            self._resolving_models = []
+            self._unprobed_models = []
@@ -16,6 +16,54 @@ shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "sho
 shotgun_view = sgtk.platform.import_framework("tk-framework-qtwidgets", "views")
 
 from .widget_list_item import ListItemWidget
+from .model_entity_listing import SgEntityListingModel
+from .lru_cache import LruCache
+from .thumbnail_cache import ThumbnailCache
+
+
+class _RowContents(object):
+    """
+    Formatted contents for a single row in a listing, as
+    produced by ListItemDelegate._get_row_contents().
+    """
+
+    __slots__ = ("revision", "header_left", "header_right", "body", "_static_texts")
+
+    def __init__(self, revision, header_left, header_right, body):
+        """
+        :param revision: updated_at value of the shotgun record
+        :param header_left: Header text as string
+        :param header_right: Header text as string
+        :param body: Body text as string
+        """
+        self.revision = revision
+        self.header_left = header_left
+        self.header_right = header_right
+        self.body = body
+        self._static_texts = None
+
+    def get_static_texts(self, text_width, font):
+        """
+        Returns the row texts laid out for painting. The layout is
+        computed once and reused for as long as the width doesn't change.
+
+        :param text_width: Width available for the body text
+        :param font: Font to lay out the text with
+        :returns: tuple with (header_left, header_right, body) QStaticText objects
+        """
+        if self._static_texts is None or self._static_texts[0] != text_width:
+            static_texts = []
+            for (text, width) in [(self.header_left, -1),
+                                  (self.header_right, -1),
+                                  (self.body, text_width)]:
+                static_text = QtGui.QStaticText(text)
+                static_text.setTextFormat(QtCore.Qt.RichText)
+                static_text.setTextWidth(width)
+                static_text.prepare(QtGui.QTransform(), font)
+                static_texts.append(static_text)
+            self._static_texts = (text_width, tuple(static_texts))
+        return self._static_texts[1]
+
 
 class ListItemDelegate(shotgun_view.EditSelectedWidgetDelegate):
     """
@@ -37,6 +85,12 @@ class ListItemDelegate(shotgun_view.EditSelectedWidgetDelegate):
 
     change_work_area = QtCore.Signal(str, int)
 
+    # maximum number of rows for which formatted contents are cached
+    ROW_CACHE_SIZE = 500
+
+    # color of the frame drawn around highlighted rows
+    HIGHLIGHT_COLOR = QtGui.QColor(48, 167, 227)
+
     def __init__(self, view, action_manager):
         """
         Constructor
@@ -46,6 +100,95 @@ class ListItemDelegate(shotgun_view.EditSelectedWidgetDelegate):
         """                
         shotgun_view.EditSelectedWidgetDelegate.__init__(self, view)
         self._action_manager = action_manager
+
+        # formatted _RowContents objects, keyed by (entity type, entity id)
+        self._row_cache = LruCache(self.ROW_CACHE_SIZE)
+
+        # display sized thumbnails, shared by all listings
+        self._thumbnail_cache = ThumbnailCache.instance()
+
+        # drop cached rows whenever the underlying shotgun model
+        # updates them, for example when a thumbnail arrives.
+        source_model = view.model().sourceModel()
+        source_model.dataChanged.connect(self._on_source_data_changed)
+        source_model.modelReset.connect(self._row_cache.clear)
+
+        # have the model scale thumbnails down to the size they are drawn at
+        source_model.set_thumbnail_size(ListItemWidget.thumbnail_size())
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=None):
+        """
+        Called when data in the shotgun model changes. Evicts the
+        affected rows from the row cache.
+
+        :param top_left: Top left source model index of the change
+        :param bottom_right: Bottom right source model index of the change
+        """
+        source_model = top_left.model()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            sg_item = shotgun_model.get_sg_data(source_model.index(row, 0, top_left.parent()))
+            if sg_item:
+                self._row_cache.pop((sg_item.get("type"), sg_item.get("id")))
+
+    def _get_row_contents(self, model_index, sg_item):
+        """
+        Returns the formatted contents for a row, using cached
+        values if the row hasn't changed since it was last formatted.
+
+        :param model_index: The model index to operate on
+        :param sg_item: Shotgun data for the index
+        :returns: :class:`_RowContents` instance
+        """
+        cache_key = (sg_item.get("type"), sg_item.get("id"))
+        revision = sg_item.get("updated_at")
+
+        cached = self._row_cache.get(cache_key)
+        if cached and cached.revision == revision:
+            return cached
+
+        # use the details formatted by the model when the data arrived
+        details = shotgun_model.get_sanitized_data(
+            model_index,
+            SgEntityListingModel.LIST_ITEM_DETAILS_ROLE
+        )
+        if details and details[0] == revision:
+            (header_left, header_right, body) = details[1:]
+        else:
+            # get the formatter object which defines how this object is to be presented
+            sg_formatter = model_index.model().sourceModel().get_formatter()
+
+            # ask to format the data
+            (header_left, header_right, body) = sg_formatter.format_list_item_details(sg_item)
+
+        contents = _RowContents(revision, header_left, header_right, body)
+        self._row_cache.set(cache_key, contents)
+        return contents
+
+    def _get_thumbnail(self, model_index):
+        """
+        Returns the display sized thumbnail for a row.
+
+        Thumbnails are looked up in the thumbnail cache on every paint rather
+        than held on to, so that the cache budget bounds the memory used.
+        If a thumbnail has been evicted, the model is asked to reload it
+        and the item's icon, typically a default thumbnail, is used meanwhile.
+
+        :param model_index: The model index to operate on
+        :returns: QPixmap or None
+        """
+        key = shotgun_model.get_sanitized_data(model_index, SgEntityListingModel.THUMBNAIL_KEY_ROLE)
+        if key:
+            thumb = self._thumbnail_cache.get(key)
+            if thumb is not None:
+                return thumb
+            proxy_model = model_index.model()
+            proxy_model.sourceModel().reload_thumbnail(proxy_model.mapToSource(model_index))
+
+        icon = shotgun_model.get_sanitized_data(model_index, QtCore.Qt.DecorationRole)
+        if icon:
+            return self._thumbnail_cache.get_scaled_icon(icon, ListItemWidget.thumbnail_size())
+
+        return None
         
     def _create_widget(self, parent):
         """
@@ -96,29 +239,91 @@ class ListItemDelegate(shotgun_view.EditSelectedWidgetDelegate):
         :param model_index: The model index to operate on
         :param style_options: QT style options
         """
-        icon = shotgun_model.get_sanitized_data(model_index, QtCore.Qt.DecorationRole)
-        if icon:
-            thumb = icon.pixmap(512)
+        highlighted = shotgun_model.get_sanitized_data(model_index, SgEntityListingModel.HIGHLIGHTED_ROLE)
+        widget.set_highlighted(bool(highlighted))
+
+        # get the shotgun data
+        sg_item = shotgun_model.get_sg_data(model_index)
+
+        # get the formatted contents - unchanged rows are served from the cache
+        contents = self._get_row_contents(model_index, sg_item)
+
+        thumb = self._get_thumbnail(model_index)
+        if thumb:
             widget.set_thumbnail(thumb)
 
-        # note: This is a violation of the model/delegate independence.
-        if model_index.model().sourceModel().is_highlighted(model_index):
-            widget.set_highlighted(True)
-        else:
-            widget.set_highlighted(False)
+        widget.set_text(contents.header_left, contents.header_right, contents.body)
+
+    def paint(self, painter, style_options, model_index):
+        """
+        Paints a row in the view.
+
+        Only the selected row is rendered through a ListItemWidget. All
+        other rows are drawn directly with the painter from cached,
+        pre-laid out text and pre-scaled thumbnails, which keeps scrolling
+        through long listings fast.
+
+        :param painter: QPainter to paint with
+        :param style_options: QT style options
+        :param model_index: The model index to paint
+        """
+        if style_options.state & QtGui.QStyle.State_Selected:
+            shotgun_view.EditSelectedWidgetDelegate.paint(self, painter, style_options, model_index)
+            return
 
-        # get the shotgun data
         sg_item = shotgun_model.get_sg_data(model_index)
-        
-        # get the formatter object which defines how this object is to be presented
-        sg_formatter = model_index.model().sourceModel().get_formatter()
-        
-        # ask to format the data
-        (header_left, header_right, body) = sg_formatter.format_list_item_details(sg_item)
+        if not sg_item:
+            return
 
-        widget.set_text(header_left, header_right, body)
+        contents = self._get_row_contents(model_index, sg_item)
+
+        # mirror the margins and spacing of the ListItemWidget layout
+        box_rect = style_options.rect.adjusted(8, 4, -8, -4)
+        content_rect = box_rect.adjusted(6, 10, -6, -10)
+
+        thumb_size = ListItemWidget.thumbnail_size()
+        thumb_rect = QtCore.QRect(content_rect.topLeft(), thumb_size)
+
+        text_rect = content_rect.adjusted(thumb_size.width() + 10, 0, 0, 0)
+
+        (header_left, header_right, body) = contents.get_static_texts(
+            text_rect.width(),
+            style_options.font
+        )
+
+        painter.save()
+        try:
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+
+            if shotgun_model.get_sanitized_data(model_index, SgEntityListingModel.HIGHLIGHTED_ROLE):
+                painter.setPen(QtGui.QPen(self.HIGHLIGHT_COLOR, 2))
+                painter.setBrush(QtCore.Qt.NoBrush)
+                painter.drawRoundedRect(QtCore.QRectF(box_rect).adjusted(1, 1, -1, -1), 4, 4)
+
+            thumb = self._get_thumbnail(model_index)
+            if thumb:
+                painter.drawPixmap(thumb_rect, thumb)
+
+            painter.setFont(style_options.font)
+            painter.setPen(style_options.palette.color(QtGui.QPalette.Text))
+            painter.setClipRect(text_rect)
+
+            header_height = max(
+                header_left.size().height(),
+                header_right.size().height()
+            )
+            painter.drawStaticText(text_rect.topLeft(), header_left)
+            painter.drawStaticText(
+                QtCore.QPointF(text_rect.right() - header_right.size().width(), text_rect.top()),
+                header_right
+            )
+            painter.drawStaticText(
+                QtCore.QPointF(text_rect.left(), text_rect.top() + header_height + 3),
+                body
+            )
+        finally:
+            painter.restore()
 
-        
     def sizeHint(self, style_options, model_index):
         """
         Specify the size of the item.
@@ -33,6 +33,11 @@ from .not_found_overlay import NotFoundModelOverlay
 from .shotgun_formatter import ShotgunTypeFormatter
 from .note_updater import NoteUpdater
 from .work_area_dialog import WorkAreaDialog
+from .tab_prefetcher import TabPrefetcher
+from .batch_loader import ShotgunBatchLoader
+from .event_log_poller import EventLogPoller
+from .lru_cache import LruCache
+from .thumbnail_cache import ThumbnailCache
 
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
 task_manager = sgtk.platform.import_framework("tk-framework-shotgunutils", "task_manager")
@@ -50,6 +55,27 @@ MAX_LEN_UPPER_BODY_DETAILS = 1200
 # milliseconds to show splash
 SPLASH_UI_TIME_MILLISECONDS = 2000
 
+# maximum number of history locations to keep rendered snapshots for
+HISTORY_SNAPSHOT_MAX_ITEMS = 25
+
+# maximum total size of the history snapshots
+HISTORY_SNAPSHOT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _get_snapshot_size(snapshot):
+    """
+    Estimates the memory used by a history snapshot.
+
+    :param snapshot: Snapshot dictionary, see AppDialog._store_snapshot()
+    :returns: Size in bytes
+    """
+    size = len(snapshot["header"]) + len(snapshot["body"]) + len(repr(snapshot["sg_data"]))
+    pixmap = snapshot["pixmap"]
+    if pixmap:
+        size += pixmap.width() * pixmap.height() * pixmap.depth() / 8
+    return size
+
+
 class AppDialog(QtGui.QWidget):
     """
     Main application dialog window. This defines the top level UI
@@ -102,14 +128,14 @@ class AppDialog(QtGui.QWidget):
         # it is often handy to keep a reference to this. You can get it via the following method:
         self._app = sgtk.platform.current_bundle()
         
-        self._action_manager = ActionManager(self)
-        self._action_manager.refresh_request.connect(self.setup_ui)
-
         # create a background task manager
         self._task_manager = task_manager.BackgroundTaskManager(self, 
                                                                 start_processing=True, 
                                                                 max_threads=2)
 
+        self._action_manager = ActionManager(self, self._task_manager)
+        self._action_manager.refresh_request.connect(self.setup_ui)
+
         # register the data fetcher with the global schema manager
         shotgun_globals.register_bg_task_manager(self._task_manager)
                 
@@ -120,6 +146,16 @@ class AppDialog(QtGui.QWidget):
         # create a note updater to run operations on notes in the db
         self._note_updater = NoteUpdater(self._task_manager, self)
 
+        # warms up the tabs which are not in focus
+        self._tab_prefetcher = TabPrefetcher(self)
+
+        # loads all the models for an entity in one go when batched loading is enabled
+        self._batch_loader = ShotgunBatchLoader(self, self._task_manager)
+
+        # refreshes the data on display when it is changed in Shotgun
+        self._event_log_poller = EventLogPoller(self, self._task_manager)
+        self._event_log_poller.entities_changed.connect(self._on_entities_changed)
+
         # flag to keep track of when we are navigating
         self._navigating = False
 
@@ -146,6 +182,15 @@ class AppDialog(QtGui.QWidget):
         # track the history
         self._history_items = []
         self._history_index = 0
+
+        # rendered details areas for recently visited locations, restored
+        # instantly when navigating the history. The tabs are not included.
+        self._snapshots = LruCache(
+            HISTORY_SNAPSHOT_MAX_ITEMS,
+            max_bytes=HISTORY_SNAPSHOT_MAX_BYTES,
+            size_fn=_get_snapshot_size
+        )
+        self._restored_pixmap = None
         
         # overlay to show messages                        
         self._overlay = overlay_module.ShotgunOverlayWidget(self)
@@ -344,6 +389,7 @@ class AppDialog(QtGui.QWidget):
 
         # kick off
         self._on_home_clicked()
+        self._event_log_poller.start()
 
         # register a startup splash screen
         splash_pix = QtGui.QPixmap(":/tk_multi_infopanel/splash.png")
@@ -370,6 +416,12 @@ class AppDialog(QtGui.QWidget):
         QtCore.QCoreApplication.processEvents()
 
         try:
+
+            # stop any background tab loading
+            self._tab_prefetcher.clear()
+            self._batch_loader.destroy()
+            self._event_log_poller.destroy()
+            self._action_manager.destroy()
             
             # register the data fetcher with the global schema manager
             shotgun_globals.unregister_bg_task_manager(self._task_manager)
@@ -390,6 +442,8 @@ class AppDialog(QtGui.QWidget):
             # shut down main threadpool
             self._task_manager.shut_down()                
 
+            self._app.log_debug(ThumbnailCache.instance().get_report())
+
         except Exception, e:
             self._app.log_exception("Error running Shotgun Panel App closeEvent()")
                 
@@ -403,10 +457,24 @@ class AppDialog(QtGui.QWidget):
     ##################################################################################################
     # load data and set up UI for a particular state
     
-    def setup_ui(self):
+    def setup_ui(self, from_history=False):
         """
         sets up the UI for the current location
+
+        :param from_history: True if the location is being revisited via the
+            history navigation, in which case the last rendered details area
+            of the location is restored while the models load as usual.
         """
+        # forget about anything prefetched for the previous location
+        self._tab_prefetcher.clear()
+
+        if from_history:
+            self._restore_snapshot()
+
+        batched = self._use_batched_loading()
+        if batched:
+            self._load_page_batched()
+
         if self._current_location.entity_type == "Version":
             self.focus_version()
             
@@ -420,13 +488,236 @@ class AppDialog(QtGui.QWidget):
             self.focus_entity()
 
         # update the details area
-        self._details_model.load_data(self._current_location)
+        # (in batched mode, this has already been taken care of)
+        if not batched:
+            self._details_model.load_data(self._current_location)
 
         # update the work area button
         self.ui.set_context.set_up(
             self._current_location.entity_type,
             self._current_location.entity_id
         )
+
+        # now that the focused tab is loading, warm up the other ones
+        if not batched:
+            self._schedule_tab_prefetch()
+
+    def _use_batched_loading(self):
+        """
+        Returns True if the current location should be loaded in
+        batched mode. Batched mode applies to the entity page, where
+        the details area and the listing tabs are all loaded up front.
+        """
+        if not self._app.get_setting("enable_batched_loading"):
+            return False
+
+        return self._get_page_index() == self.ENTITY_PAGE_IDX
+
+    def _get_page_index(self):
+        """
+        Returns the index of the page used to display the current location
+        """
+        if self._current_location.entity_type == "Version":
+            return self.VERSION_PAGE_IDX
+        elif self._current_location.entity_type in ["PublishedFile", "TankPublishedFile"]:
+            return self.PUBLISH_PAGE_IDX
+        elif self._current_location.entity_type == "Note":
+            return self.NOTE_PAGE_IDX
+        else:
+            return self.ENTITY_PAGE_IDX
+
+    def _get_enabled_tabs(self, page_idx):
+        """
+        Returns the indices of the tabs which will be enabled
+        on the given page for the current location.
+
+        :param page_idx: Page index, e.g. ENTITY_PAGE_IDX
+        :returns: List of tab indices
+        """
+        if page_idx == self.ENTITY_PAGE_IDX:
+            formatter = self._current_location.sg_formatter
+            tabs = [
+                (self.ENTITY_TAB_ACTIVITY_STREAM, formatter.show_activity_tab),
+                (self.ENTITY_TAB_NOTES, formatter.show_notes_tab),
+                (self.ENTITY_TAB_VERSIONS, formatter.show_versions_tab),
+                (self.ENTITY_TAB_PUBLISHES, formatter.show_publishes_tab),
+                (self.ENTITY_TAB_TASKS, formatter.show_tasks_tab),
+                (self.ENTITY_TAB_INFO, formatter.show_info_tab),
+            ]
+            return [tab_idx for (tab_idx, (enabled, _)) in tabs if enabled]
+
+        elif page_idx == self.VERSION_PAGE_IDX:
+            return range(self.ui.version_tab_widget.count())
+
+        elif page_idx == self.PUBLISH_PAGE_IDX:
+            return range(self.ui.publish_tab_widget.count())
+
+        else:
+            # the note page doesn't have any tabs
+            return []
+
+    def _load_page_batched(self):
+        """
+        Loads the details area and all the model based tabs
+        on the page for the current location from cache, and
+        checks them against Shotgun in a single batched request.
+        """
+        page_idx = self._get_page_index()
+
+        requests = [(self._details_model, (self._current_location,))]
+        for tab_idx in self._get_enabled_tabs(page_idx):
+            request = self._get_tab_load_request(page_idx, tab_idx)
+            if request:
+                requests.append(request)
+                # make sure that focusing the tab doesn't trigger another load
+                self._tab_prefetcher.mark_loaded(*request)
+
+        self._batch_loader.load(requests)
+
+    def _store_snapshot(self):
+        """
+        Stores the rendered details area for the current location so
+        that it can be restored instantly when navigating back to it.
+        """
+        if self._current_location is None:
+            return
+
+        sg_data = self._details_model.get_sg_data()
+        if not sg_data or sg_data.get("id") != self._current_location.entity_id:
+            # details haven't arrived yet
+            return
+
+        snapshot = {
+            "sg_data": sg_data,
+            "header": self.ui.details_text_header.text(),
+            "body": self.ui.details_text_middle.text(),
+            "body_tooltip": self.ui.details_text_middle.toolTip(),
+            "pixmap": self._details_model.get_pixmap(),
+        }
+        self._snapshots.set(
+            (self._current_location.entity_type, self._current_location.entity_id),
+            snapshot
+        )
+
+    def _restore_snapshot(self):
+        """
+        Restores the details area for the current location from
+        a previously stored snapshot, if there is one.
+        """
+        self._restored_pixmap = None
+
+        snapshot = self._snapshots.get(
+            (self._current_location.entity_type, self._current_location.entity_id)
+        )
+        if snapshot is None:
+            return
+
+        self.ui.details_thumb.set_shotgun_data(snapshot["sg_data"])
+        self.ui.details_text_header.setText(snapshot["header"])
+        self.ui.details_text_header.setToolTip(snapshot["header"])
+        self.ui.details_text_middle.setText(snapshot["body"])
+        self.ui.details_text_middle.setToolTip(snapshot["body_tooltip"])
+
+        if snapshot["pixmap"]:
+            self.ui.details_thumb.setPixmap(snapshot["pixmap"])
+            # hold on to the restored thumbnail until the real one has been loaded
+            self._restored_pixmap = snapshot["pixmap"]
+
+    def _schedule_tab_prefetch(self):
+        """
+        Schedules background loading of all tabs on the current
+        page which are not in focus.
+        """
+        if not self._app.get_setting("enable_tab_prefetch"):
+            return
+
+        page_idx = self.ui.page_stack.currentIndex()
+        tab_widget = self._get_tab_widget(page_idx)
+        if tab_widget is None:
+            return
+
+        focused_tab_idx = tab_widget.currentIndex()
+        focused_request = self._get_tab_load_request(page_idx, focused_tab_idx)
+        focused_model = focused_request[0] if focused_request else None
+
+        requests = []
+        for tab_idx in range(tab_widget.count()):
+            if tab_idx == focused_tab_idx or not tab_widget.isTabEnabled(tab_idx):
+                continue
+            request = self._get_tab_load_request(page_idx, tab_idx)
+            if request:
+                requests.append(request)
+
+        self._tab_prefetcher.schedule(focused_model, requests)
+
+    def _get_tab_widget(self, page_idx):
+        """
+        Returns the tab widget on the given page.
+
+        :param page_idx: Page index, e.g. ENTITY_PAGE_IDX
+        :returns: QTabWidget or None if the page doesn't have any tabs
+        """
+        if page_idx == self.ENTITY_PAGE_IDX:
+            return self.ui.entity_tab_widget
+        elif page_idx == self.VERSION_PAGE_IDX:
+            return self.ui.version_tab_widget
+        elif page_idx == self.PUBLISH_PAGE_IDX:
+            return self.ui.publish_tab_widget
+        else:
+            # the note page doesn't have any tabs
+            return None
+
+    def _get_tab_load_request(self, page_idx, tab_idx):
+        """
+        Returns the model associated with a tab together with the
+        arguments needed to load it for the current location.
+
+        :param page_idx: Page index, e.g. ENTITY_PAGE_IDX
+        :param tab_idx: Tab index on that page
+        :returns: (model, load_args) tuple or None if the tab
+            isn't driven by a model.
+        """
+        location = self._current_location
+
+        if page_idx == self.ENTITY_PAGE_IDX:
+            if tab_idx == self.ENTITY_TAB_VERSIONS:
+                show_pending_only = self.ui.pending_versions_only.isChecked()
+                return (self._detail_tabs[(page_idx, tab_idx)]["model"], (location, show_pending_only))
+            elif tab_idx == self.ENTITY_TAB_PUBLISHES:
+                show_latest_only = self.ui.latest_publishes_only.isChecked()
+                return (self._detail_tabs[(page_idx, tab_idx)]["model"], (location, show_latest_only))
+            elif tab_idx == self.ENTITY_TAB_INFO:
+                return (self._entity_details_model, (location,))
+
+        elif page_idx == self.VERSION_PAGE_IDX:
+            if tab_idx == self.VERSION_TAB_PUBLISHES:
+                return (self._detail_tabs[(page_idx, tab_idx)]["model"], (location, False))
+            elif tab_idx == self.VERSION_TAB_INFO:
+                return (self._version_details_model, (location,))
+
+        elif page_idx == self.PUBLISH_PAGE_IDX:
+            if tab_idx == self.PUBLISH_TAB_INFO:
+                return (self._publish_details_model, (location,))
+
+        if (page_idx, tab_idx) in self._detail_tabs:
+            return (self._detail_tabs[(page_idx, tab_idx)]["model"], (location,))
+
+        # activity streams are not model based
+        return None
+
+    def _load_tab_model(self, page_idx, tab_idx):
+        """
+        Loads the model associated with a tab for the current location,
+        unless it has already been prefetched.
+
+        :param page_idx: Page index, e.g. ENTITY_PAGE_IDX
+        :param tab_idx: Tab index on that page
+        """
+        (model, load_args) = self._get_tab_load_request(page_idx, tab_idx)
+        if self._tab_prefetcher.claim(model, load_args):
+            self._app.log_debug("Using prefetched data for %r" % model)
+        else:
+            model.load_data(*load_args)
         
 
     def focus_entity(self):
@@ -571,36 +862,16 @@ class AppDialog(QtGui.QWidget):
         if index == self.ENTITY_TAB_ACTIVITY_STREAM:
             self.ui.entity_activity_stream.load_data(self._current_location.entity_dict)
 
-        elif index == self.ENTITY_TAB_NOTES:
-            # clear selection to avoid redrawing the ui over and over
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["view"].selectionModel().clear()
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["model"].load_data(self._current_location)
-            
-        elif index == self.ENTITY_TAB_VERSIONS:
+        elif index in [self.ENTITY_TAB_NOTES,
+                       self.ENTITY_TAB_VERSIONS,
+                       self.ENTITY_TAB_PUBLISHES,
+                       self.ENTITY_TAB_TASKS]:
             # clear selection to avoid redrawing the ui over and over
             self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["view"].selectionModel().clear()
-            show_pending_only = self.ui.pending_versions_only.isChecked()
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["model"].load_data(
-                self._current_location,
-                show_pending_only
-            )
-        
-        elif index == self.ENTITY_TAB_PUBLISHES:
-            # clear selection to avoid redrawing the ui over and over
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["view"].selectionModel().clear()
-            show_latest_only = self.ui.latest_publishes_only.isChecked()
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["model"].load_data(
-                self._current_location,
-                show_latest_only
-            )
-            
-        elif index == self.ENTITY_TAB_TASKS:
-            # clear selection to avoid redrawing the ui over and over
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["view"].selectionModel().clear()
-            self._detail_tabs[(self.ENTITY_PAGE_IDX, index)]["model"].load_data(self._current_location)
+            self._load_tab_model(self.ENTITY_PAGE_IDX, index)
         
         elif index == self.ENTITY_TAB_INFO:
-            self._entity_details_model.load_data(self._current_location)
+            self._load_tab_model(self.ENTITY_PAGE_IDX, index)
         
         else:
             self._app.log_error("Cannot load data for unknown entity tab index %s." % index)
@@ -617,17 +888,10 @@ class AppDialog(QtGui.QWidget):
         if index == self.VERSION_TAB_ACTIVITY_STREAM:
             self.ui.version_activity_stream.load_data(self._current_location.entity_dict)
         
-        elif index == self.VERSION_TAB_NOTES:
-            self._detail_tabs[(self.VERSION_PAGE_IDX, index)]["model"].load_data(self._current_location)
-
-        elif index == self.VERSION_TAB_PUBLISHES:        
-            self._detail_tabs[(self.VERSION_PAGE_IDX, index)]["model"].load_data(
-                self._current_location,
-                show_latest_only=False
-            )
-            
-        elif index == self.VERSION_TAB_INFO:
-            self._version_details_model.load_data(self._current_location)
+        elif index in [self.VERSION_TAB_NOTES,
+                       self.VERSION_TAB_PUBLISHES,
+                       self.VERSION_TAB_INFO]:
+            self._load_tab_model(self.VERSION_PAGE_IDX, index)
             
         else:
             self._app.log_error("Cannot load data for unknown version tab.")
@@ -641,17 +905,11 @@ class AppDialog(QtGui.QWidget):
         if not self._navigating:
             self._current_location.set_tab_index(index)
         
-        if index == self.PUBLISH_TAB_HISTORY:
-            self._detail_tabs[(self.PUBLISH_PAGE_IDX, index)]["model"].load_data(self._current_location)
-
-        elif index == self.PUBLISH_TAB_CONTAINS:        
-            self._detail_tabs[(self.PUBLISH_PAGE_IDX, index)]["model"].load_data(self._current_location)
-        
-        elif index == self.PUBLISH_TAB_USED_IN:
-            self._detail_tabs[(self.PUBLISH_PAGE_IDX, index)]["model"].load_data(self._current_location)
-        
-        elif index == self.PUBLISH_TAB_INFO:
-            self._publish_details_model.load_data(self._current_location)
+        if index in [self.PUBLISH_TAB_HISTORY,
+                     self.PUBLISH_TAB_CONTAINS,
+                     self.PUBLISH_TAB_USED_IN,
+                     self.PUBLISH_TAB_INFO]:
+            self._load_tab_model(self.PUBLISH_PAGE_IDX, index)
             
         else:
             self._app.log_error("Cannot load data for unknown publish tab.")
@@ -679,7 +937,14 @@ class AppDialog(QtGui.QWidget):
         """
         Callback called when the details thumbnail is available
         """ 
-        self.ui.details_thumb.setPixmap(self._details_model.get_pixmap())
+        pixmap = self._details_model.get_pixmap()
+
+        if self._restored_pixmap and pixmap is self._current_location.sg_formatter.default_pixmap:
+            # keep the thumbnail restored from history until the real one has loaded
+            return
+
+        self._restored_pixmap = None
+        self.ui.details_thumb.setPixmap(pixmap)
 
     def _refresh_details(self):
         """
@@ -723,6 +988,45 @@ class AppDialog(QtGui.QWidget):
             self._action_manager.UI_AREA_DETAILS
         )
 
+    def _on_entities_changed(self, changed_entities):
+        """
+        Called when the event log reports that records have changed in Shotgun.
+        Discards the history snapshots of the changed records and refreshes
+        the models on the current page which may hold any of them.
+
+        :param changed_entities: Dictionary of changed entity ids, keyed by entity type
+        """
+        changed_entities = dict(
+            (entity_type, set(entity_ids)) for (entity_type, entity_ids) in changed_entities.iteritems()
+        )
+
+        for (entity_type, entity_ids) in changed_entities.iteritems():
+            for entity_id in entity_ids:
+                self._snapshots.pop((entity_type, entity_id))
+
+        if self._current_location is None:
+            return
+
+        # the models holding data for the current location are the details,
+        # the tab in focus and any tabs which have been loaded in the background.
+        # Other tabs are loaded from scratch once they are brought into focus.
+        models = [self._details_model]
+
+        page_idx = self.ui.page_stack.currentIndex()
+        tab_widget = self._get_tab_widget(page_idx)
+        if tab_widget:
+            focused_request = self._get_tab_load_request(page_idx, tab_widget.currentIndex())
+            if focused_request:
+                models.append(focused_request[0])
+
+        for model in self._tab_prefetcher.get_loaded_models():
+            if model not in models:
+                models.append(model)
+
+        for model in models:
+            if model.invalidate(changed_entities):
+                self._app.log_debug("Refreshing %r following changes in Shotgun." % model)
+
     ###################################################################################################
     # UI callbacks
     def _on_entity_doubleclicked(self, model_index):
@@ -731,6 +1035,12 @@ class AppDialog(QtGui.QWidget):
         """
         sg_item = shotgun_model.get_sg_data(model_index)
         sg_location = ShotgunLocation(sg_item["type"], sg_item["id"])
+
+        # pass on what is already known about a publish, so
+        # that its history can be loaded without looking it up
+        history_model = self._detail_tabs[(self.PUBLISH_PAGE_IDX, self.PUBLISH_TAB_HISTORY)]["model"]
+        history_model.add_publish_details(sg_item)
+
         self._navigate_to(sg_location)
 
     def navigate_to_entity(self, entity_type, entity_id):
@@ -803,11 +1113,21 @@ class AppDialog(QtGui.QWidget):
         
         :param shotgun_location: Shotgun location object
         """        
+        # remember what the location we are leaving looks like
+        self._store_snapshot()
+
         # chop off history at the point we are currently
         self._history_items = self._history_items[:self._history_index]
         # add new record
         self._history_index += 1
         self._history_items.append(shotgun_location)
+
+        # evict the oldest records if the history is full
+        num_evicted = len(self._history_items) - max(self._app.get_setting("max_history_items"), 1)
+        if num_evicted > 0:
+            self._history_items = self._history_items[num_evicted:]
+            self._history_index -= num_evicted
+
         self._compute_history_button_visibility()
         
         # set the current location
@@ -820,7 +1140,7 @@ class AppDialog(QtGui.QWidget):
             self.setup_ui()
         finally:
             self._navigating = False
-    
+
     def _compute_history_button_visibility(self):
         """
         Helper method which ensures history buttons are rendered correctly
@@ -867,6 +1187,7 @@ class AppDialog(QtGui.QWidget):
         """
         Navigate to the next item in the history
         """
+        self._store_snapshot()
         self._history_index += 1
         # get the data for this guy (note: index are one based)
         self._current_location = self._history_items[self._history_index-1]
@@ -875,7 +1196,7 @@ class AppDialog(QtGui.QWidget):
         # and set up the UI for this new location
         self._navigating = True
         try:
-            self.setup_ui()
+            self.setup_ui(from_history=True)
         finally:
             self._navigating = False
 
@@ -883,6 +1204,7 @@ class AppDialog(QtGui.QWidget):
         """
         Navigate back in history
         """
+        self._store_snapshot()
         self._history_index += -1
         # get the data for this guy (note: index are one based)
         self._current_location = self._history_items[self._history_index-1]
@@ -891,7 +1213,7 @@ class AppDialog(QtGui.QWidget):
         # and set up the UI for this new location
         self._navigating = True
         try:
-            self.setup_ui()
+            self.setup_ui(from_history=True)
         finally:
             self._navigating = False
 
@@ -0,0 +1,191 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import sgtk
+from sgtk.platform.qt import QtCore
+
+shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
+shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_data")
+
+
+def fetch_changed_entities(sg, high_water_mark, max_events, project):
+    """
+    Reads the event log entries created after the given high water mark
+    and returns the records they touched.
+    This is designed to be executed by a data retriever worker.
+
+    If no high water mark is given, no events are read. Instead, the id
+    of the most recent event is returned so that it can be used as the
+    high water mark for subsequent calls.
+
+    :param sg: Shotgun API instance
+    :param high_water_mark: Id of the last event seen, or None
+    :param max_events: Maximum number of events to read. Any remaining
+        events are returned by the next call.
+    :param project: Project entity link. Only events for this project and
+        for records which don't belong to a project are read. If None,
+        events for the whole site are read.
+    :returns: tuple with (new high water mark, changed records), where changed
+        records is a dictionary of entity ids, keyed by entity type.
+    """
+    if high_water_mark is None:
+        sg_event = sg.find_one(
+            "EventLogEntry",
+            [],
+            ["id"],
+            order=[{"field_name": "id", "direction": "desc"}]
+        )
+        return (sg_event["id"] if sg_event else 0, {})
+
+    filters = [
+        ["id", "greater_than", high_water_mark],
+        # only record changes, not logins and toolkit events
+        ["event_type", "starts_with", "Shotgun_"],
+    ]
+    if project:
+        filters.append({
+            "filter_operator": "any",
+            "filters": [
+                ["project", "is", {"type": project["type"], "id": project["id"]}],
+                ["project", "is", None],
+            ]
+        })
+
+    sg_events = sg.find(
+        "EventLogEntry",
+        filters,
+        ["entity", "meta"],
+        order=[{"field_name": "id", "direction": "asc"}],
+        limit=max_events
+    )
+
+    changed = {}
+    for sg_event in sg_events:
+        high_water_mark = max(high_water_mark, sg_event["id"])
+
+        entity = sg_event.get("entity")
+        if entity:
+            (entity_type, entity_id) = (entity["type"], entity["id"])
+        else:
+            # the link is empty for retired records
+            meta = sg_event.get("meta") or {}
+            (entity_type, entity_id) = (meta.get("entity_type"), meta.get("entity_id"))
+
+        if entity_type and entity_id:
+            changed.setdefault(entity_type, []).append(entity_id)
+
+    return (high_water_mark, changed)
+
+
+class EventLogPoller(QtCore.QObject):
+    """
+    Polls the Shotgun event log at a regular interval and reports
+    which records have been created, updated or removed since the
+    last poll, so that only the affected data needs to be refreshed.
+    Only events for the project of the current context, and for records
+    which don't belong to a project, are read.
+
+    Each poll is a single query for the events after the last event
+    seen. The first poll only establishes that starting point.
+
+    :signal entities_changed(dict): Emitted with a dictionary of
+        changed entity ids, keyed by entity type.
+    """
+
+    entities_changed = QtCore.Signal(dict)
+
+    # maximum number of events to read per poll
+    MAX_EVENTS_PER_POLL = 500
+
+    def __init__(self, parent, bg_task_manager):
+        """
+        :param parent: QT parent object
+        :param bg_task_manager: Task manager to use for background work
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        self._app = sgtk.platform.current_bundle()
+
+        # id of the last event seen
+        self._high_water_mark = None
+        self._sg_query_id = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self._app.get_setting("event_log_poll_interval") * 1000)
+        self._timer.timeout.connect(self._poll)
+
+        self.__sg_data_retriever = shotgun_data.ShotgunDataRetriever(self,
+                                                                     bg_task_manager=bg_task_manager)
+        self.__sg_data_retriever.start()
+        self.__sg_data_retriever.work_completed.connect(self.__on_worker_signal)
+        self.__sg_data_retriever.work_failure.connect(self.__on_worker_failure)
+
+    def start(self):
+        """
+        Starts polling, unless polling has been disabled
+        by setting the poll interval to zero.
+        """
+        if self._timer.interval() > 0:
+            self._poll()
+
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._timer.stop()
+        self._sg_query_id = None
+        self.__sg_data_retriever.stop()
+
+    ############################################################################################
+    # internal methods
+
+    def _poll(self):
+        """
+        Requests the events since the last poll.
+        """
+        self._sg_query_id = self.__sg_data_retriever.execute_method(
+            fetch_changed_entities,
+            self._high_water_mark,
+            self.MAX_EVENTS_PER_POLL,
+            self._app.context.project
+        )
+
+    def __on_worker_failure(self, uid, msg):
+        """
+        Asynchronous callback - the worker thread errored.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        msg = shotgun_model.sanitize_qt(msg)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            self._app.log_warning("Could not read the event log: %s" % msg)
+            # try again at the next interval
+            self._timer.start()
+
+    def __on_worker_signal(self, uid, request_type, data):
+        """
+        Signaled whenever the worker completes something.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        data = shotgun_model.sanitize_qt(data)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            (self._high_water_mark, changed) = data["return_value"]
+
+            # schedule the next poll only once this one has
+            # completed so that polls never overlap
+            self._timer.start()
+
+            if changed:
+                self._app.log_debug("Event log reports changes to %s" % ", ".join(changed))
+                self.entities_changed.emit(changed)
@@ -0,0 +1,90 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import time
+
+from .lru_cache import LruCache
+
+
+class LookupCache(object):
+    """
+    Holds the results of expensive lookups, such as Shotgun queries,
+    for a limited number of seconds. Results older than that are
+    discarded and looked up again the next time they are needed.
+
+    The cache can be used from several threads at the same time.
+    """
+
+    # maximum number of results to hold
+    MAX_ITEMS = 200
+
+    def __init__(self, max_age):
+        """
+        :param max_age: Number of seconds for which results are held
+        """
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        # (time stamp, value) tuples
+        self._cache = LruCache(self.MAX_ITEMS)
+
+    def get(self, key):
+        """
+        Returns a cached result.
+
+        :param key: Cache key
+        :returns: Cached value or None if the key isn't cached or has expired
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+
+            (time_stamp, value) = entry
+            if time.time() - time_stamp > self._max_age:
+                self._cache.pop(key)
+                return None
+
+            return value
+
+    def set(self, key, value):
+        """
+        Adds a result to the cache.
+
+        :param key: Cache key
+        :param value: Value to cache
+        """
+        with self._lock:
+            self._cache.set(key, (time.time(), value))
+
+    def get_or_fetch(self, key, fn, *args, **kwargs):
+        """
+        Returns a cached result, calling the given function to look it
+        up if it isn't cached. Any arguments are passed on to the function.
+
+        The lock isn't held while the function runs, so threads asking
+        for the same key at the same time may each look it up.
+
+        :param key: Cache key
+        :param fn: Function returning the value for the key
+        :returns: Cached or looked up value
+        """
+        value = self.get(key)
+        if value is None:
+            value = fn(*args, **kwargs)
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """
+        Discards all cached results.
+        """
+        with self._lock:
+            self._cache.clear()
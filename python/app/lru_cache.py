@@ -0,0 +1,122 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+from collections import OrderedDict
+
+
+class LruCache(object):
+    """
+    Simple bounded dictionary which discards the least
+    recently used entries once it grows beyond its maximum size.
+
+    The cache can be bounded by number of entries and, if a
+    size function is given, by the total number of bytes held.
+    """
+
+    def __init__(self, max_items, max_bytes=None, size_fn=None):
+        """
+        :param max_items: Maximum number of entries to hold
+        :param max_bytes: Maximum total size of all entries, or None
+            for no size limit.
+        :param size_fn: Callable returning the size in bytes of a value.
+            Required if max_bytes is set.
+        """
+        self._max_items = max_items
+        self._max_bytes = max_bytes
+        self._size_fn = size_fn
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def total_bytes(self):
+        """
+        Total size in bytes of all cached values, as reported
+        by the size function. Always 0 if no size function was given.
+        """
+        return self._total_bytes
+
+    def get(self, key, default=None):
+        """
+        Returns the value for the given key and marks it as recently used.
+
+        :param key: Cache key
+        :param default: Value to return if the key isn't cached
+        :returns: Cached value or default
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            return default
+        self._items[key] = value
+        return value
+
+    def set(self, key, value):
+        """
+        Adds or replaces an entry, evicting the least recently used
+        entries if the cache is full.
+
+        :param key: Cache key
+        :param value: Value to store
+        """
+        self.pop(key)
+        self._items[key] = value
+        if self._size_fn:
+            size = self._size_fn(value)
+            self._sizes[key] = size
+            self._total_bytes += size
+
+        while len(self._items) > self._max_items or self._over_budget():
+            (oldest_key, _) = self._items.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(oldest_key, 0)
+
+    def pop(self, key, default=None):
+        """
+        Removes an entry from the cache.
+
+        :param key: Cache key
+        :param default: Value to return if the key isn't cached
+        :returns: The removed value or default
+        """
+        self._total_bytes -= self._sizes.pop(key, 0)
+        return self._items.pop(key, default)
+
+    def items(self):
+        """
+        Returns all entries, least recently used first,
+        without marking them as used.
+
+        :returns: List of (key, value) tuples
+        """
+        return self._items.items()
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        self._items.clear()
+        self._sizes.clear()
+        self._total_bytes = 0
+
+    def _over_budget(self):
+        """
+        Returns True if the cache holds more bytes than allowed.
+        """
+        return (
+            self._max_bytes is not None and
+            self._total_bytes > self._max_bytes and
+            len(self._items) > 0
+        )
@@ -14,7 +14,9 @@ import sgtk
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
 ShotgunModel = shotgun_model.ShotgunModel
 
-class SgAllFieldsModel(ShotgunModel):
+from .batch_loader import BatchLoadableMixin
+
+class SgAllFieldsModel(BatchLoadableMixin, ShotgunModel):
     """
     Model that represents all the fields for an entity, as defined
     by a shotgun location object.
@@ -68,6 +70,14 @@ class SgAllFieldsModel(ShotgunModel):
         sg_data = self._get_sg_data()
         self.data_updated.emit(sg_data)
 
+    def _is_affected_by(self, entity_ids):
+        """
+        Returns True if the loaded record is among the given changed records.
+
+        :param entity_ids: Set of changed entity ids
+        """
+        return self._sg_location.entity_id in entity_ids
+
     ############################################################################################
     # public interface
 
@@ -82,11 +92,10 @@ class SgAllFieldsModel(ShotgunModel):
         filters = [ ["id", "is", self._sg_location.entity_id ] ]
         hierarchy = ["id"]
 
-        ShotgunModel._load_data(self, 
-                                       sg_location.sg_formatter.entity_type, 
-                                       filters,
-                                       hierarchy, 
-                                       sg_location.sg_formatter.all_fields)
+        self._load_data(sg_location.sg_formatter.entity_type, 
+                        filters,
+                        hierarchy, 
+                        sg_location.sg_formatter.all_fields)
         # signal to any views that data now may be available
         self.data_updated.emit(self._get_sg_data())
         self._refresh_data()
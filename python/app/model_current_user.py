@@ -11,12 +11,14 @@
 from sgtk.platform.qt import QtCore, QtGui
 import sgtk
 from . import utils
+from .batch_loader import BatchLoadableMixin
+from .user_avatar_cache import UserAvatarCache
 
 # import the shotgun_model module from the shotgun utils framework
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
 ShotgunModel = shotgun_model.ShotgunModel
 
-class SgCurrentUserModel(ShotgunModel):
+class SgCurrentUserModel(BatchLoadableMixin, ShotgunModel):
     """
     Model that caches data about the current user.
     
@@ -78,6 +80,10 @@ class SgCurrentUserModel(ShotgunModel):
         self._current_pixmap = utils.create_round_thumbnail(image)
         self.thumbnail_updated.emit()
 
+        # share the thumbnail with the rest of the app
+        sg_data = item.get_sg_data()
+        UserAvatarCache.instance().set(sg_data["id"], image, path)
+
     ############################################################################################
     # public interface
     
@@ -96,13 +102,18 @@ class SgCurrentUserModel(ShotgunModel):
         else:
             self._current_user_sg_dict = {"type": sg_user_data["type"], 
                                           "id": sg_user_data["id"]}
+
+            # display the thumbnail right away if it has already been retrieved
+            avatar = UserAvatarCache.instance().get(sg_user_data["id"])
+            if avatar:
+                self._current_pixmap = utils.create_round_thumbnail(avatar[0])
+                self.thumbnail_updated.emit()
             hierarchy = ["id"]
             fields = ["image", "login", "name", "department", "firstname", "surname"]
-            ShotgunModel._load_data(self, 
-                                    sg_user_data["type"],
-                                    [["id", "is", sg_user_data["id"]]], 
-                                    hierarchy,
-                                    fields)
+            self._load_data(sg_user_data["type"],
+                            [["id", "is", sg_user_data["id"]]], 
+                            hierarchy,
+                            fields)
         
             # signal to any views that data now may be available
             self.data_updated.emit()
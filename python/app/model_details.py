@@ -15,7 +15,10 @@ import sgtk
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
 ShotgunModel = shotgun_model.ShotgunModel
 
-class SgEntityDetailsModel(ShotgunModel):
+from .batch_loader import BatchLoadableMixin
+from .thumbnail_compositor import ThumbnailCompositor
+
+class SgEntityDetailsModel(BatchLoadableMixin, ShotgunModel):
     """
     Model that represents the details data that is 
     displayed in the top section of the UI.
@@ -46,6 +49,11 @@ class SgEntityDetailsModel(ShotgunModel):
         self._current_pixmap = None
         self.data_refreshed.connect(self._on_data_refreshed)
 
+        # composites the thumbnail in the background
+        self._thumbnail_compositor = ThumbnailCompositor(self, bg_task_manager)
+        self._thumbnail_compositor.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self._thumbnail_request_id = None
+
     def _on_data_refreshed(self):
         """
         helper method. dispatches the after-refresh signal
@@ -95,34 +103,63 @@ class SgEntityDetailsModel(ShotgunModel):
             return
         
         sg_data = item.get_sg_data()
-        self._current_pixmap = self._sg_location.sg_formatter.create_thumbnail(image, sg_data)
-        self.thumbnail_updated.emit()
+        variant = self._sg_location.sg_formatter.get_thumbnail_variant(sg_data)
+        self._thumbnail_request_id = self._thumbnail_compositor.request(image, path, variant)
+
+    def _on_thumbnail_ready(self, request_id, image):
+        """
+        Called when a composited thumbnail is ready.
+
+        :param request_id: Id of the compositing request
+        :param image: Composited QImage
+        """
+        if request_id == self._thumbnail_request_id:
+            self._thumbnail_request_id = None
+            self._current_pixmap = QtGui.QPixmap.fromImage(image)
+            self.thumbnail_updated.emit()
+
+    def _is_affected_by(self, entity_ids):
+        """
+        Returns True if the loaded record is among the given changed records.
+
+        :param entity_ids: Set of changed entity ids
+        """
+        return self._sg_location.entity_id in entity_ids
 
     ############################################################################################
     # public interface
 
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._thumbnail_request_id = None
+        self._thumbnail_compositor.destroy()
+        ShotgunModel.destroy(self)
+
     def load_data(self, sg_location):
         """
         Clears the model and sets it up for a particular entity.
         Loads any cached data that exists and requests an async update.
         
-        The fields defined in the sg_location.sg_formatter.fields 
+        The fields defined in the sg_location.sg_formatter.detail_fields 
         property will be loaded.
         
         :param sg_location: Shotgun Location object of the object to load.
         """
         # set the current location to represent
         self._sg_location = sg_location
+        # discard any thumbnail being composited for the previous location
+        self._thumbnail_request_id = None
           
-        fields = sg_location.sg_formatter.fields + sg_location.sg_formatter.thumbnail_fields
+        fields = sg_location.sg_formatter.detail_fields + sg_location.sg_formatter.thumbnail_fields
 
         hierarchy = ["id"]
         
-        ShotgunModel._load_data(self, 
-                                sg_location.entity_type, 
-                                [["id", "is", sg_location.entity_id]], 
-                                hierarchy,
-                                fields)
+        self._load_data(sg_location.entity_type, 
+                        [["id", "is", sg_location.entity_id]], 
+                        hierarchy,
+                        fields)
         
         # signal to any views that data now may be available
         self.data_updated.emit()
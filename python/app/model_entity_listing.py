@@ -9,15 +9,47 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 
+import datetime
+import time
+
 from sgtk.platform.qt import QtCore, QtGui
 import sgtk
 from .shotgun_formatter import ShotgunTypeFormatter
+from .batch_loader import BatchLoadableMixin, run_freshness_queries
+from .timestamp_renderer import TimestampRenderer
+from .thumbnail_compositor import ThumbnailCompositor
+from .thumbnail_cache import ThumbnailCache
 
 # import the shotgun_model module from the shotgun utils framework
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
+shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_data")
 ShotgunModel = shotgun_model.ShotgunModel
 
-class SgEntityListingModel(ShotgunModel):
+
+def find_page(sg, entity_type, filters, fields, order, page_size, page):
+    """
+    Retrieves a page of records. Timestamps are converted to unix
+    time, the same way as for records loaded by ShotgunModel.
+    This is designed to be executed by a data retriever worker.
+
+    :param sg: Shotgun API instance
+    :param entity_type: Entity type to query
+    :param filters: Query filters
+    :param fields: Fields to retrieve
+    :param order: Query order
+    :param page_size: Number of records on each page
+    :param page: Page to retrieve, starting from one
+    :returns: List of shotgun dictionaries
+    """
+    sg_records = sg.find(entity_type, filters, fields, order=order, limit=page_size, page=page)
+    for sg_record in sg_records:
+        for (field, value) in sg_record.items():
+            if isinstance(value, datetime.datetime):
+                sg_record[field] = time.mktime(value.timetuple())
+    return sg_records
+
+
+class SgEntityListingModel(BatchLoadableMixin, ShotgunModel):
     """
     Model used to display long listings of data in the tabs.
     
@@ -26,12 +58,52 @@ class SgEntityListingModel(ShotgunModel):
     
     The associated object is defined in the shotgun location.
     
-    The returned data in this model is capped so that it will at
-    the most contain SG_RECORD_LIMIT items.
+    The data is loaded one page at a time. The first page is loaded
+    by load_data() and subsequent pages are loaded as the view scrolls
+    towards the bottom of the listing, via the canFetchMore() and
+    fetchMore() methods. The listing_page_size and listing_max_records
+    app settings control the size of each page and the maximum number
+    of items a listing can grow to.
+
+    The first page is the query managed by ShotgunModel, which caches
+    and refreshes it. Each subsequent page is queried on its own and
+    its items are appended to the model, leaving the items already
+    loaded untouched. Appended items are not cached.
+
+    When the enable_freshness_probe app setting is on, refreshing a listing
+    which has cached data first probes Shotgun for the ids and revisions of
+    all the records, and only re-runs the full query if records have been
+    added, removed or updated since the cached data was retrieved. The full
+    query then replaces all the data; changes are not merged.
+
+    List item details are formatted once, as data arrives, and stored
+    on each item in the LIST_ITEM_DETAILS_ROLE role. Items which display
+    relative time stamps are formatted again when their time stamps move
+    into a new formatting bracket.
+
+    Once a display size has been set via :meth:`set_thumbnail_size`,
+    thumbnails are scaled down to that size as they are composited and
+    kept in the shared :class:`ThumbnailCache` rather than on the items.
+    Items hold the cache key in the THUMBNAIL_KEY_ROLE role.
     """
-    
-    # maximum number of items to show in the listings
-    SG_RECORD_LIMIT = 50
+
+    # role holding a (updated_at, top_left, top_right, body) tuple
+    # with the formatted list item details for an item
+    LIST_ITEM_DETAILS_ROLE = QtCore.Qt.UserRole + 1001
+
+    # role holding the unix time at which the formatted details
+    # of an item go stale, or None
+    LIST_ITEM_EXPIRY_ROLE = QtCore.Qt.UserRole + 1002
+
+    # role holding the ThumbnailCache key for the thumbnail of an
+    # item, as a (source path, variant, width, height) tuple
+    THUMBNAIL_KEY_ROLE = QtCore.Qt.UserRole + 1003
+
+    # role holding True if an item should be highlighted, see _is_highlighted()
+    HIGHLIGHTED_ROLE = QtCore.Qt.UserRole + 1004
+
+    # fields which are displayed as relative time stamps
+    TIMESTAMP_FIELDS = ["created_at", "updated_at"]
     
     def __init__(self, entity_type, parent, bg_task_manager):
         """
@@ -40,8 +112,33 @@ class SgEntityListingModel(ShotgunModel):
         :param entity_type: The entity type that should be loaded into this model.
         :param parent: QT parent object
         """
+        self._app = sgtk.platform.current_bundle()
         self._sg_location = None
         self._sg_formatter = ShotgunTypeFormatter(entity_type)
+
+        self._page_size = max(self._app.get_setting("listing_page_size"), 1)
+        self._max_records = max(self._app.get_setting("listing_max_records"), self._page_size)
+
+        # the arguments for the current paginated query and the number of
+        # records currently requested. The query is None if the model
+        # wasn't loaded via load_data()
+        self._paged_query = None
+        self._record_limit = None
+        # True if the last page returned a full page of records, False if
+        # it didn't, or None if no page has been retrieved from Shotgun yet
+        self._more_available = None
+        # ids of the items appended beyond the first page
+        self._appended_ids = set()
+
+        # list item details formatted in the last data processing pass, keyed by id
+        self._formatted_items = {}
+
+        # time stamp fields displayed in the list items
+        formatter_fields = self._sg_formatter.list_fields
+        self._timestamp_fields = [f for f in self.TIMESTAMP_FIELDS if f in formatter_fields]
+
+        self._timestamp_renderer = TimestampRenderer.instance()
+        self._timestamp_renderer.bracket_crossed.connect(self._on_timestamp_bracket_crossed)
         
         # init base class
         ShotgunModel.__init__(self,
@@ -50,9 +147,70 @@ class SgEntityListingModel(ShotgunModel):
                               bg_load_thumbs=True,
                               bg_task_manager=bg_task_manager)
 
+        self.data_refreshed.connect(self._on_data_processed)
+        self.data_refresh_fail.connect(self._on_data_processed)
+
+        # retriever used to fetch subsequent pages and to check
+        # cached data against Shotgun before refreshing
+        self._page_query_id = None
+        self._freshness_query_id = None
+        self._freshness_probe_enabled = self._app.get_setting("enable_freshness_probe")
+        self.__sg_data_retriever = shotgun_data.ShotgunDataRetriever(self,
+                                                                     bg_task_manager=bg_task_manager)
+        self.__sg_data_retriever.start()
+        self.__sg_data_retriever.work_completed.connect(self.__on_worker_signal)
+        self.__sg_data_retriever.work_failure.connect(self.__on_worker_failure)
+
+        # composites thumbnails in the background. Items waiting for
+        # a thumbnail are tracked by request id, together with the cache
+        # key of the thumbnail. Requests are also tracked by cache key,
+        # so that each thumbnail is only requested once.
+        self._thumbnail_compositor = ThumbnailCompositor(self, bg_task_manager)
+        self._thumbnail_compositor.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self._pending_thumbnails = {}
+        self._pending_thumbnail_keys = {}
+
+        # size at which thumbnails are displayed, or None for full size
+        self._thumbnail_size = None
+        self._thumbnail_cache = ThumbnailCache.instance()
+
     ############################################################################################
     # public interface
 
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._pending_thumbnails = {}
+        self._pending_thumbnail_keys = {}
+        self._thumbnail_compositor.destroy()
+        self.__sg_data_retriever.stop()
+        ShotgunModel.destroy(self)
+
+    def set_thumbnail_size(self, size):
+        """
+        Sets the size at which thumbnails are displayed. Thumbnails
+        arriving after this call are scaled down to this size and
+        stored in the shared thumbnail cache.
+
+        :param size: QSize
+        """
+        self._thumbnail_size = size
+
+    def reload_thumbnail(self, model_index):
+        """
+        Requests the thumbnail for an item to be composited again after it
+        has been evicted from the thumbnail cache. This is fast since the
+        composited thumbnail is loaded from disk in the background.
+
+        :param model_index: Index of the item in this model
+        """
+        key = shotgun_model.get_sanitized_data(model_index, self.THUMBNAIL_KEY_ROLE)
+        if key:
+            (path, variant, _, _) = key
+            index = QtCore.QPersistentModelIndex(model_index)
+            self._request_thumbnail_for_indexes([index], None, path, variant)
+
     def get_formatter(self):
         """
         Returns the shotgun location associated with this model.
@@ -61,16 +219,6 @@ class SgEntityListingModel(ShotgunModel):
         """
         return self._sg_formatter
 
-    def is_highlighted(self, model_index):
-        """
-        Compute if a model index belonging to this model 
-        should be highlighted.
-        
-        This can be subclassed by models that have a special
-        concept which defines highlighting.
-        """
-        return False
-
     def load_data(self, sg_location, additional_fields=None, sort_field=None):
         """
         Clears the model and sets it up for a particular entity.
@@ -90,12 +238,18 @@ class SgEntityListingModel(ShotgunModel):
                is the main 'text' field in the model that is set.
         """
         self._sg_location = sg_location
+        self._paged_query = None
+        self._more_available = None
+        self._appended_ids = set()
+        self.__sg_data_retriever.clear()
+        self._page_query_id = None
+        self._freshness_query_id = None
         
         # if a sort field has not been specified, default to 
         # update date (unix time), in descending order
         sort_field = sort_field or "updated_at"
         
-        fields = self._sg_formatter.fields
+        fields = self._sg_formatter.list_fields
         if additional_fields:
             fields += additional_fields
             
@@ -111,18 +265,357 @@ class SgEntityListingModel(ShotgunModel):
             self.data_refresh_fail.emit(exc.message)
             return
 
-        ShotgunModel._load_data(self, 
-                                self._sg_formatter.entity_type, 
-                                filters, 
-                                hierarchy, 
-                                fields, 
-                                [{"field_name": sort_field, 
-                                  "direction": "desc"}],
-                                limit=self.SG_RECORD_LIMIT)
+        # start off with the first page
+        self._record_limit = self._page_size
+        self._paged_query = (
+            self._sg_formatter.entity_type,
+            filters,
+            hierarchy,
+            fields,
+            [{"field_name": sort_field, "direction": "desc"}]
+        )
+        self._load_paged_query()
+
+    def canFetchMore(self, parent):
+        """
+        Returns True if there are more records to load for the current listing.
+        If the last page returned less records than requested, the listing
+        is already complete.
+
+        :param parent: Parent model index
+        :returns: True if fetchMore() can load another page
+        """
+        if parent.isValid() or self._paged_query is None or self._page_query_id:
+            return False
+
+        if self._record_limit >= self._max_records:
+            return False
+
+        if self._more_available is None:
+            # only cached data so far
+            return self.rowCount() >= self._record_limit
+
+        return self._more_available
+
+    def fetchMore(self, parent):
+        """
+        Requests the next page of records for the current listing.
+        This is called by views as they approach the end of the listing.
+
+        :param parent: Parent model index
+        """
+        if not self.canFetchMore(parent):
+            return
+
+        (entity_type, filters, _, fields, order) = self._paged_query
+        self._app.log_debug(
+            "Fetching records %d to %d for %s" % (
+                self._record_limit + 1,
+                self._record_limit + self._page_size,
+                self._sg_location
+            )
+        )
+        # records are requested by offset. Shotgun pages are numbered
+        # from one and the first page is held by the main query.
+        self._page_query_id = self.__sg_data_retriever.execute_method(
+            find_page,
+            entity_type,
+            filters,
+            fields,
+            order,
+            self._page_size,
+            (self._record_limit // self._page_size) + 1
+        )
+
+    def invalidate(self, changed_entities):
+        """
+        Requests a refresh if the loaded data may be affected by
+        changes to the given records in Shotgun. This is the case if
+        any of the listed records have changed, or if the record which
+        the listing is for has changed, for example because records
+        have been linked to or unlinked from it.
+
+        :param changed_entities: Dictionary of sets of changed entity ids,
+            keyed by entity type.
+        :returns: True if a refresh was requested
+        """
+        if self._sg_query is None or not self._is_location_changed(changed_entities):
+            return BatchLoadableMixin.invalidate(self, changed_entities)
+
         self._refresh_data()
+        return True
 
     ############################################################################################
     # protected methods
+
+    def _is_location_changed(self, changed_entities):
+        """
+        Returns True if the record which the listing is for is among
+        the given changed records.
+
+        :param changed_entities: Dictionary of sets of changed entity ids,
+            keyed by entity type.
+        """
+        if self._sg_location is None:
+            return False
+        changed_ids = changed_entities.get(self._sg_location.entity_type) or set()
+        return self._sg_location.entity_id in changed_ids
+
+    def _is_affected_by(self, entity_ids):
+        """
+        Returns True if any of the listed records are among the given
+        changed records. Records which have been linked to the record the
+        listing is for are picked up by :meth:`_is_location_changed`.
+
+        :param entity_ids: Set of changed entity ids
+        """
+        return any(sg_data["id"] in entity_ids for sg_data in self._get_cached_records())
+
+    def _load_paged_query(self):
+        """
+        Loads the first page of the current paginated query.
+        Cached records are displayed right away and a refresh is requested.
+        """
+        (entity_type, filters, hierarchy, fields, order) = self._paged_query
+        self._load_data(entity_type,
+                        filters,
+                        hierarchy,
+                        fields,
+                        order,
+                        limit=self._page_size)
+        self._refresh_data()
+
+    def _append_page(self, sg_data_list):
+        """
+        Appends the records of a subsequent page to the listing.
+        Records which are listed already are skipped.
+
+        :param sg_data_list: list of shotgun dictionaries, as returned by the find() call.
+        """
+        self._record_limit += self._page_size
+        self._more_available = len(sg_data_list) >= self._page_size
+
+        existing_records = BatchLoadableMixin._get_cached_records(self)
+        existing_ids = set(sg_data["id"] for sg_data in existing_records)
+
+        # cull against the listed records, so that a record on this
+        # page which is superseded by one already listed is skipped
+        sg_data_list = self._cull_records(existing_records + list(sg_data_list))
+        sg_data_list = [sg_data for sg_data in sg_data_list if sg_data["id"] not in existing_ids]
+
+        formatted_items = self._sg_formatter.format_list_items(sg_data_list)
+        self._formatted_items = dict(
+            (sg_data["id"], details) for (sg_data, details) in zip(sg_data_list, formatted_items)
+        )
+
+        (_, _, hierarchy, _, _) = self._paged_query
+        for sg_data in sg_data_list:
+            item = shotgun_model.ShotgunStandardItem(str(sg_data.get(hierarchy[0])))
+            item.setData(shotgun_model.sanitize_for_qt_model(sg_data), self.SG_DATA_ROLE)
+            self._populate_default_thumbnail(item)
+            self._populate_item(item, sg_data)
+            self.appendRow(item)
+            self._appended_ids.add(sg_data["id"])
+
+            for field in self._sg_formatter.thumbnail_fields:
+                if sg_data.get(field):
+                    self._request_thumbnail_download(
+                        item, field, sg_data[field], sg_data["type"], sg_data["id"]
+                    )
+
+        self._formatted_items = {}
+
+    def _remove_appended_items(self, entity_ids):
+        """
+        Removes appended items with the given ids, for example because
+        the records have moved onto the first page.
+
+        :param entity_ids: Set of record ids
+        """
+        for row in reversed(range(self.rowCount())):
+            sg_data = self.item(row).get_sg_data()
+            if sg_data and sg_data["id"] in self._appended_ids and sg_data["id"] in entity_ids:
+                self._appended_ids.discard(sg_data["id"])
+                self.removeRow(row)
+
+    def _get_cached_records(self):
+        """
+        Returns the records held by the model for the first page,
+        which is what freshness checks compare against.
+
+        :returns: List of shotgun dictionaries
+        """
+        return [
+            sg_data for sg_data in BatchLoadableMixin._get_cached_records(self)
+            if sg_data["id"] not in self._appended_ids
+        ]
+
+    def _refresh_data(self):
+        """
+        Requests a refresh of the loaded data. If the freshness probe is
+        enabled, cached data is checked against Shotgun first and the full
+        query is only run if something has changed. No request is made if another session
+        has recently retrieved the same records.
+        """
+        if self._defer_refresh:
+            return
+
+        if self.is_shared_data_current():
+            self._skip_refresh()
+            return
+
+        query = self.get_freshness_query()
+        if not self._freshness_probe_enabled or query is None or self.rowCount() == 0:
+            SgEntityListingModel.refresh(self)
+            return
+
+        self._freshness_query_id = self.__sg_data_retriever.execute_method(
+            run_freshness_queries,
+            [query]
+        )
+
+    def __on_worker_failure(self, uid, msg):
+        """
+        Asynchronous callback - the worker thread errored.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        msg = shotgun_model.sanitize_qt(msg)
+
+        if uid == self._freshness_query_id:
+            self._freshness_query_id = None
+            self._app.log_debug("Freshness probe failed, running full refresh: %s" % msg)
+            SgEntityListingModel.refresh(self)
+
+        elif uid == self._page_query_id:
+            self._page_query_id = None
+            self._app.log_warning("Could not fetch more records: %s" % msg)
+
+    def __on_worker_signal(self, uid, request_type, data):
+        """
+        Signaled whenever the worker completes something.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        data = shotgun_model.sanitize_qt(data)
+
+        if uid == self._freshness_query_id:
+            self._freshness_query_id = None
+            sg_records = data["return_value"][0]
+            if self.is_data_current(sg_records):
+                self._app.log_debug("Cached data for %r is up to date." % self)
+                self.mark_data_current()
+                # let listeners know that the refresh has completed
+                self.data_refreshed.emit(False)
+            else:
+                SgEntityListingModel.refresh(self)
+
+        elif uid == self._page_query_id:
+            self._page_query_id = None
+            self._append_page(data["return_value"])
+
+    def _on_data_processed(self, *args):
+        """
+        Called when the model has finished refreshing.
+        """
+        self._formatted_items = {}
+
+    def _before_data_processing(self, sg_data_list):
+        """
+        Called just after data has been retrieved from Shotgun but before any processing
+        takes place. Culls the data and formats the list item details for all
+        records in one go.
+
+        :param sg_data_list: list of shotgun dictionaries, as returned by the find() call.
+        :returns: should return a list of shotgun dictionaries, on the same form as the input.
+        """
+        if self._paged_query is not None and not self._appended_ids:
+            # compare against the number of records returned by
+            # Shotgun, since culling may list fewer
+            self._more_available = len(sg_data_list) >= self._page_size
+
+        # records which have moved onto the first page are
+        # loaded as part of it rather than as appended items
+        self._remove_appended_items(set(sg_data["id"] for sg_data in sg_data_list))
+
+        sg_data_list = BatchLoadableMixin._before_data_processing(self, sg_data_list)
+
+        formatted_items = self._sg_formatter.format_list_items(sg_data_list)
+        self._formatted_items = dict(
+            (sg_data["id"], details) for (sg_data, details) in zip(sg_data_list, formatted_items)
+        )
+
+        return sg_data_list
+
+    def _populate_item(self, item, sg_data):
+        """
+        Whenever an item is constructed, this method is called. Stores
+        the formatted list item details on the item, so that views
+        don't have to format the data when painting.
+
+        :param item: QStandardItem that is about to be added to the model.
+        :param sg_data: Shotgun data dictionary that was received from Shotgun.
+        """
+        if not sg_data:
+            return
+
+        details = self._formatted_items.pop(sg_data.get("id"), None)
+        if details is None:
+            # item loaded from cache
+            details = self._sg_formatter.format_list_items([sg_data])[0]
+
+        self._set_item_details(item, sg_data, details)
+        item.setData(self._is_highlighted(sg_data), self.HIGHLIGHTED_ROLE)
+
+    def _is_highlighted(self, sg_data):
+        """
+        Compute if an item should be highlighted. This is evaluated
+        as items are populated and stored in the HIGHLIGHTED_ROLE role,
+        so that views don't have to work it out when painting.
+
+        This can be subclassed by models that have a special
+        concept which defines highlighting.
+
+        :param sg_data: Shotgun data dictionary for the item
+        :returns: True if the item should be highlighted
+        """
+        return False
+
+    def _set_item_details(self, item, sg_data, details):
+        """
+        Stores formatted list item details on an item and keeps track
+        of when they go stale.
+
+        :param item: QStandardItem to update
+        :param sg_data: Shotgun data dictionary for the item
+        :param details: tuple with formatted (top_left, top_right, body) strings
+        """
+        expiry = None
+        for field_name in self._timestamp_fields:
+            if sg_data.get(field_name) is not None:
+                field_expiry = self._timestamp_renderer.get_expiry(sg_data[field_name])
+                if field_expiry is not None and (expiry is None or field_expiry < expiry):
+                    expiry = field_expiry
+
+        item.setData((sg_data.get("updated_at"),) + tuple(details), self.LIST_ITEM_DETAILS_ROLE)
+        item.setData(expiry, self.LIST_ITEM_EXPIRY_ROLE)
+        self._timestamp_renderer.watch(expiry)
+
+    def _on_timestamp_bracket_crossed(self, now):
+        """
+        Called when displayed time stamps have moved into a new formatting
+        bracket. Formats the affected items again.
+
+        :param now: Current unix time
+        """
+        for row in range(self.rowCount()):
+            item = self.item(row)
+            expiry = shotgun_model.sanitize_qt(item.data(self.LIST_ITEM_EXPIRY_ROLE))
+            if expiry is None or expiry > now:
+                continue
+
+            sg_data = item.get_sg_data()
+            if sg_data:
+                details = self._sg_formatter.format_list_items([sg_data])[0]
+                self._set_item_details(item, sg_data, details)
     
     def _get_filters(self):
         """
@@ -169,6 +662,92 @@ class SgEntityListingModel(ShotgunModel):
             # ignore and not display.
             return
         
-        sg_data = item.get_sg_data()
-        icon = self._sg_formatter.create_thumbnail(image, sg_data)
-        item.setIcon(QtGui.QIcon(icon))
+        self._request_thumbnail(item, image, path, self._sg_formatter.get_thumbnail_variant(item.get_sg_data()))
+
+    def _request_thumbnail(self, item, image, path, variant):
+        """
+        Composites a thumbnail in the background and
+        sets it as the icon of the given item once ready.
+
+        :param item: QStandardItem which is associated with the given thumbnail
+        :param image: QImage source image
+        :param path: A path on disk to the source image, or None
+        :param variant: Thumbnail variant, see ShotgunTypeFormatter.get_thumbnail_variant()
+        """
+        self._request_thumbnail_for_indexes([QtCore.QPersistentModelIndex(item.index())], image, path, variant)
+
+    def _request_thumbnail_for_indexes(self, indexes, image, path, variant):
+        """
+        Composites a thumbnail in the background and
+        sets it as the icon of all the given items once ready.
+
+        :param indexes: List of QPersistentModelIndex objects for the items
+        :param image: QImage source image, or None to load it from the path
+        :param path: A path on disk to the source image, or None
+        :param variant: Thumbnail variant, see ShotgunTypeFormatter.get_thumbnail_variant()
+        """
+        indexes = [index for index in indexes if index.isValid()]
+        if not indexes:
+            return
+
+        key = None
+        if self._thumbnail_size and path:
+            key = (path, variant, self._thumbnail_size.width(), self._thumbnail_size.height())
+
+            if self._thumbnail_cache.get(key) is not None:
+                # the same thumbnail is already displayed elsewhere
+                self._set_thumbnail_key(indexes, key)
+                return
+
+            if key in self._pending_thumbnail_keys:
+                # the thumbnail has already been requested
+                request_id = self._pending_thumbnail_keys[key]
+                self._pending_thumbnails[request_id][1].extend(indexes)
+                return
+
+        request_id = self._thumbnail_compositor.request(image, path, variant, self._thumbnail_size)
+        self._pending_thumbnails[request_id] = (key, indexes)
+        if key:
+            self._pending_thumbnail_keys[key] = request_id
+
+    def _on_thumbnail_ready(self, request_id, image):
+        """
+        Called when a composited thumbnail is ready.
+
+        :param request_id: Id of the compositing request
+        :param image: Composited QImage
+        """
+        if request_id not in self._pending_thumbnails:
+            return
+
+        (key, indexes) = self._pending_thumbnails.pop(request_id)
+        pixmap = QtGui.QPixmap.fromImage(image)
+
+        if key:
+            del self._pending_thumbnail_keys[key]
+            self._thumbnail_cache.set(key, pixmap)
+            self._set_thumbnail_key(indexes, key)
+            return
+
+        icon = QtGui.QIcon(pixmap)
+        for index in indexes:
+            # items may have been removed by a refresh
+            if index.isValid():
+                model_index = self.index(index.row(), index.column(), index.parent())
+                self.itemFromIndex(model_index).setIcon(icon)
+
+    def _set_thumbnail_key(self, indexes, key):
+        """
+        Points items at a thumbnail in the thumbnail cache.
+
+        :param indexes: List of QPersistentModelIndex objects for the items
+        :param key: Thumbnail cache key
+        """
+        for index in indexes:
+            # items may have been removed by a refresh
+            if index.isValid():
+                model_index = self.index(index.row(), index.column(), index.parent())
+                self.itemFromIndex(model_index).setData(key, self.THUMBNAIL_KEY_ROLE)
+                # the key is unchanged when a thumbnail is reloaded, so make
+                # sure that views are notified that the thumbnail is available.
+                self.dataChanged.emit(model_index, model_index)
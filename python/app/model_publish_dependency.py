@@ -0,0 +1,389 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import sgtk
+
+# import the shotgun_model module from the shotgun utils framework
+shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
+shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_data")
+
+from .model_entity_listing import SgEntityListingModel
+from .lru_cache import LruCache
+
+
+def find_dependencies(sg, entity_type, publish_id, dependency_field, num_levels, max_publishes, known_links):
+    """
+    Traverses the dependency graph of a publish level by level. A single
+    query retrieves the links of all publishes on a level which aren't
+    known already. Publishes which have been found already are not followed
+    again, which stops at any cycles, and the traversal stops once
+    max_publishes publishes have been found.
+    This is designed to be executed by a data retriever worker.
+
+    :param sg: Shotgun API instance
+    :param entity_type: PublishedFile or TankPublishedFile
+    :param publish_id: Id of the publish to start from
+    :param dependency_field: Field holding the publishes linked to a publish
+    :param num_levels: Number of levels to traverse
+    :param max_publishes: Maximum number of publishes to find
+    :param known_links: Dictionary of lists of (id, name) tuples for the
+        linked publishes, keyed by publish id
+    :returns: tuple with (list of (id, level, via name) tuples for the
+        publishes found, in the order they were found, dictionary of the
+        links queried, on the same form as known_links). The via name is
+        the name of the publish through which a publish was found, or None
+        for the publishes on the first level.
+    """
+    fetched_links = {}
+    found = []
+    names = {}
+    visited_ids = set([publish_id])
+    level_ids = [publish_id]
+    level = 0
+
+    while level_ids and level < num_levels and len(found) < max_publishes:
+
+        missing_ids = [i for i in level_ids if i not in known_links and i not in fetched_links]
+        if missing_ids:
+            sg_records = sg.find(entity_type, [["id", "in", missing_ids]], [dependency_field])
+            for sg_data in sg_records:
+                fetched_links[sg_data["id"]] = [
+                    (link["id"], link.get("name")) for link in sg_data.get(dependency_field) or []
+                ]
+            # publishes which weren't returned have been removed
+            for missing_id in missing_ids:
+                fetched_links.setdefault(missing_id, [])
+
+        level += 1
+        next_level_ids = []
+        for level_id in level_ids:
+            links = fetched_links.get(level_id)
+            if links is None:
+                links = known_links[level_id]
+            for (linked_id, name) in links:
+                if linked_id not in visited_ids:
+                    visited_ids.add(linked_id)
+                    names[linked_id] = name
+                    next_level_ids.append(linked_id)
+                    found.append((linked_id, level, names.get(level_id)))
+
+        level_ids = next_level_ids
+
+    return (found[:max_publishes], fetched_links)
+
+
+class SgPublishDependencyListingModel(SgEntityListingModel):
+    """
+    Base class for models listing the dependencies of a publish
+    in one direction, across the number of levels set by the
+    dependency_levels setting.
+
+    With a single level, the publishes linked to the publish are
+    queried directly. With more levels, the dependency graph is traversed
+    first in the background, see :func:`find_dependencies`. The links of
+    each publish are cached, so only the publishes which haven't been
+    seen before are queried. The listing then loads the publishes found.
+
+    With more than one level, each item states the level it is on and
+    the publish through which it was found, and the items are sorted by
+    level, with the most recent publishes first on each level.
+
+    Deriving classes define the direction by setting LINK_FIELD
+    and DEPENDENCY_FIELD.
+    """
+
+    # field on the listed publishes which links them to
+    # the publish the listing is for
+    LINK_FIELD = None
+
+    # field on a publish which holds the publishes
+    # listed for it, the reverse of LINK_FIELD
+    DEPENDENCY_FIELD = None
+
+    # number of publishes for which the linked publishes are remembered
+    DEPENDENCY_CACHE_SIZE = 5000
+
+    # number of publishes for which the result of the traversal is remembered
+    CLOSURE_CACHE_SIZE = 100
+
+    def __init__(self, entity_type, parent, bg_task_manager):
+        """
+        Constructor.
+
+        :param entity_type: The entity type that should be loaded into this model.
+                            Needs to be a PublishedFile or TankPublishedFile.
+        :param parent: QT parent object
+        :param bg_task_manager: task manager used to process data
+        """
+        app = sgtk.platform.current_bundle()
+        self._num_levels = max(app.get_setting("dependency_levels"), 1)
+        self._max_publishes = min(
+            max(app.get_setting("dependency_max_publishes"), 1),
+            self.DEPENDENCY_CACHE_SIZE
+        )
+
+        # (id, name) tuples for the publishes linked to a publish, keyed by publish id
+        self._dependency_cache = LruCache(self.DEPENDENCY_CACHE_SIZE)
+        # publishes found by previous traversals, keyed by publish id,
+        # see find_dependencies()
+        self._closure_cache = LruCache(self.CLOSURE_CACHE_SIZE)
+
+        # (id, level, via name) tuples for the publishes to list for the current
+        # publish, or None if the dependency graph hasn't been traversed yet
+        self._closure = None
+        # (level, via name) tuples for the listed publishes, keyed by id
+        self._closure_levels = {}
+
+        # tracking the background task
+        self._sg_query_id = None
+
+        # init base class
+        SgEntityListingModel.__init__(self, entity_type, parent, bg_task_manager)
+
+        self.__sg_data_retriever = shotgun_data.ShotgunDataRetriever(self,
+                                                                     bg_task_manager=bg_task_manager)
+        self.__sg_data_retriever.start()
+        self.__sg_data_retriever.work_completed.connect(self.__on_worker_signal)
+        self.__sg_data_retriever.work_failure.connect(self.__on_worker_failure)
+
+    ############################################################################################
+    # public interface
+
+    def load_data(self, sg_location):
+        """
+        Clears the model and sets it up for a particular entity.
+        Loads any cached data that exists and schedules an async refresh.
+
+        :param sg_location: Location object representing the publish
+               for which dependencies should be loaded.
+        """
+        self._sg_location = sg_location
+        self.__sg_data_retriever.clear()
+        self._sg_query_id = None
+        self._set_closure(None)
+
+        if self._num_levels > 1:
+            self._set_closure(self._closure_cache.get(sg_location.entity_id))
+
+            # always traverse the graph again, reusing the cached links.
+            # Once the traversal has completed, the listing is reloaded
+            # if different publishes were found. When loaded by the
+            # batch loader, this is part of the batch.
+            args = (
+                find_dependencies,
+                self._sg_formatter.entity_type,
+                sg_location.entity_id,
+                self.DEPENDENCY_FIELD,
+                self._num_levels,
+                self._max_publishes,
+                dict(self._dependency_cache.items())
+            )
+            if not self._defer_resolution(*args):
+                self._sg_query_id = self.__sg_data_retriever.execute_method(*args)
+
+        # while the dependency graph is being traversed for the first time,
+        # display whatever is in the cache for the first level and defer
+        # the refresh until the publishes to list are known.
+        defer_refresh = self._defer_refresh
+        if self._num_levels > 1 and self._closure is None:
+            self._defer_refresh = True
+        try:
+            self._load_listing(sg_location)
+        finally:
+            self._defer_refresh = defer_refresh
+
+    def set_resolution_result(self, result):
+        """
+        Called by the batch loader once the dependency graph has been traversed.
+
+        :param result: Value returned by :func:`find_dependencies`
+        :returns: True if the listing has been reloaded
+        """
+        return self._on_dependencies_found(result)
+
+    def set_resolution_error(self, msg):
+        """
+        Called by the batch loader if the dependency graph could not be traversed.
+
+        :param msg: Error message
+        """
+        self._on_dependencies_failed(msg)
+
+    def get_freshness_query(self):
+        """
+        Returns the query needed to check whether the cached data is
+        still current. While the dependency graph is being traversed for
+        the first time, it isn't known which publishes will be listed.
+
+        :returns: Query dictionary or None
+        """
+        if self._num_levels > 1 and self._closure is None:
+            return None
+        return SgEntityListingModel.get_freshness_query(self)
+
+    def invalidate(self, changed_entities):
+        """
+        Requests a refresh if the loaded data may be affected by
+        changes to the given records in Shotgun.
+
+        When several levels are listed and a publish in the graph has
+        changed, the cached links of the changed publishes are discarded
+        and the dependency graph is traversed again.
+
+        :param changed_entities: Dictionary of sets of changed entity ids,
+            keyed by entity type.
+        :returns: True if a refresh was requested
+        """
+        if self._num_levels == 1 or self._sg_location is None:
+            return SgEntityListingModel.invalidate(self, changed_entities)
+
+        # only changes to the publishes in the graph traversed affect the listing
+        changed_ids = [
+            publish_id for publish_id in changed_entities.get(self._sg_formatter.entity_type) or []
+            if publish_id == self._sg_location.entity_id or publish_id in self._closure_levels
+        ]
+        if not changed_ids:
+            return SgEntityListingModel.invalidate(self, changed_entities)
+
+        for publish_id in changed_ids:
+            self._dependency_cache.pop(publish_id)
+
+        self.load_data(self._sg_location)
+        return True
+
+    ############################################################################################
+    # protected methods
+
+    def _load_listing(self, sg_location):
+        """
+        Loads the dependencies of the given publish.
+
+        :param sg_location: Location object representing the publish
+        """
+        # for publishes, sort them by id (e.g. creation date) rather than
+        # by update date.
+        SgEntityListingModel.load_data(self, sg_location, sort_field="id")
+
+    def _get_filters(self):
+        """
+        Return the filter to be used for the current query
+        """
+        if self._closure is not None:
+            return [["id", "in", [publish_id for (publish_id, _, _) in self._closure]]]
+
+        return [[self.LINK_FIELD, "in", [self._sg_location.entity_dict]]]
+
+    def _set_closure(self, closure):
+        """
+        Sets the publishes to list for the current publish.
+
+        :param closure: List of (id, level, via name) tuples, see
+            :func:`find_dependencies`, or None
+        """
+        self._closure = closure
+        self._closure_levels = dict(
+            (publish_id, (level, via_name)) for (publish_id, level, via_name) in closure or []
+        )
+
+    def _populate_item(self, item, sg_data):
+        """
+        Whenever an item is constructed, this method is called. With more
+        than one level, the item text, which the listing is sorted by in
+        descending order, is set so that items are sorted by level first.
+
+        :param item: QStandardItem that is about to be added to the model.
+        :param sg_data: Shotgun data dictionary that was received from Shotgun.
+        """
+        SgEntityListingModel._populate_item(self, item, sg_data)
+
+        level_info = self._closure_levels.get((sg_data or {}).get("id"))
+        if level_info:
+            item.setText("%04d-%012d" % (9999 - level_info[0], sg_data["id"]))
+
+    def _set_item_details(self, item, sg_data, details):
+        """
+        Stores formatted list item details on an item. With more than
+        one level, the level of the item and the publish it was found
+        through are added to the body.
+
+        :param item: QStandardItem to update
+        :param sg_data: Shotgun data dictionary for the item
+        :param details: tuple with formatted (top_left, top_right, body) strings
+        """
+        level_info = self._closure_levels.get(sg_data.get("id"))
+        if level_info:
+            (level, via_name) = level_info
+            if via_name:
+                level_text = "Level %d, via %s" % (level, via_name)
+            else:
+                level_text = "Level %d" % level
+            (top_left, top_right, body) = details
+            details = (top_left, top_right, "%s<br><i>%s</i>" % (body, level_text))
+
+        SgEntityListingModel._set_item_details(self, item, sg_data, details)
+
+    def _on_dependencies_found(self, result):
+        """
+        Called once the dependency graph has been traversed.
+        Reloads the listing if different publishes were found.
+
+        :param result: Value returned by :func:`find_dependencies`
+        :returns: True if the listing has been reloaded
+        """
+        (closure, fetched_links) = result
+        for (publish_id, links) in fetched_links.iteritems():
+            self._dependency_cache.set(publish_id, links)
+
+        if len(closure) >= self._max_publishes:
+            self._app.log_debug(
+                "Listing the first %d dependencies of %s only." % (self._max_publishes, self._sg_location)
+            )
+
+        self._closure_cache.set(self._sg_location.entity_id, closure)
+
+        if closure == self._closure:
+            return False
+
+        self._set_closure(closure)
+        self._load_listing(self._sg_location)
+        return True
+
+    def _on_dependencies_failed(self, msg):
+        """
+        Called if the dependency graph could not be traversed.
+
+        :param msg: Error message
+        """
+        self._app.log_warning("Could not resolve dependencies: %s" % msg)
+        if self._closure is None:
+            # fall back on listing the first level
+            self._refresh_data()
+
+    def __on_worker_failure(self, uid, msg):
+        """
+        Asynchronous callback - the worker thread errored.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        msg = shotgun_model.sanitize_qt(msg)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            self._on_dependencies_failed(msg)
+
+    def __on_worker_signal(self, uid, request_type, data):
+        """
+        Signaled whenever the worker completes something.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        data = shotgun_model.sanitize_qt(data)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            self._on_dependencies_found(data["return_value"])
@@ -18,6 +18,7 @@ shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shot
 ShotgunModel = shotgun_model.ShotgunModel
 
 from .model_entity_listing import SgEntityListingModel
+from .lru_cache import LruCache
 
 class SgPublishHistoryListingModel(SgEntityListingModel):
     """
@@ -28,8 +29,16 @@ class SgPublishHistoryListingModel(SgEntityListingModel):
     version number, type, task etc. Once we have those fields, 
     the shotgun model is updated to retrieve all associated 
     publishes.
+
+    The details of publishes that have been seen before, either
+    by this model or by a listing the user navigated from, are
+    remembered (see :meth:`add_publish_details`), in which case
+    the first pass is skipped and the history is loaded right away.
     """
 
+    # maximum number of publishes to remember details for
+    PUBLISH_DETAILS_CACHE_SIZE = 200
+
     def __init__(self, entity_type, parent, bg_task_manager):
         """
         Constructor.
@@ -48,6 +57,9 @@ class SgPublishHistoryListingModel(SgEntityListingModel):
         
         # tracking the background task
         self._sg_query_id = None
+
+        # details needed to load the history, keyed by publish id
+        self._publish_details_cache = LruCache(self.PUBLISH_DETAILS_CACHE_SIZE)
         
         # overlay for reporting errors
         self._overlay = None
@@ -83,10 +95,7 @@ class SgPublishHistoryListingModel(SgEntityListingModel):
         msg = shotgun_model.sanitize_qt(msg)
 
         if uid == self._sg_query_id: 
-            self._app.log_warning("History model query error: %s" % msg)
-            full_msg = "Error retrieving data from Shotgun: %s" % msg        
-            if self._overlay:
-                self._overlay.show_error_message(full_msg)
+            self._on_details_failed(msg)
         
     def __on_worker_signal(self, uid, request_type, data):
         """
@@ -98,53 +107,7 @@ class SgPublishHistoryListingModel(SgEntityListingModel):
         data = shotgun_model.sanitize_qt(data)
 
         if self._sg_query_id == uid:
-            # hide spinner
-            if self._overlay:
-                self._overlay.hide()        
-
-            # process the data
-            sg_records = data["sg"]
-            
-            if len(sg_records) != 1 and self._overlay:
-                self._overlay.show_error_message("Publish could not be found!")
-            
-            sg_data = sg_records[0]
-
-            # figure out which publish type we are after
-            if self._sg_formatter.entity_type == "PublishedFile":
-                publish_type_field = "published_file_type"
-            else:
-                publish_type_field = "tank_type"
-
-            # when we filter out which other publishes are associated with this one,
-            # to effectively get the "version history", we look for items
-            # which have the same project, same entity assocation, same name, same type 
-            # and the same task.
-            filters = [ ["project", "is", sg_data["project"] ],
-                        ["name", "is", sg_data["name"] ],
-                        ["task", "is", sg_data["task"] ],
-                        ["entity", "is", sg_data["entity"] ],
-                        [publish_type_field, "is", sg_data[publish_type_field] ],
-                      ]
-
-            # the proxy model that is sorting this model will
-            # sort based on id (pk), meaning that more recently 
-            # commited transactions will appear later in the list.
-            # This ensures that publishes with no version number defined
-            # (yes, these exist) are also sorted correctly.
-            hierarchy = ["created_at"]
-
-            self._current_version = sg_data["version_number"]
-
-            ShotgunModel._load_data(
-                self,
-                self._sg_formatter.entity_type,
-                filters,
-                hierarchy,
-                self._sg_formatter.fields
-            )
-
-            self._refresh_data()
+            self._on_details_found(data["return_value"])
 
     ############################################################################################
     # public interface
@@ -160,41 +123,190 @@ class SgPublishHistoryListingModel(SgEntityListingModel):
         """        
         self._sg_location = sg_location
         self._current_version = None
+        self._sg_query_id = None
         self.__sg_data_retriever.clear()
-        
+
+        sg_data = self._publish_details_cache.get(sg_location.entity_id)
+        if sg_data:
+            # the details are known already, so go
+            # straight to loading the history
+            self._load_history(sg_data)
+            return
+
+        # get publish details async. When loaded by the
+        # batch loader, this is part of the batch.
+        args = (self._find_publish_details, sg_location.entity_id)
+        if not self._defer_resolution(*args):
+            self._sg_query_id = self.__sg_data_retriever.execute_method(*args)
+
+    def set_resolution_result(self, result):
+        """
+        Called by the batch loader with the details of the publish.
+
+        :param result: List of Shotgun dictionaries
+        :returns: True if the history has been loaded
+        """
+        return self._on_details_found(result)
+
+    def set_resolution_error(self, msg):
+        """
+        Called by the batch loader if the details of the publish could not be retrieved.
+
+        :param msg: Error message
+        """
+        self._on_details_failed(msg)
+
+    def add_publish_details(self, sg_data):
+        """
+        Remembers the details of a publish, so that a subsequent
+        call to :meth:`load_data` for that publish can load its history
+        without first having to retrieve them from Shotgun.
+
+        Records of other types, or which lack any of the fields
+        needed, are ignored.
+
+        :param sg_data: Shotgun dictionary for a publish, typically the
+            data held by the listing the user is navigating from.
+        """
+        if sg_data.get("type") != self._sg_formatter.entity_type:
+            return
+
+        fields = self._get_detail_fields()
+        if any(field not in sg_data for field in fields):
+            return
+
+        details = dict((field, sg_data[field]) for field in fields)
+        self._publish_details_cache.set(sg_data["id"], details)
+
+    ############################################################################################
+    # protected methods
+
+    def _find_publish_details(self, sg, publish_id):
+        """
+        Retrieves the details needed to load the history of a publish.
+        This is designed to be executed by a data retriever worker.
+
+        :param sg: Shotgun API instance
+        :param publish_id: Id of the publish
+        :returns: List of Shotgun dictionaries
+        """
+        return sg.find(
+            self._sg_formatter.entity_type,
+            [["id", "is", publish_id]],
+            self._get_detail_fields()
+        )
+
+    def _on_details_found(self, sg_records):
+        """
+        Called once the details of the publish have been retrieved.
+        Loads the history of the publish.
+
+        :param sg_records: List of Shotgun dictionaries
+        :returns: True if the history has been loaded
+        """
+        # hide spinner
+        if self._overlay:
+            self._overlay.hide()        
+
+        if len(sg_records) != 1 and self._overlay:
+            self._overlay.show_error_message("Publish could not be found!")
+
+        if not sg_records:
+            return False
+
+        sg_data = sg_records[0]
+        self.add_publish_details(sg_data)
+        self._load_history(sg_data)
+        return True
+
+    def _on_details_failed(self, msg):
+        """
+        Called if the details of the publish could not be retrieved.
+
+        :param msg: Error message
+        """
+        self._app.log_warning("History model query error: %s" % msg)
+        full_msg = "Error retrieving data from Shotgun: %s" % msg        
+        if self._overlay:
+            self._overlay.show_error_message(full_msg)
+
+    def _get_detail_fields(self):
+        """
+        Returns the publish fields needed to load the history of a publish.
+        """
         # figure out which publish type we are after
         if self._sg_formatter.entity_type == "PublishedFile":
             publish_type_field = "published_file_type"
         else:
             publish_type_field = "tank_type"
-        
-        filters = [["id", "is", sg_location.entity_id]]
-        
-        fields = ["name", 
-                  "version_number",
-                  "task", 
-                  "entity",
-                  "project",
-                  publish_type_field]
-        
-        # get publish details async
-        self._sg_query_id = self.__sg_data_retriever.execute_find(self._sg_formatter.entity_type, 
-                                                                  filters, 
-                                                                  fields)
-        
-    def is_highlighted(self, model_index):
+
+        return ["name",
+                "version_number",
+                "task",
+                "entity",
+                "project",
+                publish_type_field]
+
+    def _is_highlighted(self, sg_data):
         """
-        Compute if a model index belonging to this model 
-        should be highlighted.
-        
+        Compute if an item should be highlighted.
+
         In the case of this model, the current version is highlighted
+
+        :param sg_data: Shotgun data dictionary for the item
+        :returns: True if the item should be highlighted
         """
-        # see if the model tracks a concept of a current version.
-        # this is used for version histories, when we want to highlight 
-        # a particular item in a history
-        sg_data = shotgun_model.get_sg_data(model_index)
-        
-        if sg_data.get("version_number") == self._current_version:
-            return True
-        else:
-            return False
+        return sg_data.get("version_number") == self._current_version
+
+    def _load_history(self, sg_data):
+        """
+        Loads the publishes associated with the given publish. Cached
+        data is displayed right away and a refresh is requested.
+
+        :param sg_data: Shotgun dictionary holding the fields
+            returned by :meth:`_get_detail_fields`.
+        """
+        publish_type_field = self._get_detail_fields()[-1]
+
+        # when we filter out which other publishes are associated with this one,
+        # to effectively get the "version history", we look for items
+        # which have the same project, same entity assocation, same name, same type 
+        # and the same task. Links are reduced to their type and id, so
+        # that the query is the same whichever listing the details came from.
+        filters = [ ["project", "is", _get_link(sg_data["project"]) ],
+                    ["name", "is", sg_data["name"] ],
+                    ["task", "is", _get_link(sg_data["task"]) ],
+                    ["entity", "is", _get_link(sg_data["entity"]) ],
+                    [publish_type_field, "is", _get_link(sg_data[publish_type_field]) ],
+                  ]
+
+        # the proxy model that is sorting this model will
+        # sort based on id (pk), meaning that more recently 
+        # commited transactions will appear later in the list.
+        # This ensures that publishes with no version number defined
+        # (yes, these exist) are also sorted correctly.
+        hierarchy = ["created_at"]
+
+        self._current_version = sg_data["version_number"]
+
+        self._load_data(
+            self._sg_formatter.entity_type,
+            filters,
+            hierarchy,
+            # the detail fields are needed to highlight the current publish
+            # and to load the history of any publish in the listing
+            self._sg_formatter.list_fields + self._get_detail_fields()
+        )
+
+        self._refresh_data()
+
+
+def _get_link(value):
+    """
+    Returns an entity link holding only its type and id.
+
+    :param value: Entity link or None
+    """
+    if value is None:
+        return None
+    return {"type": value["type"], "id": value["id"]}
@@ -11,15 +11,31 @@
 from sgtk.platform.qt import QtCore, QtGui
 import sgtk
 
+# import the shotgun_model module from the shotgun utils framework
+shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
+shotgun_data = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_data")
+
 from .model_entity_listing import SgEntityListingModel
+from .lru_cache import LruCache
 
 class SgLatestPublishListingModel(SgEntityListingModel):
     """
     Model which fetches publish objects with the option to collapse
     the list of returned data so that only the latest version of each
     publish is shown.
+
+    When only latest publishes are shown, the data fetching has a
+    two-pass setup: First, Shotgun is asked to summarize the publishes
+    associated with the location, returning the id of the most recent
+    publish for each name, type and task. The model then retrieves only
+    those publishes. This means that the amount of data transferred
+    (and the record limit) scales with the number of distinct publishes
+    rather than with the number of versions of each.
     """
 
+    # number of locations for which the latest publish ids are remembered
+    LATEST_IDS_CACHE_SIZE = 100
+
     def __init__(self, entity_type, parent, bg_task_manager):
         """
         Constructor.
@@ -32,8 +48,23 @@ class SgLatestPublishListingModel(SgEntityListingModel):
         self._show_latest_only = False
         self._publish_type_field = None
 
+        # ids of the latest publishes for the current location,
+        # or None if these haven't been resolved yet
+        self._latest_ids = None
+        # latest publish ids from previous queries, keyed by link filters
+        self._latest_ids_cache = LruCache(self.LATEST_IDS_CACHE_SIZE)
+
+        # tracking the background task
+        self._sg_query_id = None
+
         # init base class
         SgEntityListingModel.__init__(self, entity_type, parent, bg_task_manager)
+
+        self.__sg_data_retriever = shotgun_data.ShotgunDataRetriever(self,
+                                                                     bg_task_manager=bg_task_manager)
+        self.__sg_data_retriever.start()
+        self.__sg_data_retriever.work_completed.connect(self.__on_worker_signal)
+        self.__sg_data_retriever.work_failure.connect(self.__on_worker_failure)
         
 
     def load_data(self, sg_location, show_latest_only):
@@ -53,22 +84,219 @@ class SgLatestPublishListingModel(SgEntityListingModel):
             self._publish_type_field = "tank_type"
         
         self._show_latest_only = show_latest_only
-        
+
+        self.__sg_data_retriever.clear()
+        self._sg_query_id = None
+        self._latest_ids = None
+
+        if show_latest_only:
+            link_filters = self._sg_formatter.get_link_filters(sg_location)
+            cache_key = repr(link_filters)
+            self._latest_ids = self._latest_ids_cache.get(cache_key)
+
+            # always check for new publishes. Once the latest ids have
+            # been resolved, the listing is reloaded if they have changed.
+            # when loaded by the batch loader, this is part of the batch.
+            args = (self._find_latest_publish_ids, link_filters, self._publish_type_field)
+            if not self._defer_resolution(*args):
+                self._sg_query_id = self.__sg_data_retriever.execute_method(*args)
+
+        # while the latest ids are being resolved for the first time,
+        # display whatever is in the cache for the full listing
+        # and defer the refresh until they are known.
+        defer_refresh = self._defer_refresh
+        if show_latest_only and self._latest_ids is None:
+            self._defer_refresh = True
+        try:
+            self._load_listing(sg_location)
+        finally:
+            self._defer_refresh = defer_refresh
+
+    def get_freshness_query(self):
+        """
+        Returns a lightweight query which retrieves the records that
+        the model would retrieve, or None if no query has been loaded.
+
+        No query is returned while latest publishes are being resolved
+        since the model will load and refresh itself once they are known.
+        """
+        if self._show_latest_only and self._latest_ids is None:
+            return None
+        return SgEntityListingModel.get_freshness_query(self)
+
+    def set_resolution_result(self, result):
+        """
+        Called by the batch loader with the latest publish ids.
+
+        :param result: Sorted list of publish ids
+        :returns: True if the listing has been reloaded
+        """
+        return self._on_latest_ids_resolved(result)
+
+    def set_resolution_error(self, msg):
+        """
+        Called by the batch loader if the latest publish ids could not be resolved.
+
+        :param msg: Error message
+        """
+        self._on_latest_ids_failed(msg)
+
+    def invalidate(self, changed_entities):
+        """
+        Requests a refresh if the loaded data may be affected by
+        changes to the given records in Shotgun.
+
+        When only latest publishes are shown, the latest publishes
+        are resolved again since new publishes may have superseded
+        the ones listed.
+
+        :param changed_entities: Dictionary of sets of changed entity ids,
+            keyed by entity type.
+        :returns: True if a refresh was requested
+        """
+        if not self._show_latest_only:
+            return SgEntityListingModel.invalidate(self, changed_entities)
+
+        if self._sg_query is None:
+            return False
+
+        changed_ids = changed_entities.get(self._sg_query["entity_type"]) or set()
+        if not self._is_location_changed(changed_entities) and not self._is_affected_by(changed_ids):
+            return False
+
+        self.load_data(self._sg_location, self._show_latest_only)
+        return True
+
+    ############################################################################################
+    # protected methods
+
+    def _load_listing(self, sg_location):
+        """
+        Loads the publishes associated with the given location.
+
+        :param sg_location: Location object representing the *associated* object
+        """
         SgEntityListingModel.load_data(
             self,
             sg_location,
-            additional_fields=["version", "task", self._publish_type_field],
+            # the version number is needed, together with system fields, to
+            # load the history of a publish directly when navigating to it
+            additional_fields=["version_number"],
             sort_field="created_at"
         )
 
+    def _get_filters(self):
+        """
+        Return the filter to be used for the current query
+        """
+        filters = SgEntityListingModel._get_filters(self)
+
+        if self._show_latest_only and self._latest_ids is not None:
+            # only retrieve the latest publishes
+            filters.append(["id", "in", self._latest_ids])
+
+        return filters
+
+    def _find_latest_publish_ids(self, sg, link_filters, publish_type_field):
+        """
+        Async callback called by the data retriever. Asks Shotgun for the
+        id of the most recently created publish for each name, type and task.
+
+        Ids are allocated in creation order, so the maximum id within each
+        group is the same record that the descending created_at sort would
+        have listed first.
+
+        :param sg: Shotgun API instance
+        :param link_filters: Filters for the publishes associated with the location
+        :param publish_type_field: Field holding the publish type
+        :returns: Sorted list of publish ids
+        """
+        summary = sg.summarize(
+            self._sg_formatter.entity_type,
+            link_filters,
+            summary_fields=[{"field": "id", "type": "maximum"}],
+            grouping=[
+                {"field": "name", "type": "exact", "direction": "asc"},
+                {"field": publish_type_field, "type": "exact", "direction": "asc"},
+                {"field": "task", "type": "exact", "direction": "asc"},
+            ]
+        )
+
+        latest_ids = []
+        groups = summary.get("groups") or []
+        while groups:
+            group = groups.pop()
+            if group.get("groups"):
+                groups.extend(group["groups"])
+            elif group["summaries"].get("id"):
+                latest_ids.append(group["summaries"]["id"])
+
+        return sorted(latest_ids)
+
+    def _on_latest_ids_resolved(self, latest_ids):
+        """
+        Called once the latest publish ids have been resolved.
+        Reloads the listing if they have changed.
+
+        :param latest_ids: Sorted list of publish ids
+        :returns: True if the listing has been reloaded
+        """
+        link_filters = self._sg_formatter.get_link_filters(self._sg_location)
+        self._latest_ids_cache.set(repr(link_filters), latest_ids)
+
+        if latest_ids == self._latest_ids:
+            return False
+
+        self._latest_ids = latest_ids
+        self._load_listing(self._sg_location)
+        return True
+
+    def _on_latest_ids_failed(self, msg):
+        """
+        Called if the latest publish ids could not be resolved.
 
+        :param msg: Error message
+        """
+        self._app.log_warning("Could not resolve latest publishes: %s" % msg)
+        if self._latest_ids is None:
+            # fall back on culling the full listing
+            self._refresh_data()
+
+    def __on_worker_failure(self, uid, msg):
+        """
+        Asynchronous callback - the worker thread errored.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        msg = shotgun_model.sanitize_qt(msg)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            self._on_latest_ids_failed(msg)
+
+    def __on_worker_signal(self, uid, request_type, data):
+        """
+        Signaled whenever the worker completes something.
+        """
+        uid = shotgun_model.sanitize_qt(uid) # qstring on pyqt, str on pyside
+        data = shotgun_model.sanitize_qt(data)
+
+        if uid == self._sg_query_id:
+            self._sg_query_id = None
+            self._on_latest_ids_resolved(data["return_value"])
+
+    def _get_freshness_fields(self):
+        """
+        Returns the fields needed to determine if cached data is current.
+        Includes the fields needed to cull the list down to latest publishes.
+        """
+        fields = SgEntityListingModel._get_freshness_fields(self)
+        return fields + ["name", "task", self._publish_type_field]
 
-    def _before_data_processing(self, sg_data_list):
+    def _cull_records(self, sg_data_list):
         """
-        Called just after data has been retrieved from Shotgun but before any processing
-        takes place. This makes it possible for deriving classes to perform summaries,
-        calculations and other manipulations of the data before it is passed on to the model
-        class.
+        Called with the records returned by Shotgun, before they are loaded
+        into the model. Culls the list down to the latest publishes if
+        the model is set to only show latest publishes.
 
         :param sg_data_list: list of shotgun dictionaries, as returned by the find() call.
         :returns: should return a list of shotgun dictionaries, on the same form as the input.
@@ -133,7 +361,7 @@ class SgLatestPublishListingModel(SgEntityListingModel):
         
         # now return this culled data set as our new set of shotgun data, now only
         # including the latest publishes
-        return SgEntityListingModel._before_data_processing(self, new_sg_data_list) 
+        return new_sg_data_list
                                        
         
         
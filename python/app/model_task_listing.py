@@ -10,9 +10,9 @@
 
 from sgtk.platform.qt import QtCore, QtGui
 import sgtk
-from . import utils
 
 from .model_entity_listing import SgEntityListingModel
+from .user_avatar_cache import UserAvatarCache
 
 # import the shotgun_model module from the shotgun utils framework
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
@@ -29,6 +29,10 @@ class SgTaskListingModel(SgEntityListingModel):
     Therefore, when the task list has arrived, a signal is set to a second
     model which then fetches the thumbnails for all users assigned to tasks.
     
+    User thumbnails are shared with the rest of the app through the
+    :class:`UserAvatarCache`, and are routed to the tasks of each user
+    through an index of the rows by assignee.
+    
     :signal request_user_thumbnails(list): Emitted when this class is signalling
         that it needs thumbnails for users. A list of user ids for which 
         thumbnails are needed are passed as arguments with the signal. 
@@ -44,18 +48,26 @@ class SgTaskListingModel(SgEntityListingModel):
                             Needs to be a PublishedFile or TankPublishedFile.
         :param parent: QT parent object
         """
+        # persistent indexes of the rows, keyed by assignee user id.
+        # None when rows have been added since the index was built.
+        self._assignee_rows = None
+
         # init base class
         SgEntityListingModel.__init__(self, entity_type, parent, bg_task_manager)
         self.data_refreshed.connect(self._on_data_refreshed)
         
         # have a model to pull down user's thumbnails for task assingments
         self._task_assignee_model = TaskAssigneeModel(self, bg_task_manager)
-        self._task_assignee_model.thumbnail_updated.connect(self._on_user_thumb)
+
+        self._avatar_cache = UserAvatarCache.instance()
+        self._avatar_cache.avatar_updated.connect(self._on_user_thumb)
         
     def destroy(self):
         """
         Tear down method
         """
+        self._avatar_cache.avatar_updated.disconnect(self._on_user_thumb)
+
         # make sure we gracefully stop the thumbnail model
         self._task_assignee_model.destroy()
         self._task_assignee_model = None
@@ -75,32 +87,71 @@ class SgTaskListingModel(SgEntityListingModel):
         if self._sg_location.entity_type not in ["HumanUser", "Project"]:
             # show square thumbs for users and project (my tasks)
             # for other types, fetch user thumbnails
-            rows = self.rowCount()
-            
-            # get the task assignees
-            assignees = []
-            for x in range(rows):
-                data = self.item(x).get_sg_data()
-                assignees.extend(data["task_assignees"])
-            user_ids = [x["id"] for x in assignees] 
-            
-            self.request_user_thumbnails.emit(user_ids)
-  
-    def _on_user_thumb(self, sg_data, image):
+            assignee_rows = self._get_assignee_rows()
+
+            # use the thumbnails which have already been retrieved
+            # and request the rest, once per user
+            user_ids = []
+            for user_id in assignee_rows:
+                if self._avatar_cache.get(user_id):
+                    self._on_user_thumb(user_id)
+                else:
+                    user_ids.append(user_id)
+
+            if user_ids:
+                self.request_user_thumbnails.emit(sorted(user_ids))
+
+    def _populate_item(self, item, sg_data):
+        """
+        Whenever an item is constructed, this method is called.
+        Marks the assignee index as out of date.
+
+        :param item: QStandardItem that is about to be added to the model.
+        :param sg_data: Shotgun data dictionary that was received from Shotgun.
+        """
+        SgEntityListingModel._populate_item(self, item, sg_data)
+        self._assignee_rows = None
+
+    def _get_assignee_rows(self):
         """
-        When a user thumb arrives from the 
-        user thumbnail retriever
+        Returns the rows assigned to each user, building
+        the index if rows have been added since it was built.
+
+        :returns: dictionary of lists of QPersistentModelIndex objects, keyed by user id
         """
-        rows = self.rowCount()
+        if self._assignee_rows is None:
+            self._assignee_rows = {}
+            for row in range(self.rowCount()):
+                item = self.item(row)
+                data = item.get_sg_data()
+                index = QtCore.QPersistentModelIndex(item.index())
+                for assignee in data.get("task_assignees") or []:
+                    # tasks can also be assigned to groups
+                    if assignee["type"] == "HumanUser":
+                        self._assignee_rows.setdefault(assignee["id"], []).append(index)
+
+        return self._assignee_rows
+  
+    def _on_user_thumb(self, user_id):
+        """
+        When a user thumb arrives in the user avatar cache
         
-        for x in range(rows):
-            item = self.item(x)
-            data = item.get_sg_data()
-            user_ids = [x["id"] for x in data["task_assignees"]]
-            if sg_data["id"] in user_ids:
-                # this thumbnail should be assigned
-                icon = self._sg_formatter.create_thumbnail(image, sg_data)
-                item.setIcon(QtGui.QIcon(icon))
+        :param user_id: Id of the user
+        """
+        if self._sg_location is None or self._sg_location.entity_type in ["HumanUser", "Project"]:
+            # these show the task thumbnails rather than the assignees
+            return
+
+        indexes = self._get_assignee_rows().get(user_id)
+        avatar = self._avatar_cache.get(user_id)
+        if not indexes or not avatar:
+            return
+
+        (image, path) = avatar
+
+        # composite the thumbnail once for all the tasks
+        variant = self._sg_formatter.get_thumbnail_variant({"type": "HumanUser", "id": user_id})
+        self._request_thumbnail_for_indexes(indexes, image, path, variant)
   
     def _populate_default_thumbnail(self, item):
         """
@@ -149,8 +200,8 @@ class SgTaskListingModel(SgEntityListingModel):
         if self._sg_location.entity_type in ["HumanUser", "Project"]:
             # show square thumbs for users and project (my tasks)
             sg_data = item.get_sg_data()
-            icon = self._sg_formatter.create_thumbnail(image, sg_data)
-            item.setIcon(QtGui.QIcon(icon))
+            variant = self._sg_formatter.get_thumbnail_variant(sg_data)
+            self._request_thumbnail(item, image, path, variant)
 
 
 class TaskAssigneeModel(ShotgunModel):
@@ -164,14 +215,8 @@ class TaskAssigneeModel(ShotgunModel):
     This model works as a very simple thumbnail creation facility:
     it's connected to a task listing model's request_user_thumbnails signal
     and whenever this fires, it retrieves those thumbnails from shotgun
-    and emits a thumbnail_updated signal for each one of them.
-    
-    :signal thumbnail_updated(dict, QImage): Emitted whenever a thumbnail
-        is available. the dictionary contains shotgun data about the user
-        and the thumbnail and the QImage holds the actual thumbnail object.
+    and adds each one of them to the :class:`UserAvatarCache`.
     """
-    
-    thumbnail_updated = QtCore.Signal(dict, QtGui.QImage)
 
     def __init__(self, parent, bg_task_manager):
         """
@@ -226,6 +271,5 @@ class TaskAssigneeModel(ShotgunModel):
         :param image: Image object representing the thumbnail
         :param path: A path on disk to the thumbnail. This is a file in jpeg format.
         """        
-        self._current_pixmap = utils.create_round_thumbnail(image)
         sg_data = item.get_sg_data()
-        self.thumbnail_updated.emit(sg_data, image)
+        UserAvatarCache.instance().set(sg_data["id"], image, path)
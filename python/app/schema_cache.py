@@ -0,0 +1,151 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Memoized versions of the schema display lookups in shotgun_globals.
+
+The formatting code looks up display names, empty phrases and status
+details for every value it renders. These lookups walk the cached schema
+each time, so their results are memoized here, per project.
+
+Lookups made before the schema has loaded return fallback values,
+so each project's memo is cleared once its schema has been loaded.
+Call :meth:`invalidate` to discard all memoized values.
+"""
+
+import sgtk
+
+shotgun_globals = sgtk.platform.import_framework(
+    "tk-framework-shotgunutils",
+    "shotgun_globals",
+)
+
+# memoized lookups, keyed by project id
+_memos = {}
+
+
+def invalidate():
+    """
+    Discards all memoized values.
+    """
+    _memos.clear()
+
+
+def get_type_display_name(entity_type):
+    """
+    Returns the display name for an entity type,
+    e.g. "Level" for CustomEntity013.
+
+    :param entity_type: Shotgun entity type
+    :returns: Display name
+    """
+    return _memoize(
+        ("type_display_name", entity_type),
+        shotgun_globals.get_type_display_name,
+        entity_type
+    )
+
+
+def get_field_display_name(entity_type, field_name):
+    """
+    Returns the display name for a field.
+
+    :param entity_type: Shotgun entity type
+    :param field_name: Shotgun field name
+    :returns: Display name
+    """
+    return _memoize(
+        ("field_display_name", entity_type, field_name),
+        shotgun_globals.get_field_display_name,
+        entity_type,
+        field_name
+    )
+
+
+def get_empty_phrase(entity_type, field_name):
+    """
+    Returns the phrase to display when a field has no value.
+
+    :param entity_type: Shotgun entity type
+    :param field_name: Shotgun field name
+    :returns: Empty phrase
+    """
+    return _memoize(
+        ("empty_phrase", entity_type, field_name),
+        shotgun_globals.get_empty_phrase,
+        entity_type,
+        field_name
+    )
+
+
+def get_status_html(status_code):
+    """
+    Returns the rendered html for a status, which is its display
+    name prefixed with a box in the color of the status, if it has one.
+
+    :param status_code: Shotgun status code, e.g. "ip"
+    :returns: Html string
+    """
+    return _memoize(("status_html", status_code), _create_status_html, status_code)
+
+
+def _create_status_html(status_code):
+    """
+    Renders the html for a status. See get_status_html().
+
+    :param status_code: Shotgun status code
+    :returns: Html string
+    """
+    str_val = shotgun_globals.get_status_display_name(status_code)
+
+    color_str = shotgun_globals.get_status_color(status_code)
+    if color_str:
+        # append colored box to indicate status color
+        str_val = ("<span style='color: rgb(%s)'>"
+                   "&#9608;</span>&nbsp;%s" % (color_str, str_val))
+    return str_val
+
+
+def _memoize(key, lookup_fn, *args):
+    """
+    Returns the memoized result of a lookup for the current project,
+    performing the lookup if it hasn't been made before.
+
+    :param key: Hashable key identifying the lookup
+    :param lookup_fn: Function performing the lookup
+    :param args: Arguments to pass to the lookup function
+    :returns: Result of the lookup
+    """
+    memo = _get_memo()
+    try:
+        return memo[key]
+    except KeyError:
+        value = lookup_fn(*args)
+        memo[key] = value
+        return value
+
+
+def _get_memo():
+    """
+    Returns the memo dictionary for the current project.
+    """
+    app = sgtk.platform.current_bundle()
+    project = app.context.project
+    project_id = project["id"] if project else None
+
+    memo = _memos.get(project_id)
+    if memo is None:
+        memo = {}
+        _memos[project_id] = memo
+        # drop any fallback values memoized before the schema was available.
+        # If the schema is already loaded, this clears the empty memo right away.
+        shotgun_globals.run_on_schema_loaded(memo.clear, project_id=project_id)
+
+    return memo
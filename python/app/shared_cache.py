@@ -0,0 +1,196 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import sgtk
+
+
+class SharedQueryCache(object):
+    """
+    Keeps track of the queries which have recently been run against
+    Shotgun by any session on this host, together with a fingerprint of
+    the records they returned.
+
+    The models store their data in on disk caches which are shared by all
+    sessions using the same configuration, so once one session has fetched
+    the results of a query, the cached data loaded by the other sessions
+    is as current as those results. This lets the other sessions skip
+    their own refresh.
+
+    The information is held in an SQLite database in WAL mode, so that
+    several processes can read and write it at the same time.
+
+    A single instance is shared by the whole app, see :meth:`instance`.
+    """
+
+    # file name of the database, in the app's cache location
+    DATABASE_FILE_NAME = "shared_queries.sqlite"
+
+    # seconds to wait for other processes to release the database
+    LOCK_TIMEOUT_SECONDS = 5.0
+
+    # entries older than this are removed when the database is opened
+    MAX_ENTRY_AGE_SECONDS = 7 * 24 * 60 * 60
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the shared cache, creating it on first use.
+
+        :returns: :class:`SharedQueryCache` or None if the
+            shared cache has been disabled.
+        """
+        app = sgtk.platform.current_bundle()
+        if not app.get_setting("enable_shared_cache"):
+            return None
+
+        if cls._instance is None:
+            cls._instance = cls(os.path.join(app.cache_location, cls.DATABASE_FILE_NAME))
+        return cls._instance
+
+    @staticmethod
+    def get_query_key(entity_type, filters, hierarchy, fields, order, seed, limit):
+        """
+        Returns a key identifying a query. Queries which only differ in
+        the order of their fields, or in the display names held by entity
+        links in their filters, have the same key.
+
+        :returns: String
+        """
+        query = {
+            "entity_type": entity_type,
+            "filters": _normalize(filters),
+            "hierarchy": hierarchy,
+            "fields": sorted(set(fields)),
+            "order": order or [],
+            "seed": seed,
+            "limit": limit or 0,
+        }
+        return hashlib.md5(json.dumps(query, sort_keys=True, default=str)).hexdigest()
+
+    @staticmethod
+    def get_fingerprint(sg_records):
+        """
+        Returns a fingerprint of the ids and revisions of a set of records.
+
+        :param sg_records: List of shotgun dictionaries
+        :returns: String
+        """
+        revisions = []
+        for sg_data in sg_records:
+            updated_at = sg_data.get("updated_at")
+            if isinstance(updated_at, datetime.datetime):
+                # timestamps are stored as unix time in the model caches
+                updated_at = time.mktime(updated_at.timetuple())
+            revisions.append((sg_data["id"], updated_at))
+
+        return hashlib.md5(repr(sorted(revisions))).hexdigest()
+
+    def __init__(self, path):
+        """
+        :param path: Path to the database file
+        """
+        self._app = sgtk.platform.current_bundle()
+        self._path = path
+        self._connection = None
+
+    def is_current(self, query_key, fingerprint, max_age):
+        """
+        Checks if a query has recently returned the given records.
+
+        :param query_key: Key returned by :meth:`get_query_key`
+        :param fingerprint: Fingerprint returned by :meth:`get_fingerprint`
+        :param max_age: Maximum number of seconds since the query was run
+        :returns: True if the query has returned the same records
+            within the given number of seconds.
+        """
+        try:
+            row = self._get_connection().execute(
+                "SELECT fetched_at, fingerprint FROM query_results WHERE query_key = ?",
+                (query_key,)
+            ).fetchone()
+        except sqlite3.Error, e:
+            self._app.log_debug("Could not read from the shared cache: %s" % e)
+            return False
+
+        if row is None:
+            return False
+
+        (fetched_at, stored_fingerprint) = row
+        return stored_fingerprint == fingerprint and time.time() - fetched_at <= max_age
+
+    def set(self, query_key, fingerprint):
+        """
+        Records that a query has just returned the given records.
+
+        :param query_key: Key returned by :meth:`get_query_key`
+        :param fingerprint: Fingerprint returned by :meth:`get_fingerprint`
+        """
+        try:
+            self._get_connection().execute(
+                "INSERT OR REPLACE INTO query_results (query_key, fetched_at, fingerprint) "
+                "VALUES (?, ?, ?)",
+                (query_key, time.time(), fingerprint)
+            )
+        except sqlite3.Error, e:
+            self._app.log_debug("Could not write to the shared cache: %s" % e)
+
+    ############################################################################################
+    # internal methods
+
+    def _get_connection(self):
+        """
+        Returns the database connection, opening the database on first use.
+        """
+        if self._connection is None:
+            # autocommit mode. Each statement is a transaction of its own.
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self.LOCK_TIMEOUT_SECONDS,
+                isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS query_results ("
+                "query_key TEXT PRIMARY KEY, "
+                "fetched_at REAL NOT NULL, "
+                "fingerprint TEXT NOT NULL)"
+            )
+            connection.execute(
+                "DELETE FROM query_results WHERE fetched_at < ?",
+                (time.time() - self.MAX_ENTRY_AGE_SECONDS,)
+            )
+            self._connection = connection
+
+        return self._connection
+
+
+def _normalize(value):
+    """
+    Returns a copy of a filter expression where entity links
+    only hold their type and id.
+
+    :param value: Filter expression or part of one
+    """
+    if isinstance(value, dict):
+        if "type" in value and "id" in value:
+            return {"type": value["type"], "id": value["id"]}
+        return dict((k, _normalize(v)) for (k, v) in value.iteritems())
+    elif isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
@@ -11,10 +11,11 @@
 import sgtk
 from sgtk import TankError
 from sgtk.platform.qt import QtCore, QtGui
-import re
-import datetime
 import pprint
 from . import utils
+from .token_template import TokenTemplate
+from . import schema_cache
+from .timestamp_renderer import TimestampRenderer
 
 shotgun_globals = sgtk.platform.import_framework(
     "tk-framework-shotgunutils",
@@ -35,48 +36,157 @@ class ShotgunTypeFormatter(object):
     the shotgun_fields hook which defines how information should be
     presented, which fields should be displayed etc.
     """
+
+    # (hook method, dictionary key) for all token strings returned by the hook
+    TEMPLATE_KEYS = [
+        ("get_list_item_definition", "top_left"),
+        ("get_list_item_definition", "top_right"),
+        ("get_list_item_definition", "body"),
+        ("get_main_view_definition", "title"),
+        ("get_main_view_definition", "body"),
+    ]
     
+    # Process-wide registry of the hook data, compiled templates and token
+    # fields for each entity type, keyed by entity type. Formatters are
+    # created every time the user navigates, so the shotgun_fields hook
+    # is only executed the first time a type is encountered.
+    # See invalidate_cache().
+    _type_definitions = {}
+
+    # (round, rect) default thumbnails, shared by all formatters
+    _default_icons = None
+
+    # value converter method names, keyed by (entity type, field name).
+    # See _get_field_converter().
+    _field_converters = {}
+
     def __init__(self, entity_type):
         """
         Constructor
         """
         self._entity_type = entity_type
-        self._round_default_icon = QtGui.QPixmap(":/tk_multi_infopanel/round_512x400.png")
-        self._rect_default_icon = QtGui.QPixmap(":/tk_multi_infopanel/rect_512x400.png")
-        
         self._app = sgtk.platform.current_bundle()
+
+        definition = self._get_type_definition(entity_type)
+        self._hook_data = definition["hook_data"]
+        self._templates = definition["templates"]
+        self._list_fields = definition["list_fields"]
+        self._detail_fields = definition["detail_fields"]
+
+        (self._round_default_icon, self._rect_default_icon) = self._get_default_icons()
         
+    def __repr__(self):
+        return "<Shotgun '%s' type formatter>" % self._entity_type
+
+    @classmethod
+    def invalidate_cache(cls):
+        """
+        Discards all cached hook data, causing the shotgun_fields hook
+        to be executed again the next time a formatter is created.
+        This should be called whenever the hook may return different
+        values, for example after a context change or a hook reload.
+        """
+        cls._type_definitions = {}
+        cls._field_converters = {}
+        schema_cache.invalidate()
+
+    ###############################################################################################
+    # registry methods
+
+    @classmethod
+    def _get_default_icons(cls):
+        """
+        Returns the shared default thumbnails, loading them on first use.
+
+        :returns: tuple with (round pixmap, rect pixmap)
+        """
+        if cls._default_icons is None:
+            cls._default_icons = (
+                QtGui.QPixmap(":/tk_multi_infopanel/round_512x400.png"),
+                QtGui.QPixmap(":/tk_multi_infopanel/rect_512x400.png")
+            )
+        return cls._default_icons
+
+    @classmethod
+    def _get_type_definition(cls, entity_type):
+        """
+        Returns the formatting definition for an entity type,
+        executing the shotgun_fields hook if it isn't cached.
+
+        :param entity_type: Shotgun entity type
+        :returns: dictionary with keys hook_data, templates, list_fields
+            and detail_fields
+        """
+        if entity_type not in cls._type_definitions:
+            cls._type_definitions[entity_type] = cls._create_type_definition(entity_type)
+        return cls._type_definitions[entity_type]
+
+    @classmethod
+    def _create_type_definition(cls, entity_type):
+        """
+        Executes the shotgun_fields hook for an entity type and
+        precomputes everything needed for formatting.
+
+        :param entity_type: Shotgun entity type
+        :returns: dictionary with keys hook_data, templates, list_fields
+            and detail_fields
+        """
+        app = sgtk.platform.current_bundle()
+        app.log_debug("Loading shotgun_fields hook definitions for %s" % entity_type)
+
         # read in the hook data into a dict
-        self._hook_data = {}
+        hook_data = {}
 
-        self._hook_data["get_list_item_definition"] = self._app.execute_hook_method("shotgun_fields_hook", 
-                                                                                  "get_list_item_definition", 
-                                                                                  entity_type=entity_type)
+        hook_data["get_list_item_definition"] = app.execute_hook_method("shotgun_fields_hook", 
+                                                                        "get_list_item_definition", 
+                                                                        entity_type=entity_type)
         
-        self._hook_data["get_all_fields"] = self._app.execute_hook_method("shotgun_fields_hook", 
-                                                                          "get_all_fields", 
-                                                                          entity_type=entity_type)
+        hook_data["get_all_fields"] = app.execute_hook_method("shotgun_fields_hook", 
+                                                              "get_all_fields", 
+                                                              entity_type=entity_type)
         
-        self._hook_data["get_main_view_definition"] = self._app.execute_hook_method("shotgun_fields_hook", 
-                                                                                    "get_main_view_definition", 
-                                                                                    entity_type=entity_type)
+        hook_data["get_main_view_definition"] = app.execute_hook_method("shotgun_fields_hook", 
+                                                                        "get_main_view_definition", 
+                                                                        entity_type=entity_type)
         
-        # extract a list of fields given all the different {tokens} defined
+        # compile all the template strings returned by the hook so that
+        # rendering doesn't need to parse them over and over again
+        templates = {}
+        for (method_name, hook_key) in cls.TEMPLATE_KEYS:
+            templates[(method_name, hook_key)] = TokenTemplate(
+                cls._get_hook_value(hook_data, method_name, hook_key)
+            )
+
+        # extract the fields needed by the list item and the main view {tokens}
+        # separately, so that listings don't retrieve fields only shown in
+        # the details area and vice versa.
+        list_fields = []
+        detail_fields = []
+        for ((method_name, _), template) in templates.iteritems():
+            if method_name == "get_list_item_definition":
+                list_fields += template.fields
+            else:
+                detail_fields += template.fields
+
+        # fields needed in both projections
         fields = []
-        fields += self._resolve_sg_fields( self._get_hook_value("get_list_item_definition", "top_left") )
-        fields += self._resolve_sg_fields( self._get_hook_value("get_list_item_definition", "top_right") )
-        fields += self._resolve_sg_fields( self._get_hook_value("get_list_item_definition", "body") )
-        fields += self._resolve_sg_fields( self._get_hook_value("get_main_view_definition", "title") )
-        fields += self._resolve_sg_fields( self._get_hook_value("get_main_view_definition", "body") )
-        
+
         # also include the thumbnail field so that it gets retrieved as part of the general 
         # query payload
-        fields.extend(self.thumbnail_fields)
+        fields.extend(cls._get_thumbnail_fields(entity_type))
+
+        # actions are available both in listings and in the details area,
+        # so include the fields used to decide which actions to show
+        for mapping in app.get_setting("action_mappings").get(entity_type) or []:
+            fields.extend((mapping.get("filters") or {}).keys())
         
-        # include system fields that are needed for the app
+        # include system fields that are needed for the app, including
+        # the fields read by the action hooks
         if entity_type == "Version":
             fields.append("sg_uploaded_movie")
+            fields.append("sg_path_to_movie")
             fields.append("sg_path_to_frames")
+            fields.append("playlists")
             fields.append("project")
         if entity_type == "Note":
             fields.append("read_by_current_user")
@@ -85,123 +195,45 @@ class ShotgunTypeFormatter(object):
         if entity_type == "PublishedFile":
             fields.append("path")
             fields.append("project")
+            fields.append("entity")
+            fields.append("task")
+            fields.append("version")
+            fields.append("name")
+            fields.append("published_file_type")
+        if entity_type == "TankPublishedFile":
+            fields.append("path")
+            fields.append("project")
+            fields.append("entity")
+            fields.append("task")
+            fields.append("version")
+            fields.append("name")
+            fields.append("tank_type")
         if entity_type == "Task":
             fields.append("project")
 
-        self._token_fields = set(fields)
-        
-    def __repr__(self):
-        return "<Shotgun '%s' type formatter>" % self._entity_type
-        
+        list_fields = set(list_fields + fields)
+        detail_fields = set(detail_fields + fields)
+
+        return {
+            "hook_data": hook_data,
+            "templates": templates,
+            "list_fields": list_fields,
+            "detail_fields": detail_fields,
+        }
+
     ###############################################################################################
     # helper methods
     
-    def _resolve_sg_fields(self, token_str):
-        """
-        Convenience method. Returns the sg fields for all tokens
-        given a token_str
-        
-        :param token_str: String with tokens, e.g. "{code}_{created_by}"
-        :returns: All shotgun fields, e.g. ["code", "created_by"]
-        """
-        fields = []
-        
-        for (_, sg_fields, _, _, _) in self._resolve_tokens(token_str):
-            fields.extend(sg_fields)
-        
-        return fields
-        
-    def _resolve_tokens(self, token_str):
-        """
-        Resolve a list of tokens from a string.
-        
-        Tokens are on the following form:
-        
-            {[preroll]shotgun.field.name|sg_field_name_fallback::directive[postroll]}
-            
-        Basic Examples:
-        
-        - {code}                         # simple format
-        - {sg_sequence.Sequence.code}    # deep links
-        - {artist|created_by}            # if artist is null, use creted_by
-        
-        Directives are also supported - these are used by the formatting logic
-        and include the following:
-        
-        - {sg_sequence::showtype}        # will generate a link saying
-                                         # 'Sequence ABC123' instead of just
-                                         # 'ABC123' like it does by default
-        - {sg_sequence::nolink}          # no url link will be created
-        
-        Optional pre/post roll - if a value is null, pre- and post-strings are
-        omitted from the final result. Examples of this syntax:
-        
-        - {[Name: ]code}                 # If code is set, 'Name: xxx' will be 
-                                         # printed out, otherwise nothing.
-        - {[Name: ]code[<br>]}           # Same but with a post line break
-        
-        :param token_str: String with tokens, e.g. "{code}_{created_by}"
-        returns: a list of tuples with (full_token, sg_fields, directive, preroll, postroll)
-        """    
-    
-        try:
-            # find all field names ["xx", "yy", "zz.xx"] from "{xx}_{yy}_{zz.xx}"
-            raw_tokens = set(re.findall('{([^}^{]*)}', token_str))
-        except Exception, error:
-            raise TankError("Could not parse '%s' - Error: %s" % (token_str, error) )
-    
-        fields = []
-        for raw_token in raw_tokens:
-    
-            pre_roll = None
-            post_roll = None
-            directive = None
-    
-            processed_token = raw_token
-            
-            match = re.match( "^\[([^\]]+)\]", processed_token)
-            if match:
-                pre_roll = match.group(1)
-                # remove preroll part from main token
-                processed_token = processed_token[len(pre_roll) + 2:]
-            
-            match = re.match( ".*\[([^\]]+)\]$", processed_token)
-            if match:
-                post_roll = match.group(1)
-                # remove preroll part from main token
-                processed_token = processed_token[:-(len(post_roll) + 2)]
-    
-            if "::" in processed_token:
-                # we have a special formatting directive
-                # e.g. created_at::ago
-                (sg_field_str, directive) = processed_token.split("::")
-            else:
-                sg_field_str = processed_token
-
-            if "|" in sg_field_str:
-                # there is more than one sg field, we have a 
-                # series of fallbacks
-                sg_fields = sg_field_str.split("|")
-            else:
-                sg_fields = [sg_field_str]
-            
-            fields.append( (raw_token, 
-                            sg_fields, 
-                            directive, 
-                            pre_roll, 
-                            post_roll) )
-    
-        return fields
-    
-    def _get_hook_value(self, method_name, hook_key):
+    @staticmethod
+    def _get_hook_value(hook_data, method_name, hook_key):
         """
         Validate that value is correct and return it
         """
         
-        if method_name not in self._hook_data:
+        if method_name not in hook_data:
             raise TankError("Unknown shotgun_fields hook method %s" % method_name)
         
-        data = self._hook_data[method_name]
+        data = hook_data[method_name]
 
         if hook_key not in data:
             raise TankError("Hook shotgun_fields.%s does not return "
@@ -225,60 +257,161 @@ class ShotgunTypeFormatter(object):
         :param sg_field: Shotgun field name
         :param value: value to turn into a string
         :param directive: Formatting directive, see above 
-        """         
-        str_val = ""
+        """
+        converter = getattr(self, self._get_field_converter(sg_type, sg_field))
+        return converter(sg_type, sg_field, value, directive)
+
+    @classmethod
+    def _get_field_converter(cls, sg_type, sg_field):
+        """
+        Returns the function used to convert values of the given field
+        to strings. The function is picked once per field, based on the
+        field's data type in the Shotgun schema, so that values can be
+        converted without inspecting them.
+
+        :param sg_type: Shotgun entity type
+        :param sg_field: Shotgun field name, possibly a deep link,
+            e.g. sg_sequence.Sequence.code
+        :returns: Name of the converter method, taking
+            (sg_type, sg_field, value, directive)
+        """
+        converter = cls._field_converters.get((sg_type, sg_field))
+        if converter:
+            return converter
+
+        if sg_field in ["created_at", "updated_at"]:
+            converter = "_timestamp_to_str"
+
+        elif sg_field == "sg_status_list":
+            converter = "_status_to_str"
+
+        else:
+            # for deep links, get the data type of the field at the end of the chain
+            field_chain = sg_field.split(".")
+            if len(field_chain) > 1:
+                (schema_type, schema_field) = (field_chain[-2], field_chain[-1])
+            else:
+                (schema_type, schema_field) = (sg_type, sg_field)
+
+            try:
+                data_type = shotgun_globals.get_data_type(schema_type, schema_field)
+            except Exception:
+                # the schema may not have been loaded yet. Use the generic
+                # conversion but don't remember it, so that the field is
+                # specialized once the schema is available.
+                return "_value_to_str"
+
+            if data_type == "entity":
+                converter = "_link_to_str"
+            elif data_type == "multi_entity":
+                converter = "_link_list_to_str"
+            elif data_type in ["url", "tag_list", "serializable"] or data_type is None:
+                converter = "_value_to_str"
+            else:
+                converter = "_scalar_to_str"
+
+        cls._field_converters[(sg_type, sg_field)] = converter
+        return converter
+
+    def _link_to_str(self, sg_type, sg_field, value, directive):
+        """
+        Converts an entity link value to a string. See _sg_field_to_str().
+        """
+        if not isinstance(value, dict) or set(["type", "id", "name"]) != set(value.keys()):
+            return self._value_to_str(sg_type, sg_field, value, directive)
+
+        if directive == "showtype":
+            # links are displayed as "Shot ABC123"
+            
+            # get the nice name from our schema
+            # this is so that it says "Level" instead of "CustomEntity013"
+            entity_type_display_name = schema_cache.get_type_display_name(value["type"])                
+            link_name = "%s %s" % (entity_type_display_name, value["name"])
+        else:
+            # links are just "ABC123"
+            link_name = value["name"]
         
+        if not self._generates_links(value["type"]) or directive == "nolink":
+            return link_name
+        else:
+            return qtwidgets_utils.get_hyperlink_html(
+                url="sgtk:%s:%s" % (value["type"], value["id"]),
+                name=link_name,
+            )
+
+    def _link_list_to_str(self, sg_type, sg_field, value, directive):
+        """
+        Converts a multi entity link value to a string. See _sg_field_to_str().
+        """
+        if not isinstance(value, list):
+            return self._value_to_str(sg_type, sg_field, value, directive)
+
+        return ", ".join(
+            self._link_to_str(sg_type, sg_field, list_item, directive) for list_item in value
+        )
+
+    def _timestamp_to_str(self, sg_type, sg_field, value, directive):
+        """
+        Converts a unix timestamp value to a string. See _sg_field_to_str().
+        """
+        if value is None or isinstance(value, (dict, list)):
+            return self._value_to_str(sg_type, sg_field, value, directive)
+
+        return TimestampRenderer.instance().render(value)
+
+    def _status_to_str(self, sg_type, sg_field, value, directive):
+        """
+        Converts a status value to a string. See _sg_field_to_str().
+        """
+        if value is None or isinstance(value, (dict, list)):
+            return self._value_to_str(sg_type, sg_field, value, directive)
+
+        return schema_cache.get_status_html(value)
+
+    def _scalar_to_str(self, sg_type, sg_field, value, directive):
+        """
+        Converts a text, number or other simple value to a string.
+        See _sg_field_to_str().
+        """
+        if value is None:
+            return self._value_to_str(sg_type, sg_field, value, directive)
+
+        # make sure it gets formatted correctly in html
+        return str(value).replace("\n", "<br>")
+
+    def _value_to_str(self, sg_type, sg_field, value, directive=None):
+        """
+        Converts any Shotgun field value to a string, by inspecting
+        the value. This is used for fields whose data type isn't known.
+        See _sg_field_to_str().
+        """         
         if value is None:            
-            return shotgun_globals.get_empty_phrase(sg_type, sg_field)
+            return schema_cache.get_empty_phrase(sg_type, sg_field)
         
         elif isinstance(value, dict) and set(["type", "id", "name"]) == set(value.keys()):
             # entity link
-            
-            if directive == "showtype":
-                # links are displayed as "Shot ABC123"
-                
-                # get the nice name from our schema
-                # this is so that it says "Level" instead of "CustomEntity013"
-                entity_type_display_name = shotgun_globals.get_type_display_name(value["type"])                
-                link_name = "%s %s" % (entity_type_display_name, value["name"])
-            else:
-                # links are just "ABC123"
-                link_name = value["name"]
-            
-            if not self._generates_links(value["type"]) or directive == "nolink":
-                str_val = link_name
-            else:
-                str_val = qtwidgets_utils.get_hyperlink_html(
-                    url="sgtk:%s:%s" % (value["type"], value["id"]),
-                    name=link_name,
-                )
+            return self._link_to_str(sg_type, sg_field, value, directive)
         
         elif isinstance(value, list):
             # list of items
             link_urls = []
             for list_item in value:
-                link_urls.append( self._sg_field_to_str(sg_type, sg_field, list_item, directive))
-            str_val = ", ".join(link_urls)
+                link_urls.append(self._value_to_str(sg_type, sg_field, list_item, directive))
+            return ", ".join(link_urls)
+
+        elif isinstance(value, dict):
+            # urls, serializable values and other
+            # dictionaries which aren't plain links
+            return str(value).replace("\n", "<br>")
             
         elif sg_field in ["created_at", "updated_at"]:
-            created_datetime = datetime.datetime.fromtimestamp(value)
-            (str_val, _) = utils.create_human_readable_timestamp(created_datetime) 
+            return self._timestamp_to_str(sg_type, sg_field, value, directive)
             
         elif sg_field == "sg_status_list":
-            str_val = shotgun_globals.get_status_display_name(value)
-            
-            color_str = shotgun_globals.get_status_color(value)
-            if color_str:
-                # append colored box to indicate status color
-                str_val = ("<span style='color: rgb(%s)'>"
-                           "&#9608;</span>&nbsp;%s" % (color_str, str_val))
+            return self._status_to_str(sg_type, sg_field, value, directive)
             
         else:
-            str_val = str(value)
-            # make sure it gets formatted correctly in html
-            str_val = str_val.replace("\n", "<br>")  
-            
-        return str_val
+            return self._scalar_to_str(sg_type, sg_field, value, directive)
     
     def _generates_links(self, entity_type):
         """
@@ -290,48 +423,16 @@ class ShotgunTypeFormatter(object):
         else:
             return True
         
-    def _convert_token_string(self, token_str, sg_data):
+    def _convert_token_string(self, method_name, hook_key, sg_data):
         """
-        Convert a string with {tokens} given a shotgun data dict
+        Convert a hook template string with {tokens} given a shotgun data dict
         
-        :param token_str: Token string as defined in the shotgun fields hook
+        :param method_name: The shotgun fields hook method defining the template
+        :param hook_key: The key in the dictionary returned by the hook method
         :param sg_data: Data dictionary to get values from
         :returns: string with tokens replaced with actual values
         """
-        # extract all tokens and process them one after the other
-        for (full_token, sg_fields, directive, pre_roll, post_roll) in self._resolve_tokens(token_str):
-            
-            # get the first sg field value we find
-            # this is usef when we have a fallback syntax in the token string,
-            # for example {artist|created_by}
-            for sg_field in sg_fields: 
-                sg_value = sg_data.get(sg_field)
-                if sg_value:
-                    # got a value so stop looking
-                    break
-            
-            if (sg_value is None or sg_value == []) and ( pre_roll or post_roll ):
-                # shotgun value is empty
-                # if we have a pre or post roll part of the token
-                # then we basicaly just skip the display of both 
-                # those and the value entirely
-                # e.g. Hello {[Shot:]sg_shot} becomes:
-                # for shot abc: 'Hello Shot:abc'
-                # for shot <empty>: 'Hello '             
-                token_str = token_str.replace("{%s}" % full_token, "")
-
-            else:
-                resolved_value = self._sg_field_to_str(sg_data["type"], sg_field, sg_value, directive)
-            
-                # potentially add pre/and post
-                if pre_roll:
-                    resolved_value = "%s%s" % (pre_roll, resolved_value)
-                if post_roll:
-                    resolved_value = "%s%s" % (resolved_value, post_roll)
-                # and replace the token with the value
-                token_str = token_str.replace("{%s}" % full_token, resolved_value)
-        
-        return token_str        
+        return self._templates[(method_name, hook_key)].render(sg_data, self._sg_field_to_str)
             
     ####################################################################################################
     # properties
@@ -351,7 +452,15 @@ class ShotgunTypeFormatter(object):
         """
         Returns the field names to use when looking for thumbnails
         """
-        if self.entity_type == "Note":
+        return self._get_thumbnail_fields(self._entity_type)
+
+    @staticmethod
+    def _get_thumbnail_fields(entity_type):
+        """
+        Returns the field names to use when looking for thumbnails
+        for the given entity type
+        """
+        if entity_type == "Note":
             return ["user.HumanUser.image", 
                     "user.ClientUser.image", 
                     "user.ApiUser.image"]
@@ -387,51 +496,57 @@ class ShotgunTypeFormatter(object):
         return self._hook_data["get_all_fields"]
 
     @property
-    def fields(self): 
+    def list_fields(self):
         """
-        fields needed to render list or main details
+        fields needed to render list items
         """
-        return list(self._token_fields)
+        return list(self._list_fields)
+
+    @property
+    def detail_fields(self):
+        """
+        fields needed to render the main details
+        """
+        return list(self._detail_fields)
 
 
     ####################################################################################################
     # public methods
 
-    def create_thumbnail(self, image, sg_data):
+    def get_thumbnail_variant(self, sg_data):
         """
-        Given a QImage representing a thumbnail and return a formatted
-        pixmap that is suitable for that data type.
+        Returns the style of thumbnail that is suitable for the given data.
         
-        :param image: QImage representing a shotgun thumbnail
         :param sg_data: Data associated with the thumbnail
-        :returns: Pixmap object
+        :returns: Thumbnail variant to pass to utils.create_thumbnail_image()
         """
         if self.entity_type in ["HumanUser", "ApiUser"]:
-            return utils.create_round_512x400_note_thumbnail(image)
+            return utils.THUMBNAIL_ROUND
         
         elif self.entity_type == "ClientUser":
-            return utils.create_round_512x400_note_thumbnail(image, client=True)
+            return utils.THUMBNAIL_ROUND_CLIENT
 
         elif self.entity_type == "Note":
             
             client_note = sg_data.get("client_note") or False 
-            
-            if sg_data["read_by_current_user"] == "unread":
-                unread=True
+            unread = sg_data["read_by_current_user"] == "unread"
+
+            if client_note and unread:
+                return utils.THUMBNAIL_ROUND_CLIENT_UNREAD
+            elif client_note:
+                return utils.THUMBNAIL_ROUND_CLIENT
+            elif unread:
+                return utils.THUMBNAIL_ROUND_UNREAD
             else:
-                unread=False
-                
-            return utils.create_round_512x400_note_thumbnail(image,  
-                                                             client_note,
-                                                             unread)
+                return utils.THUMBNAIL_ROUND
         
         elif self.entity_type == "Task" and sg_data["type"] == "HumanUser":
             # a user icon for a task
             # todo: refcator this logic to make it clearer
-            return utils.create_round_512x400_note_thumbnail(image)
+            return utils.THUMBNAIL_ROUND
         
         else:
-            return utils.create_rectangular_512x400_thumbnail(image)
+            return utils.THUMBNAIL_RECT
 
     @classmethod
     def get_playback_url(cls, sg_data):
@@ -484,11 +599,8 @@ class ShotgunTypeFormatter(object):
                this data dictionary.
         :returns: tuple with formatted and resolved (header, body) strings.
         """
-        title = self._get_hook_value("get_main_view_definition", "title")
-        body = self._get_hook_value("get_main_view_definition", "body")
-        
-        title_converted = self._convert_token_string(title, sg_data)
-        body_converted = self._convert_token_string(body, sg_data)
+        title_converted = self._convert_token_string("get_main_view_definition", "title", sg_data)
+        body_converted = self._convert_token_string("get_main_view_definition", "body", sg_data)
         
         return (title_converted, body_converted)
         
@@ -505,15 +617,32 @@ class ShotgunTypeFormatter(object):
                   body) strings.
         """
 
-        top_left = self._get_hook_value("get_list_item_definition", "top_left")
-        top_right = self._get_hook_value("get_list_item_definition", "top_right")
-        body = self._get_hook_value("get_list_item_definition", "body")
-        
-        top_left_converted = self._convert_token_string(top_left, sg_data)
-        top_right_converted = self._convert_token_string(top_right, sg_data)
-        body_converted = self._convert_token_string(body, sg_data)
+        top_left_converted = self._convert_token_string("get_list_item_definition", "top_left", sg_data)
+        top_right_converted = self._convert_token_string("get_list_item_definition", "top_right", sg_data)
+        body_converted = self._convert_token_string("get_list_item_definition", "body", sg_data)
         
         return (top_left_converted, top_right_converted, body_converted)
+
+    def format_list_items(self, sg_data_list):
+        """
+        Render details for a list of items in a single pass.
+        This produces the same results as calling format_list_item_details()
+        for each item, but only looks up the templates once.
+
+        :param sg_data_list: List of Shotgun data dictionaries.
+        :returns: List of (top_left, top_right, body) tuples, in the same
+                  order as the input.
+        """
+        templates = [
+            self._templates[("get_list_item_definition", hook_key)]
+            for hook_key in ["top_left", "top_right", "body"]
+        ]
+        value_formatter = self._sg_field_to_str
+
+        return [
+            tuple(template.render(sg_data, value_formatter) for template in templates)
+            for sg_data in sg_data_list
+        ]
     
 
     def get_link_filters(self, sg_location):
@@ -856,7 +985,7 @@ class ShotgunEntityFormatter(ShotgunTypeFormatter):
 
         else:
             return "Notes associated with this %s, in update order." % \
-                   shotgun_globals.get_type_display_name(self.entity_type)
+                   schema_cache.get_type_display_name(self.entity_type)
 
     @property
     def publishes_description(self):
@@ -879,7 +1008,7 @@ class ShotgunEntityFormatter(ShotgunTypeFormatter):
 
         else:
             return "Publishes for this %s, in creation order." % \
-                   shotgun_globals.get_type_display_name(self.entity_type)
+                   schema_cache.get_type_display_name(self.entity_type)
 
     @property
     def versions_description(self):
@@ -897,7 +1026,7 @@ class ShotgunEntityFormatter(ShotgunTypeFormatter):
 
         else:
             return "Review versions for this %s, in creation order." % \
-                   shotgun_globals.get_type_display_name(self.entity_type)
+                   schema_cache.get_type_display_name(self.entity_type)
 
     @property
     def tasks_description(self):
@@ -920,7 +1049,7 @@ class ShotgunEntityFormatter(ShotgunTypeFormatter):
 
         else:
             return "All tasks for this %s." % \
-                   shotgun_globals.get_type_display_name(self.entity_type)
+                   schema_cache.get_type_display_name(self.entity_type)
 
     @property
     def default_tab(self):
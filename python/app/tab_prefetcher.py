@@ -0,0 +1,193 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import functools
+import time
+
+from sgtk.platform.qt import QtCore
+import sgtk
+
+from .shotgun_location import ShotgunLocation
+
+
+class TabPrefetcher(QtCore.QObject):
+    """
+    Speculatively loads the data for tabs which are not currently
+    in focus, so that switching to them renders from cache rather
+    than waiting for a Shotgun round trip.
+
+    Prefetching is deliberately kept out of the way of the tab the
+    user is looking at: nothing is requested until the focused tab's
+    model has finished refreshing, and the other tabs are then warmed
+    one at a time, each waiting for the previous one to settle.
+
+    Each request is a (model, load_args) tuple where load_args are
+    the arguments to pass to the model's load_data() method.
+    """
+
+    # milliseconds to wait after a model has settled before
+    # prefetching the next one
+    PREFETCH_DELAY_MILLISECONDS = 300
+
+    # seconds for which prefetched data can be claimed. Older data
+    # is loaded again, refreshing it, when its tab is focused.
+    MAX_CLAIM_AGE_SECONDS = 60
+
+    def __init__(self, parent):
+        """
+        :param parent: QT parent object
+        """
+        QtCore.QObject.__init__(self, parent)
+        self._app = sgtk.platform.current_bundle()
+
+        # requests waiting to be prefetched
+        self._queue = []
+        # model we are waiting for before proceeding with the queue
+        self._pending_model = None
+        # (load signature, load time) tuples for models
+        # which have been prefetched, keyed by model
+        self._prefetched = {}
+        # models we are listening to
+        self._registered_models = set()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._prefetch_next)
+
+    def clear(self):
+        """
+        Cancels all pending prefetches and forgets about
+        prefetched models.
+        """
+        self._timer.stop()
+        self._queue = []
+        self._pending_model = None
+        self._prefetched = {}
+
+    def schedule(self, focused_model, requests):
+        """
+        Schedules a series of tabs for prefetching. Any previously
+        scheduled prefetches are cancelled.
+
+        :param focused_model: Model associated with the tab in focus. Prefetching
+            starts once this model has refreshed. If None, prefetching starts
+            right away.
+        :param requests: List of (model, load_args) tuples to prefetch.
+        """
+        self.clear()
+
+        for (model, _) in requests:
+            self._register_model(model)
+
+        self._queue = list(requests)
+
+        if focused_model:
+            self._register_model(focused_model)
+            self._pending_model = focused_model
+        else:
+            self._timer.start(self.PREFETCH_DELAY_MILLISECONDS)
+
+    def mark_loaded(self, model, load_args):
+        """
+        Records that a model has been loaded with the given arguments
+        by other means, so that a subsequent :meth:`claim` succeeds.
+
+        :param model: Model which has been loaded
+        :param load_args: Arguments that were passed to the model's load_data()
+        """
+        self._prefetched[model] = (self._get_signature(load_args), time.time())
+
+    def get_loaded_models(self):
+        """
+        Returns the models which have been prefetched or marked as
+        loaded and which haven't been claimed yet.
+
+        :returns: List of models
+        """
+        return self._prefetched.keys()
+
+    def claim(self, model, load_args):
+        """
+        Checks if the given model has recently been loaded in the background
+        with the given load arguments. Data loaded more than
+        MAX_CLAIM_AGE_SECONDS ago can't be claimed, so that it is refreshed.
+        The prefetch record is consumed, meaning that subsequent calls will
+        return False, and any queued prefetch for the model is cancelled
+        since the caller is about to take care of loading it.
+
+        :param model: Model to check
+        :param load_args: Arguments that would be passed to the model's load_data()
+        :returns: True if the model holds the requested data and doesn't need loading.
+        """
+        self._queue = [request for request in self._queue if request[0] is not model]
+        prefetched = self._prefetched.pop(model, None)
+        if prefetched is None:
+            return False
+
+        (signature, load_time) = prefetched
+        if time.time() - load_time > self.MAX_CLAIM_AGE_SECONDS:
+            self._app.log_debug("Prefetched data for %r is too old to use." % model)
+            return False
+
+        return signature == self._get_signature(load_args)
+
+    ############################################################################################
+    # internal methods
+
+    def _register_model(self, model):
+        """
+        Start listening to refresh signals from the given model
+
+        :param model: Shotgun model
+        """
+        if model not in self._registered_models:
+            self._registered_models.add(model)
+            model.data_refreshed.connect(functools.partial(self._on_model_settled, model))
+            model.data_refresh_fail.connect(functools.partial(self._on_model_settled, model))
+
+    def _get_signature(self, load_args):
+        """
+        Returns a comparable representation of a set of load_data() arguments.
+
+        :param load_args: Arguments passed to a model's load_data()
+        :returns: tuple
+        """
+        signature = []
+        for arg in load_args:
+            if isinstance(arg, ShotgunLocation):
+                signature.append((arg.entity_type, arg.entity_id))
+            else:
+                signature.append(arg)
+        return tuple(signature)
+
+    def _on_model_settled(self, model, *args):
+        """
+        Called when a model has refreshed or failed to refresh.
+
+        :param model: The model that settled
+        """
+        if model is self._pending_model:
+            self._pending_model = None
+            if self._queue:
+                self._timer.start(self.PREFETCH_DELAY_MILLISECONDS)
+
+    def _prefetch_next(self):
+        """
+        Loads the next model in the queue
+        """
+        if not self._queue:
+            return
+
+        (model, load_args) = self._queue.pop(0)
+        self._app.log_debug("Prefetching %r for %s" % (model, load_args))
+
+        self._prefetched[model] = (self._get_signature(load_args), time.time())
+        self._pending_model = model
+        model.load_data(*load_args)
@@ -0,0 +1,119 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import sgtk
+from sgtk.platform.qt import QtCore
+
+from .lru_cache import LruCache
+
+
+def _get_pixmap_size(pixmap):
+    """
+    Returns the approximate number of bytes held by a pixmap.
+    """
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) / 8
+
+
+class ThumbnailCache(object):
+    """
+    Holds the display sized thumbnails drawn by the listings, shared
+    by all views in the app and bounded by a memory budget set by
+    the thumbnail_cache_size setting. The least recently drawn
+    thumbnails are discarded once the budget is exceeded.
+
+    A single instance is shared by the whole app, see :meth:`instance`.
+    """
+
+    # upper bound on the number of thumbnails, regardless of their size
+    MAX_ITEMS = 10000
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the shared cache, creating it on first use.
+
+        :returns: :class:`ThumbnailCache`
+        """
+        if cls._instance is None:
+            app = sgtk.platform.current_bundle()
+            max_bytes = app.get_setting("thumbnail_cache_size") * 1024 * 1024
+            cls._instance = cls(max_bytes)
+        return cls._instance
+
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: Maximum total size of the cached thumbnails
+        """
+        self._max_bytes = max_bytes
+        self._cache = LruCache(self.MAX_ITEMS, max_bytes=max_bytes, size_fn=_get_pixmap_size)
+
+    @property
+    def total_bytes(self):
+        """
+        Total size in bytes of the cached thumbnails
+        """
+        return self._cache.total_bytes
+
+    def get(self, key):
+        """
+        Returns a cached thumbnail and marks it as recently used.
+
+        :param key: Cache key
+        :returns: QPixmap or None if the thumbnail isn't cached
+        """
+        return self._cache.get(key)
+
+    def set(self, key, pixmap):
+        """
+        Adds a thumbnail to the cache, evicting the least
+        recently used thumbnails if the budget is exceeded.
+
+        :param key: Cache key
+        :param pixmap: Display sized QPixmap
+        """
+        self._cache.set(key, pixmap)
+
+    def get_scaled_icon(self, icon, size):
+        """
+        Returns an icon scaled down to the given size. Icon images are
+        typically shared by many items, for example default thumbnails,
+        so the scaled pixmaps are cached by source image.
+
+        :param icon: QIcon
+        :param size: QSize to fit the icon within
+        :returns: QPixmap
+        """
+        # items are given separate icons for the same pixmap,
+        # so identify the image by the pixmap rather than the icon
+        source_pixmap = icon.pixmap(512)
+        key = ("icon", source_pixmap.cacheKey(), size.width(), size.height())
+        pixmap = self._cache.get(key)
+        if pixmap is None:
+            pixmap = source_pixmap.scaled(
+                size,
+                QtCore.Qt.KeepAspectRatio,
+                QtCore.Qt.SmoothTransformation
+            )
+            self._cache.set(key, pixmap)
+        return pixmap
+
+    def get_report(self):
+        """
+        Returns a summary of the memory used by the cache.
+
+        :returns: String
+        """
+        return "Thumbnail cache: %d thumbnails using %.1f of %.1f MB" % (
+            len(self._cache),
+            self._cache.total_bytes / (1024.0 * 1024.0),
+            self._max_bytes / (1024.0 * 1024.0)
+        )
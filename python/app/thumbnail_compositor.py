@@ -0,0 +1,174 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import hashlib
+import os
+
+import sgtk
+from sgtk.platform.qt import QtCore, QtGui
+
+from . import utils
+
+
+class ThumbnailCompositor(QtCore.QObject):
+    """
+    Composites thumbnails in background threads, see
+    :meth:`utils.create_thumbnail_image`.
+
+    Composited thumbnails are stored on disk, one file per source thumbnail
+    and variant, so that a thumbnail is only composited again if its source
+    file changes.
+
+    :signal thumbnail_ready(object, object): Emitted with the request id
+        returned by :meth:`request` and the composited QImage.
+    """
+
+    thumbnail_ready = QtCore.Signal(object, object)
+
+    # folder within the app's cache location holding the composited thumbnails
+    CACHE_FOLDER_NAME = "composited_thumbnails"
+
+    def __init__(self, parent, bg_task_manager):
+        """
+        :param parent: QT parent object
+        :param bg_task_manager: Task manager to use for background work
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        self._app = sgtk.platform.current_bundle()
+        self._cache_root = os.path.join(self._app.cache_location, self.CACHE_FOLDER_NAME)
+
+        self._bg_task_manager = bg_task_manager
+        # each compositor uses its own task group
+        self._task_group = "thumbnail_compositor_%d" % id(self)
+        self._bg_task_manager.task_completed.connect(self._on_task_completed)
+        self._bg_task_manager.task_failed.connect(self._on_task_failed)
+
+    def destroy(self):
+        """
+        Tear down method
+        """
+        self._bg_task_manager.stop_task_group(self._task_group)
+        self._bg_task_manager.task_completed.disconnect(self._on_task_completed)
+        self._bg_task_manager.task_failed.disconnect(self._on_task_failed)
+
+    def request(self, image, source_path, variant, size=None):
+        """
+        Requests a composited thumbnail. The result is delivered
+        through the thumbnail_ready signal.
+
+        :param image: QImage source image, or None to load it from the source path
+        :param source_path: Path to the source image on disk, or None if it
+            isn't backed by a file, in which case the result isn't cached.
+        :param variant: Thumbnail variant, e.g. utils.THUMBNAIL_RECT
+        :param size: QSize to scale the composited thumbnail down to, or
+            None to return it at full size.
+        :returns: Request id
+        """
+        return self._bg_task_manager.add_task(
+            self._composite,
+            group=self._task_group,
+            task_kwargs={
+                "image": image,
+                "source_path": source_path,
+                "variant": variant,
+                "size": size
+            }
+        )
+
+    ############################################################################################
+    # internal methods
+
+    def _composite(self, image, source_path, variant, size):
+        """
+        Executed in a background thread. Loads the composited
+        thumbnail from disk, creating it if necessary.
+
+        :param image: QImage source image, or None
+        :param source_path: Path to the source image on disk, or None
+        :param variant: Thumbnail variant
+        :param size: QSize to scale the result down to, or None
+        :returns: Composited QImage
+        """
+        composited_image = self._get_composited_image(image, source_path, variant)
+
+        if size:
+            composited_image = composited_image.scaled(
+                size,
+                QtCore.Qt.KeepAspectRatio,
+                QtCore.Qt.SmoothTransformation
+            )
+
+        return composited_image
+
+    def _get_composited_image(self, image, source_path, variant):
+        """
+        Executed in a background thread. Loads the composited
+        thumbnail from disk, creating it if necessary.
+
+        :param image: QImage source image, or None
+        :param source_path: Path to the source image on disk, or None
+        :param variant: Thumbnail variant
+        :returns: Full size composited QImage
+        """
+        cache_path = None
+        if source_path and os.path.exists(source_path):
+            cache_path = self._get_cache_path(source_path, variant)
+
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(source_path):
+                cached_image = QtGui.QImage(cache_path)
+                # a file being written by another process won't load
+                if not cached_image.isNull():
+                    return cached_image
+
+        if image is None:
+            image = QtGui.QImage(source_path or "")
+
+        composited_image = utils.create_thumbnail_image(image, variant)
+
+        if cache_path:
+            folder = os.path.dirname(cache_path)
+            if not os.path.exists(folder):
+                try:
+                    os.makedirs(folder)
+                except OSError:
+                    # another thread may have created the folder
+                    pass
+            # caching is an optimization, so carry on if the file can't be saved
+            composited_image.save(cache_path, "PNG")
+
+        return composited_image
+
+    def _get_cache_path(self, source_path, variant):
+        """
+        Returns the path where a composited thumbnail is stored.
+
+        :param source_path: Path to the source image on disk
+        :param variant: Thumbnail variant
+        :returns: Path to a png file
+        """
+        if isinstance(source_path, unicode):
+            source_path = source_path.encode("utf-8")
+        file_name = "%s.png" % hashlib.md5(source_path).hexdigest()
+        return os.path.join(self._cache_root, variant, file_name)
+
+    def _on_task_completed(self, uid, group, result):
+        """
+        Called when a background task has completed.
+        """
+        if group == self._task_group:
+            self.thumbnail_ready.emit(uid, result)
+
+    def _on_task_failed(self, uid, group, msg, stack_trace):
+        """
+        Called when a background task has failed.
+        """
+        if group == self._task_group:
+            self._app.log_warning("Could not composite thumbnail: %s" % msg)
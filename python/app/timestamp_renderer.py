@@ -0,0 +1,170 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import datetime
+import heapq
+import time
+
+from sgtk.platform.qt import QtCore
+
+from . import utils
+from .lru_cache import LruCache
+
+
+class TimestampRenderer(QtCore.QObject):
+    """
+    Renders unix time stamps as human readable strings and keeps
+    track of when those strings go stale.
+
+    A time stamp is formatted differently depending on how long ago
+    it was (see :meth:`utils.create_human_readable_timestamp`). Rendered
+    strings are cached together with the time at which they move into
+    the next formatting bracket, and a single timer fires whenever one
+    of the watched brackets has been crossed, so that views holding
+    rendered strings only need to update the affected items.
+
+    A single instance is shared by the whole app, see :meth:`instance`.
+
+    :signal bracket_crossed(float): Emitted with the current unix time
+        whenever a time stamp passed to :meth:`watch` has moved into a new
+        formatting bracket.
+    """
+
+    bracket_crossed = QtCore.Signal(float)
+
+    # maximum number of rendered time stamps to keep
+    CACHE_SIZE = 5000
+
+    # longest time to wait before checking for crossed brackets, in
+    # milliseconds. This keeps the timer interval well within what
+    # QTimer supports and handles system clock changes gracefully.
+    MAX_TIMER_INTERVAL_MILLISECONDS = 60 * 60 * 1000
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the shared renderer, creating it on first use.
+
+        :returns: :class:`TimestampRenderer`
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        """
+        :param parent: QT parent object
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        # (string, expiry unix time or None) tuples, keyed by unix time
+        self._cache = LruCache(self.CACHE_SIZE)
+
+        # heap of watched expiry times, and the same times as a set
+        self._expiries = []
+        self._watched = set()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def render(self, unix_time):
+        """
+        Returns the human readable string for a time stamp.
+
+        :param unix_time: Time stamp as unix time
+        :returns: String, e.g. "10:32" or "24 Jun 10:32"
+        """
+        return self._get_entry(unix_time)[0]
+
+    def get_expiry(self, unix_time):
+        """
+        Returns the time at which the string for a time stamp will change.
+
+        :param unix_time: Time stamp as unix time
+        :returns: Unix time, or None if the string will not change
+        """
+        return self._get_entry(unix_time)[1]
+
+    def watch(self, expiry):
+        """
+        Requests a bracket_crossed signal once the given time has passed.
+
+        :param expiry: Unix time, as returned by :meth:`get_expiry`. None is ignored.
+        """
+        if expiry is None or expiry in self._watched:
+            return
+
+        self._watched.add(expiry)
+        heapq.heappush(self._expiries, expiry)
+
+        if self._expiries[0] == expiry:
+            # this is now the earliest expiry
+            self._schedule()
+
+    ############################################################################################
+    # internal methods
+
+    def _get_entry(self, unix_time):
+        """
+        Returns the cached (string, expiry) entry for a time stamp,
+        rendering it if it isn't cached or has gone stale.
+
+        :param unix_time: Time stamp as unix time
+        :returns: tuple with (string, expiry)
+        """
+        entry = self._cache.get(unix_time)
+        if entry and (entry[1] is None or entry[1] > time.time()):
+            return entry
+
+        datetime_obj = datetime.datetime.fromtimestamp(unix_time)
+        (time_str, _) = utils.create_human_readable_timestamp(datetime_obj)
+
+        expiry_datetime = utils.get_human_readable_timestamp_expiry(datetime_obj)
+        if expiry_datetime:
+            delta = expiry_datetime - datetime_obj
+            expiry = unix_time + delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+        else:
+            expiry = None
+
+        entry = (time_str, expiry)
+        self._cache.set(unix_time, entry)
+        return entry
+
+    def _schedule(self):
+        """
+        Starts the timer for the earliest watched expiry.
+        """
+        if not self._expiries:
+            self._timer.stop()
+            return
+
+        interval = int((self._expiries[0] - time.time()) * 1000) + 1
+        interval = max(0, min(interval, self.MAX_TIMER_INTERVAL_MILLISECONDS))
+        self._timer.start(interval)
+
+    def _on_timeout(self):
+        """
+        Called when the timer fires. Emits bracket_crossed if
+        any of the watched expiries have passed.
+        """
+        now = time.time()
+
+        crossed = False
+        while self._expiries and self._expiries[0] <= now:
+            self._watched.discard(heapq.heappop(self._expiries))
+            crossed = True
+
+        self._schedule()
+
+        if crossed:
+            self.bracket_crossed.emit(now)
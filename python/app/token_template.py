@@ -0,0 +1,212 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import re
+from collections import namedtuple
+
+from sgtk import TankError
+
+# matches all {tokens} in a template string
+TOKEN_REGEX = re.compile("{([^}^{]*)}")
+
+# matches a [preroll] at the start of a token
+PRE_ROLL_REGEX = re.compile("^\[([^\]]+)\]")
+
+# matches a [postroll] at the end of a token
+POST_ROLL_REGEX = re.compile(".*\[([^\]]+)\]$")
+
+
+class TemplateToken(namedtuple("TemplateToken", ["sg_fields", "directive", "pre_roll", "post_roll"])):
+    """
+    A single parsed {token} slot in a :class:`TokenTemplate`.
+
+    - sg_fields: list of shotgun fields, in fallback order
+    - directive: formatting directive, e.g. 'showtype', or None
+    - pre_roll: string to prepend if the value is set, or None
+    - post_roll: string to append if the value is set, or None
+    """
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, raw_token):
+        """
+        Parses a raw token on the form
+
+            [preroll]shotgun.field.name|sg_field_name_fallback::directive[postroll]
+
+        :param raw_token: Token string without the surrounding curly brackets.
+        :returns: :class:`TemplateToken` instance
+        """
+        pre_roll = None
+        post_roll = None
+        directive = None
+
+        processed_token = raw_token
+
+        match = PRE_ROLL_REGEX.match(processed_token)
+        if match:
+            pre_roll = match.group(1)
+            # remove preroll part from main token
+            processed_token = processed_token[len(pre_roll) + 2:]
+
+        match = POST_ROLL_REGEX.match(processed_token)
+        if match:
+            post_roll = match.group(1)
+            # remove postroll part from main token
+            processed_token = processed_token[:-(len(post_roll) + 2)]
+
+        if "::" in processed_token:
+            # we have a special formatting directive
+            # e.g. created_at::ago
+            (sg_field_str, directive) = processed_token.split("::")
+        else:
+            sg_field_str = processed_token
+
+        # there may be more than one sg field, in which case
+        # we have a series of fallbacks, e.g. {artist|created_by}
+        sg_fields = tuple(sg_field_str.split("|"))
+
+        return cls(sg_fields, directive, pre_roll, post_roll)
+
+    def render(self, sg_data, value_formatter):
+        """
+        Resolves this token given a shotgun data dict.
+
+        :param sg_data: Data dictionary to get values from
+        :param value_formatter: Callable with signature (sg_type, sg_field, value, directive)
+            returning the value as a string.
+        :returns: Resolved string
+        """
+        # get the first sg field value we find
+        # this is used when we have a fallback syntax in the token string,
+        # for example {artist|created_by}
+        for sg_field in self.sg_fields:
+            sg_value = sg_data.get(sg_field)
+            if sg_value:
+                # got a value so stop looking
+                break
+
+        if (sg_value is None or sg_value == []) and (self.pre_roll or self.post_roll):
+            # shotgun value is empty
+            # if we have a pre or post roll part of the token
+            # then we basicaly just skip the display of both
+            # those and the value entirely
+            # e.g. Hello {[Shot:]sg_shot} becomes:
+            # for shot abc: 'Hello Shot:abc'
+            # for shot <empty>: 'Hello '
+            return ""
+
+        resolved_value = value_formatter(sg_data["type"], sg_field, sg_value, self.directive)
+
+        # potentially add pre/and post
+        if self.pre_roll:
+            resolved_value = "%s%s" % (self.pre_roll, resolved_value)
+        if self.post_roll:
+            resolved_value = "%s%s" % (resolved_value, self.post_roll)
+
+        return resolved_value
+
+
+class TokenTemplate(object):
+    """
+    Precompiled version of a template string as returned by
+    the shotgun_fields hook, e.g. "<b>By:</b> {created_by}{[<br>]description}".
+
+    The string is parsed once into a sequence of literal segments
+    and :class:`TemplateToken` slots so that rendering it is a
+    single pass over the slots followed by a join, with no regular
+    expression work at render time.
+
+    Tokens are on the following form:
+
+        {[preroll]shotgun.field.name|sg_field_name_fallback::directive[postroll]}
+
+    Basic Examples:
+
+    - {code}                         # simple format
+    - {sg_sequence.Sequence.code}    # deep links
+    - {artist|created_by}            # if artist is null, use creted_by
+
+    Directives are also supported - these are used by the formatting logic
+    and include the following:
+
+    - {sg_sequence::showtype}        # will generate a link saying
+                                     # 'Sequence ABC123' instead of just
+                                     # 'ABC123' like it does by default
+    - {sg_sequence::nolink}          # no url link will be created
+
+    Optional pre/post roll - if a value is null, pre- and post-strings are
+    omitted from the final result. Examples of this syntax:
+
+    - {[Name: ]code}                 # If code is set, 'Name: xxx' will be
+                                     # printed out, otherwise nothing.
+    - {[Name: ]code[<br>]}           # Same but with a post line break
+    """
+
+    __slots__ = ("_template_str", "_literals", "_tokens")
+
+    def __init__(self, template_str):
+        """
+        :param template_str: String with tokens, e.g. "{code}_{created_by}"
+        :raises: TankError if the string cannot be parsed.
+        """
+        try:
+            # split "a{xx}b{yy}" into ["a", "xx", "b", "yy", ""] - literal
+            # segments are on even indices and raw tokens on odd ones.
+            segments = TOKEN_REGEX.split(template_str)
+        except Exception, error:
+            raise TankError("Could not parse '%s' - Error: %s" % (template_str, error))
+
+        self._template_str = template_str
+        self._literals = tuple(segments[0::2])
+        self._tokens = tuple(TemplateToken.parse(raw_token) for raw_token in segments[1::2])
+
+    def __repr__(self):
+        return "<TokenTemplate %r>" % self._template_str
+
+    @property
+    def template_str(self):
+        """
+        The original template string
+        """
+        return self._template_str
+
+    @property
+    def tokens(self):
+        """
+        Tuple of :class:`TemplateToken` objects, in template order
+        """
+        return self._tokens
+
+    @property
+    def fields(self):
+        """
+        All shotgun fields referenced by the template, e.g. ["code", "created_by"]
+        """
+        fields = []
+        for token in self._tokens:
+            fields.extend(token.sg_fields)
+        return fields
+
+    def render(self, sg_data, value_formatter):
+        """
+        Convert the template given a shotgun data dict.
+
+        :param sg_data: Data dictionary to get values from
+        :param value_formatter: Callable with signature (sg_type, sg_field, value, directive)
+            returning the value as a string.
+        :returns: string with tokens replaced with actual values
+        """
+        literals = self._literals
+        parts = [literals[0]]
+        for (idx, token) in enumerate(self._tokens):
+            parts.append(token.render(sg_data, value_formatter))
+            parts.append(literals[idx + 1])
+        return "".join(parts)
@@ -0,0 +1,74 @@
+# Copyright (c) 2016 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+from sgtk.platform.qt import QtCore
+
+from .lru_cache import LruCache
+
+
+class UserAvatarCache(QtCore.QObject):
+    """
+    Holds the thumbnails of the Shotgun users retrieved by any model in
+    the app, so that each user's thumbnail only has to be retrieved once
+    and can be displayed wherever that user appears.
+
+    A single instance is shared by the whole app, see :meth:`instance`.
+
+    :signal avatar_updated(int): Emitted with the id of a user
+        whenever the thumbnail for that user has been added.
+    """
+
+    avatar_updated = QtCore.Signal(int)
+
+    # maximum number of users to keep thumbnails for
+    CACHE_SIZE = 500
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the shared cache, creating it on first use.
+
+        :returns: :class:`UserAvatarCache`
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        """
+        :param parent: QT parent object
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        # (QImage, path) tuples, keyed by user id
+        self._cache = LruCache(self.CACHE_SIZE)
+
+    def get(self, user_id):
+        """
+        Returns the thumbnail for a user.
+
+        :param user_id: Shotgun id of the user
+        :returns: tuple with (QImage, path to the thumbnail on disk),
+            or None if no thumbnail has been retrieved for the user.
+        """
+        return self._cache.get(user_id)
+
+    def set(self, user_id, image, path):
+        """
+        Adds the thumbnail for a user.
+
+        :param user_id: Shotgun id of the user
+        :param image: QImage thumbnail
+        :param path: Path to the thumbnail on disk
+        """
+        self._cache.set(user_id, (image, path))
+        self.avatar_updated.emit(user_id)
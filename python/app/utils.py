@@ -12,6 +12,21 @@ import sgtk
 from sgtk.platform.qt import QtCore, QtGui
 import datetime
 
+# thumbnail variants, see create_thumbnail_image()
+THUMBNAIL_RECT = "rect"
+THUMBNAIL_ROUND = "round"
+THUMBNAIL_ROUND_CLIENT = "round_client"
+THUMBNAIL_ROUND_UNREAD = "round_unread"
+THUMBNAIL_ROUND_CLIENT_UNREAD = "round_client_unread"
+
+# (client, unread) flags for the round variants
+_ROUND_THUMBNAIL_FLAGS = {
+    THUMBNAIL_ROUND: (False, False),
+    THUMBNAIL_ROUND_CLIENT: (True, False),
+    THUMBNAIL_ROUND_UNREAD: (False, True),
+    THUMBNAIL_ROUND_CLIENT_UNREAD: (True, True),
+}
+
 def create_round_thumbnail(image):
     """
     Create a 200 px wide circle thumbnail
@@ -22,32 +37,26 @@ def create_round_thumbnail(image):
     CANVAS_SIZE = 200
 
     # get the 512 base image
-    base_image = QtGui.QPixmap(CANVAS_SIZE, CANVAS_SIZE)
-    base_image.fill(QtCore.Qt.transparent)
-    
-    # now attempt to load the image
-    # pixmap will be a null pixmap if load fails    
-    thumb = QtGui.QPixmap.fromImage(image)
+    base_image = _create_canvas(CANVAS_SIZE, CANVAS_SIZE)
     
-    if not thumb.isNull():
+    if not image.isNull():
             
         # scale it down to fit inside a frame of maximum 512x512
-        thumb_scaled = thumb.scaled(CANVAS_SIZE, 
+        thumb_scaled = image.scaled(CANVAS_SIZE, 
                                     CANVAS_SIZE, 
                                     QtCore.Qt.KeepAspectRatioByExpanding, 
                                     QtCore.Qt.SmoothTransformation)  
 
         # now composite the thumbnail on top of the base image
         # bottom align it to make it look nice
-        thumb_img = thumb_scaled.toImage()
-        brush = QtGui.QBrush(thumb_img)
+        brush = QtGui.QBrush(thumb_scaled)
         painter = QtGui.QPainter(base_image)
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
         painter.setBrush(brush)
         painter.drawEllipse(0, 0, CANVAS_SIZE, CANVAS_SIZE)             
         painter.end()
     
-    return base_image
+    return QtGui.QPixmap.fromImage(base_image)
 
 def create_round_512x400_note_thumbnail(image, client=False, unread=False):
     """
@@ -61,30 +70,73 @@ def create_round_512x400_note_thumbnail(image, client=False, unread=False):
     :returns: QPixmap circular thumbnail, 380px wide, on a 
               512x400 rect backdrop
     """    
+    return QtGui.QPixmap.fromImage(_create_round_512x400_image(image, client, unread))
+
+def create_rectangular_512x400_thumbnail(image):
+    """
+    Given a QImage shotgun thumbnail, create a rectangular icon
+    with the thumbnail composited onto a centered otherwise empty canvas. 
+    This will return a 512x400 pixmap object.
+    
+    :param image: QImage source image
+    :returns: QPixmap rectangular thumbnail on a 512x400 rect backdrop
+    """
+    return QtGui.QPixmap.fromImage(_create_rectangular_512x400_image(image))
+
+def create_thumbnail_image(image, variant):
+    """
+    Composites a QImage shotgun thumbnail onto a 512x400 canvas.
+    Only QImage objects are used, which means that this can be
+    called from a background thread.
+    
+    :param image: QImage source image
+    :param variant: One of THUMBNAIL_RECT, THUMBNAIL_ROUND, THUMBNAIL_ROUND_CLIENT,
+                    THUMBNAIL_ROUND_UNREAD or THUMBNAIL_ROUND_CLIENT_UNREAD
+    :returns: 512x400 QImage
+    """
+    if variant in _ROUND_THUMBNAIL_FLAGS:
+        (client, unread) = _ROUND_THUMBNAIL_FLAGS[variant]
+        return _create_round_512x400_image(image, client, unread)
+    else:
+        return _create_rectangular_512x400_image(image)
+
+def _create_canvas(width, height):
+    """
+    Creates a transparent QImage to composite thumbnails onto.
+    
+    :param width: Width in pixels
+    :param height: Height in pixels
+    :returns: QImage
+    """
+    canvas = QtGui.QImage(width, height, QtGui.QImage.Format_ARGB32_Premultiplied)
+    canvas.fill(QtCore.Qt.transparent)
+    return canvas
+
+def _create_round_512x400_image(image, client, unread):
+    """
+    Creates a round thumbnail on a 512x400 canvas.
+    See create_round_512x400_note_thumbnail().
+    
+    :returns: QImage
+    """
     CANVAS_WIDTH = 512
     CANVAS_HEIGHT = 400
     CIRCLE_SIZE = 380
 
     # get the 512 base image
-    base_image = QtGui.QPixmap(CANVAS_WIDTH, CANVAS_HEIGHT)
-    base_image.fill(QtCore.Qt.transparent)
-    
-    # now attempt to load the image
-    # pixmap will be a null pixmap if load fails    
-    thumb = QtGui.QPixmap.fromImage(image)
+    base_image = _create_canvas(CANVAS_WIDTH, CANVAS_HEIGHT)
     
-    if not thumb.isNull():
+    if not image.isNull():
             
         # scale it to fill a 400x400 square
-        thumb_scaled = thumb.scaled(CIRCLE_SIZE, 
+        thumb_scaled = image.scaled(CIRCLE_SIZE, 
                                     CIRCLE_SIZE, 
                                     QtCore.Qt.KeepAspectRatioByExpanding, 
                                     QtCore.Qt.SmoothTransformation)  
 
         # now composite the thumbnail on top of the base image
         # bottom align it to make it look nice
-        thumb_img = thumb_scaled.toImage()
-        brush = QtGui.QBrush(thumb_img)
+        brush = QtGui.QBrush(thumb_scaled)
         
         painter = QtGui.QPainter(base_image)
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
@@ -101,52 +153,44 @@ def create_round_512x400_note_thumbnail(image, client=False, unread=False):
         painter.drawEllipse(0, 0, CIRCLE_SIZE, CIRCLE_SIZE)
 
         if unread:
-            UNREAD_NOTE_INDICATOR = QtGui.QPixmap(":/tk_multi_infopanel/unread_indicator.png")
-            painter.drawPixmap(-10, -10, UNREAD_NOTE_INDICATOR)
+            UNREAD_NOTE_INDICATOR = QtGui.QImage(":/tk_multi_infopanel/unread_indicator.png")
+            painter.drawImage(-10, -10, UNREAD_NOTE_INDICATOR)
         
         painter.translate(0, 250)
         
         if client:
-            CLIENT_NOTE_INDICATOR = QtGui.QPixmap(":/tk_multi_infopanel/client_note_indicator.png")
-            painter.drawPixmap(0, 0, CLIENT_NOTE_INDICATOR)
+            CLIENT_NOTE_INDICATOR = QtGui.QImage(":/tk_multi_infopanel/client_note_indicator.png")
+            painter.drawImage(0, 0, CLIENT_NOTE_INDICATOR)
         
         painter.end()
     
     return base_image
 
-def create_rectangular_512x400_thumbnail(image):
+def _create_rectangular_512x400_image(image):
     """
-    Given a QImage shotgun thumbnail, create a rectangular icon
-    with the thumbnail composited onto a centered otherwise empty canvas. 
-    This will return a 512x400 pixmap object.
+    Creates a rectangular thumbnail on a 512x400 canvas.
+    See create_rectangular_512x400_thumbnail().
     
-    :param image: QImage source image
-    :returns: QPixmap rectangular thumbnail on a 512x400 rect backdrop
+    :returns: QImage
     """
     CANVAS_WIDTH = 512
     CANVAS_HEIGHT = 400
     CORNER_RADIUS = 10
 
     # get the 512 base image
-    base_image = QtGui.QPixmap(CANVAS_WIDTH, CANVAS_HEIGHT)
-    base_image.fill(QtCore.Qt.transparent)
-    
-    # now attempt to load the image
-    # pixmap will be a null pixmap if load fails    
-    thumb = QtGui.QPixmap.fromImage(image)
+    base_image = _create_canvas(CANVAS_WIDTH, CANVAS_HEIGHT)
     
-    if not thumb.isNull():
+    if not image.isNull():
             
         # scale it down to fit inside a frame of maximum 512x512
-        thumb_scaled = thumb.scaled(CANVAS_WIDTH, 
+        thumb_scaled = image.scaled(CANVAS_WIDTH, 
                                     CANVAS_HEIGHT, 
                                     QtCore.Qt.KeepAspectRatioByExpanding, 
                                     QtCore.Qt.SmoothTransformation)  
 
         # now composite the thumbnail on top of the base image
         # bottom align it to make it look nice
-        thumb_img = thumb_scaled.toImage()
-        brush = QtGui.QBrush(thumb_img)
+        brush = QtGui.QBrush(thumb_scaled)
         
         painter = QtGui.QPainter(base_image)
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
@@ -208,3 +252,34 @@ def create_human_readable_timestamp(datetime_obj):
     return (time_str, full_time_str)
 
 
+def get_human_readable_timestamp_expiry(datetime_obj):
+    """
+    Returns the point in time when the string returned by
+    create_human_readable_timestamp() for the given time stamp
+    will change, as the time stamp moves into a different
+    formatting bracket.
+
+    :param datetime_obj: Datetime obj that was formatted
+    :returns: datetime obj or None if the formatting will not change
+    """
+    now = datetime.datetime.now()
+
+    if datetime_obj > now:
+        # future time - formatting changes once it is reached
+        return datetime_obj
+
+    delta_days = (now - datetime_obj).days
+
+    if delta_days >= 371:
+        # more than 52 weeks ago - the year is included and won't change
+        return None
+
+    elif delta_days > 1:
+        # changes once it is more than 52 weeks ago
+        return datetime_obj + datetime.timedelta(days=371)
+
+    else:
+        # changes once it is more than one day ago
+        return datetime_obj + datetime.timedelta(days=2)
+
+
@@ -14,10 +14,10 @@ from sgtk.platform.qt import QtCore, QtGui
 # import the shotgun_model and view modules from the shotgun utils framework
 shotgun_model = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_model")
 shotgun_view = sgtk.platform.import_framework("tk-framework-qtwidgets", "views")
-shotgun_globals = sgtk.platform.import_framework("tk-framework-shotgunutils", "shotgun_globals")
 
 from .ui.all_fields_widget import Ui_AllFieldsWidget
-from .shotgun_formatter import ShotgunEntityFormatter
+from .shotgun_formatter import ShotgunTypeFormatter
+from . import schema_cache
 
 class FieldNameLabel(QtGui.QLabel):
     """
@@ -97,7 +97,7 @@ class AllFieldsWidget(QtGui.QWidget):
             # an empty dictionary indicates no data available.
             return
         
-        formatter = ShotgunEntityFormatter(sg_data["type"], sg_data["id"])
+        formatter = ShotgunTypeFormatter(sg_data["type"])
         
         self.setVisible(False)
         try:
@@ -105,7 +105,7 @@ class AllFieldsWidget(QtGui.QWidget):
             # so we can sort them in alphabetic order based on this
             display_names = {}
             for field_name in sg_data.keys():
-                display_name = shotgun_globals.get_field_display_name(formatter.entity_type, field_name)
+                display_name = schema_cache.get_field_display_name(formatter.entity_type, field_name)
                 display_names[display_name] = field_name
             
             # now create new items - order alphabetically
@@ -154,6 +154,15 @@ class ListItemWidget(QtGui.QWidget):
         self.ui.list_item_top_right.setText(header_right)
         self.ui.list_item_body.setText(body)
 
+    @staticmethod
+    def thumbnail_size():
+        """
+        Returns the size at which thumbnails are displayed in the widget.
+
+        :returns: Size of the thumbnail area
+        """
+        return QtCore.QSize(96, 75)
+
     @staticmethod
     def calculate_size():
         """